@@ -2,6 +2,7 @@ from typing import Optional, Dict, Any
 from dataclasses import dataclass, field, fields
 from panda3d.core import NetDatagram
 from direct.distributed.PyDatagramIterator import PyDatagramIterator
+from components.codec import get_codec
 
 @dataclass
 class ShipCore:
@@ -69,31 +70,13 @@ class ShipCore:
                 print(f"[Warning] Ismeretlen property a Core-ban: {key}")
 
     def pack(self, dg):
-        """Adatok becsomagolása hálózati küldéshez."""
-        for f in fields(self):
-            val = getattr(self, f.name)
-            if f.type == int:
-                dg.addInt32(int(val))
-            elif f.type == float:
-                dg.addFloat64(float(val))
-            elif f.type == str:
-                dg.addString(str(val))
+        """Adatok becsomagolása hálózati küldéshez (előfordított struct codec)."""
+        get_codec(self.__class__).pack(self, dg)
 
     @classmethod
     def unpack(cls, iterator: PyDatagramIterator):
         """Adatok kicsomagolása a hálózatról."""
-        data = {}
-        for f in fields(cls):
-            try:
-                if f.type == int:
-                    data[f.name] = iterator.getInt32()
-                elif f.type == float:
-                    data[f.name] = iterator.getFloat64()
-                elif f.type == str:
-                    data[f.name] = iterator.getString()
-            except:
-                break
-        return cls(**data)
+        return get_codec(cls).unpack(iterator)
 
 @dataclass
 class ShipSupport:
@@ -123,22 +106,13 @@ class ShipSupport:
                 print(f"[Warning] Ismeretlen property a Support-ban: {key}")
 
     def pack(self, dg):
-        for f in fields(self):
-            val = getattr(self, f.name)
-            if f.type == int: dg.addInt32(int(val))
-            elif f.type == float: dg.addFloat64(float(val))
-            elif f.type == str: dg.addString(str(val))
+        """Adatok becsomagolása hálózati küldéshez (előfordított struct codec)."""
+        get_codec(self.__class__).pack(self, dg)
 
     @classmethod
     def unpack(cls, iterator: PyDatagramIterator):
-        data = {}
-        for f in fields(cls):
-            try:
-                if f.type == int: data[f.name] = iterator.getInt32()
-                elif f.type == float: data[f.name] = iterator.getFloat64()
-                elif f.type == str: data[f.name] = iterator.getString()
-            except: break
-        return cls(**data)
+        """Adatok kicsomagolása a hálózatról."""
+        return get_codec(cls).unpack(iterator)
 
 @dataclass
 class ShipSystem:
@@ -168,22 +142,13 @@ class ShipSystem:
                 print(f"[Warning] Ismeretlen property a System-ben: {key}")
 
     def pack(self, dg):
-        for f in fields(self):
-            val = getattr(self, f.name)
-            if f.type == int: dg.addInt32(int(val))
-            elif f.type == float: dg.addFloat64(float(val))
-            elif f.type == str: dg.addString(str(val))
+        """Adatok becsomagolása hálózati küldéshez (előfordított struct codec)."""
+        get_codec(self.__class__).pack(self, dg)
 
     @classmethod
     def unpack(cls, iterator: PyDatagramIterator):
-        data = {}
-        for f in fields(cls):
-            try:
-                if f.type == int: data[f.name] = iterator.getInt32()
-                elif f.type == float: data[f.name] = iterator.getFloat64()
-                elif f.type == str: data[f.name] = iterator.getString()
-            except: break
-        return cls(**data)
+        """Adatok kicsomagolása a hálózatról."""
+        return get_codec(cls).unpack(iterator)
 
 # --- Segédosztályok a típusossághoz ---
 class DamageType:
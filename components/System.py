@@ -1,6 +1,7 @@
 from typing import Optional, Dict, Any
 from dataclasses import dataclass, field, fields
 from direct.distributed.PyDatagramIterator import PyDatagramIterator
+from components.codec import get_codec
 
 @dataclass
 class ShipSystem:
@@ -55,41 +56,13 @@ class ShipSystem:
                 print(f"[Warning] Ismeretlen property a System-ben: {key}")
 
     def pack(self, dg):
-        """
-        A ShipSystem összes releváns mezőjének bináris becsomagolása.
-        """
-        for f in fields(self):
-            # Kihagyjuk a komplex objektumokat, amik nem szeralizálhatóak egyszerűen
-            if f.name in ["blueprint", "reprocess"]:
-                continue
-            
-            val = getattr(self, f.name)
-            
-            if f.type == int:
-                dg.addInt32(val)
-            elif f.type == float:
-                dg.addFloat64(val)
-            elif f.type == str:
-                dg.addString(val)
+        """Adatok becsomagolása hálózati küldéshez (előfordított struct codec)."""
+        get_codec(self.__class__).pack(self, dg)
 
     @classmethod
     def unpack(cls, iterator: PyDatagramIterator):
-        """
-        A ShipSystem adatok kiolvasása a hálózati adatfolyamból.
-        """
-        extracted_data = {}
-        for f in fields(cls):
-            if f.name in ["blueprint", "reprocess"]:
-                continue
-                
-            if f.type == int:
-                extracted_data[f.name] = iterator.getInt32()
-            elif f.type == float:
-                extracted_data[f.name] = iterator.getFloat64()
-            elif f.type == str:
-                extracted_data[f.name] = iterator.getString()
-        
-        return cls(**extracted_data)
+        """Adatok kicsomagolása a hálózatról."""
+        return get_codec(cls).unpack(iterator)
 
     def apply_to_ship(self, ship_stats: dict):
         """Alkalmazza a bónuszokat egy statisztika-szótárra."""
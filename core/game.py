@@ -2,6 +2,8 @@ from direct.showbase.ShowBase import ShowBase
 from direct.task import Task
 from panda3d.core import loadPrcFile
 import random
+import time
+import globals as g
 
 # Entitás Importok
 from entities import Ship, Asteroid, Planet, Wreck, Stargate 
@@ -9,20 +11,32 @@ from entities import Ship, Asteroid, Planet, Wreck, Stargate
 # UI Importok
 from ui.menus import MainMenu
 from ui.windows import WindowManager
+from ui.netstats import NetStatsOverlay
+from globals import NET_CAPTURE, NET_CLOCK_SYNC_INTERVAL, NET_INTERP_DELAY, NET_DEAD_RECKONING
 from systems.generation import GalaxyManager
 from systems.ship_manager import ShipManager
+from systems.combat import CombatSystem, draw_beam
 
 # Hálózati Importok
 from net.server import GameServer
 from net.client import GameClient
 from net.protocol import (
-    create_pos_datagram, 
-    MSG_SYNC_CORE, 
-    MSG_SYNC_SUPPORT, 
-    MSG_SYNC_SYSTEM
+    MSG_SNAPSHOT,
+    create_snapshot_datagram,
+    create_laser_datagram,
+    create_equipment_datagrams,
+    create_hit_claim,
 )
+from net.snapshot import SnapshotEncoder, quantize_state, dequantize_state
+from net.interpolation import SnapshotBuffer
+from net.deadreckoning import DeadReckoner
+from panda3d.core import Vec3
 
 
+# Ennyi ideig tartjuk aktívnak egy távoli lézert az utolsó UDP állapot után (mp)
+LASER_STATE_TIMEOUT = 0.25
+# Célpont nélküli (előre lőtt) távoli lézer hossza
+REMOTE_LASER_RANGE = 100.0
 
 class CerberusGame(ShowBase):
     def __init__(self, item_db=None):
@@ -53,11 +67,39 @@ class CerberusGame(ShowBase):
         
         # Játékállapot adatok
         self.local_ship = None
+        self.combat_system = None
         self.remote_ships = {} 
         self.my_id = 0 
+
+        # Távoli hajók ismert felszerelése (ship ID -> {slot: tárgy}); a látókörbe
+        # később belépő hajó is azonnal megkapja, nem kell újraküldeni
+        self.remote_equipment = {}
+
+        # Távoli hajónkénti jitter buffer (interpolált megjelenítés)
+        self.remote_buffers = {}
+
+        # Saját hajó snapshot kódolója (baseline + visszaigazolások)
+        self.snapshot_encoder = SnapshotEncoder()
+        # Csak akkor küldünk snapshotot, ha a fogadók sebesség alapú becslése túl nagyot tévedne
+        self.dead_reckoning = DeadReckoner() if NET_DEAD_RECKONING else None
+        self._last_net_sample = None
+        self._laser_sent = False
+
+        # Hálózati célpontra mért, a következő tick-ben a szervernek küldendő sebzés (ID -> összeg)
+        self.pending_hits = {}
+        self._next_clock_sync = 0.0
+
+        # Kilépéskor (ablak bezárása / Kilépés gomb) a capture fájlok lezárása
+        self.exitFunc = self.shutdown_network
         
         print("[SYSTEM] Cerberus Játékmag inicializálva.")
 
+    def shutdown_network(self):
+        """A hálózati rögzítések lezárása kilépés előtt (ShowBase.exitFunc)."""
+        self.client.stop_capture()
+        if self.server:
+            self.server.stop_capture()
+
     def start_host(self):
         """Szerver indítása és helyi csatlakozás (Host mód)."""
         self.server = GameServer(self)
@@ -133,7 +175,14 @@ class CerberusGame(ShowBase):
                 self.local_ship.equip_core(starter_core)
                 print(f"[GAME] Alapértelmezett mag felszerelve: {starter_core.name}")
             
-            # Felszerelés szinkronizálása a hálózaton
+        # Kliensként bejelentkezünk: a szerver egyetlen csomagban küldi a világállapotot
+        if not (self.server and self.server.active):
+            pos = self.local_ship.get_pos() - self.get_system_origin()
+            self.client.send_login(self.my_id, self.get_current_system_id(), tuple(pos),
+                                   self.local_ship.current_hull, self.local_ship.current_shield)
+
+        if self.item_db:
+            # Felszerelés szinkronizálása a hálózaton (egyszer; a szerver nyilvántartja)
             self.sync_my_equipment()
 
         # Kamera rögzítése a hajóhoz (TPS nézet)
@@ -142,43 +191,147 @@ class CerberusGame(ShowBase):
         self.camera.setPos(0, -35, 12)
         self.camera.lookAt(self.local_ship.model)
 
+        # Harci rendszer (célpont, lézer); a lézer állapota megy ki a hálózatra
+        if self.combat_system is None:
+            self.combat_system = CombatSystem(self)
+
         # Fő frissítési ciklus elindítása
         taskMgr.add(self.update_loop, "GameUpdateLoop")
 
-    def sync_my_equipment(self):
-        """Saját bónuszok (Core, Support, System) elküldése a többi játékosnak."""
+        # Hálózati állapotgyűjtés a render ciklustól függetlenül, fix tick frekvencián
+        self.net_ticker().add_listener(self.network_tick)
+
+        # Kliens oldali forgalom rögzítése (Host módban a szerver rögzít)
+        if NET_CAPTURE and not (self.server and self.server.active):
+            self.client.start_capture(NET_CAPTURE.format(role="client"), self.my_id)
+
+        # Hálózati mérések overlay-e (csak bekapcsolt NET_STATS esetén)
+        stats = self.net_stats()
+        if stats is not None:
+            if self.dead_reckoning is not None:
+                stats.add_section("dead_reckoning", self.dead_reckoning.metrics)
+            stats.add_section("ship_lod", self.ship_manager.metrics)
+            self.net_overlay = NetStatsOverlay(self, stats)
+            self.accept("f3", self.net_overlay.toggle)
+
+    def sync_my_equipment(self, force_full=False):
+        """
+        Saját bónuszok (Core, Support, System) elküldése a többi játékosnak.
+        A katalógusbeli tárgyakból csak az ID megy (MSG_SYNC_EQUIP_REF).
+        """
         if not self.local_ship: return
-        
-        from direct.distributed.PyDatagram import PyDatagram
-        
-        # Core szinkronizálása
-        if self.local_ship.core:
-            dg = PyDatagram()
-            dg.addUint8(MSG_SYNC_CORE)
-            dg.addUint16(self.my_id)
-            self.local_ship.core.pack(dg)
-            self.client.send(dg)
-            
-        # Support/System bónuszok szinkronizálása
-        if hasattr(self.local_ship, 'support') and self.local_ship.support:
-            dg = PyDatagram()
-            dg.addUint8(MSG_SYNC_SUPPORT)
-            dg.addUint16(self.my_id)
-            self.local_ship.support.pack(dg)
-            self.client.send(dg)
+
+        equipment = {
+            "core": getattr(self.local_ship, 'core', None),
+            "support": getattr(self.local_ship, 'support', None),
+            "system": getattr(self.local_ship, 'system', None),
+        }
+        for dg in create_equipment_datagrams(self.my_id, self.item_db, equipment, force_full):
+            self.send_to_network(dg)
 
     def update_remote_equipment(self, sender_id, type_name, equipment_obj):
         """Távoli hajó felszerelésének frissítése a hálózatról jövő adatok alapján."""
-        if sender_id in self.remote_ships:
-            ship = self.remote_ships[sender_id]
-            if isinstance(ship, Ship):
-                if type_name == "core":
-                    ship.equip_core(equipment_obj)
-                elif type_name == "support":
-                    ship.equip_support(equipment_obj)
-                elif type_name == "system":
-                    ship.equip_system(equipment_obj)
-                print(f"[NET] {ship.name} felszerelése frissítve: {equipment_obj.name}")
+        self.remote_equipment.setdefault(sender_id, {})[type_name] = equipment_obj
+        ship = self.remote_ships.get(sender_id)
+        if isinstance(ship, Ship):
+            self._equip_remote(ship, type_name, equipment_obj)
+            print(f"[NET] {ship.name} felszerelése frissítve: {equipment_obj.name}")
+
+    def _equip_remote(self, ship, type_name, equipment_obj):
+        if type_name == "core":
+            ship.equip_core(equipment_obj)
+        elif type_name == "support":
+            ship.equip_support(equipment_obj)
+        elif type_name == "system":
+            ship.equip_system(equipment_obj)
+
+    def apply_world_state(self, entities):
+        """
+        Belépéskori világállapot (MSG_LOGIN): a látókörön belüli hajók azonnal megjelennek,
+        a többiek a későbbi ENTER / snapshot alapján. A felszerelést a kliens oldja fel.
+        """
+        origin = self.get_system_origin()
+        for record, visible in entities:
+            if record.entity_id == self.my_id or not visible or record.entity_type != "Ship":
+                continue
+            pos = record.pos
+            self.update_remote_ship(record.entity_id, pos[0] + origin.x, pos[1] + origin.y, pos[2] + origin.z,
+                                    record.hpr, record.vel)
+            ship = self.remote_ships[record.entity_id]
+            if record.hull is not None:
+                ship.current_hull = record.hull
+            if record.shield is not None:
+                ship.current_shield = record.shield
+        print(f"[NET] Világállapot betöltve: {len(entities)} entitás.")
+
+    def set_remote_laser(self, sender_id, active, target_id=0):
+        """Távoli hajó lézer állapota (UDP-n jön, elveszhet; a következő tick pótolja)."""
+        ship = self.remote_ships.get(sender_id)
+        if isinstance(ship, Ship):
+            ship.laser_active = active
+            ship.laser_target = target_id
+            ship.laser_seen = self.net_time()
+
+    def draw_remote_lasers(self, now):
+        """Aktív távoli lézerek kirajzolása a hajótól a célpontjáig (vagy előre)."""
+        for ship in self.remote_ships.values():
+            if not isinstance(ship, Ship) or not hasattr(ship, 'laser_seen'):
+                continue
+            # Elveszett "kikapcsolt" lézer csomag esetén időtúllépéssel állunk le
+            if ship.laser_active and now - ship.laser_seen > LASER_STATE_TIMEOUT:
+                ship.laser_active = False
+            if not ship.laser_active or ship.root.isEmpty():
+                self.clear_remote_laser(ship)
+                continue
+            start_pos = ship.root.getPos(self.render)
+            target = self.local_ship if ship.laser_target == self.my_id else self.remote_ships.get(ship.laser_target)
+            if ship.laser_target and target is not None and target.root and not target.root.isEmpty():
+                ship.laser_np = draw_beam(self.render, start_pos, target.root.getPos(self.render), (1, 0, 0, 1),
+                                          ship.laser_np)
+            else:
+                direction = self.render.getRelativeVector(ship.root, Vec3(0, REMOTE_LASER_RANGE, 0))
+                ship.laser_np = draw_beam(self.render, start_pos, start_pos + direction, (0.5, 0, 0, 0.5),
+                                          ship.laser_np)
+
+    def clear_remote_laser(self, ship):
+        laser_np = getattr(ship, 'laser_np', None)
+        if laser_np is not None:
+            laser_np.removeNode()
+        ship.laser_np = None
+
+    def claim_hit(self, target, damage):
+        """
+        Hálózati játékos eltalálása: a sebzést nem helyben visszük be, hanem a szerver
+        validálja (visszatekert pozícióval) és küldi ki. Hamis, ha a célpont nem hálózati hajó.
+        """
+        if not isinstance(target, Ship) or target.is_local or self.remote_ships.get(target.id) is not target:
+            return False
+        self.pending_hits[target.id] = self.pending_hits.get(target.id, 0.0) + damage
+        return True
+
+    def apply_damage(self, target_id, shooter_id, amount):
+        """A szerver által elfogadott találat (MSG_DAMAGE)."""
+        if target_id == self.my_id:
+            ship = self.local_ship
+        else:
+            ship = self.remote_ships.get(target_id)
+        if isinstance(ship, Ship):
+            ship.take_damage(amount)
+            if not ship.is_active and ship is not self.local_ship:
+                # A megsemmisült hajó nézete már nem érvényes; a következő snapshot újat hoz létre
+                self.clear_remote_laser(ship)
+                self.remote_ships.pop(target_id, None)
+                self.remote_buffers.pop(target_id, None)
+
+    def remove_remote_ship(self, sender_id):
+        """Látókörből (AOI) kilépett távoli hajó eltávolítása."""
+        ship = self.remote_ships.get(sender_id)
+        self.remote_buffers.pop(sender_id, None)
+        if isinstance(ship, Ship):
+            del self.remote_ships[sender_id]
+            self.clear_remote_laser(ship)
+            ship.destroy()
+            print(f"[NET] {ship.name} kilépett a látókörből.")
 
     def select_target(self, entity_id):
         """Célpont befogása (HUD vagy kattintás hívja meg)."""
@@ -205,23 +358,161 @@ class CerberusGame(ShowBase):
             
             # 2. 200 hajó frissítése az optimalizált managerrel (LOD alapú)
             self.ship_manager.update(dt)
+            self.combat_system.update(dt)
             
             # 3. Egyéb távoli objektumok (bolygók, aszteroidák) frissítése
+            now = self.net_time()
             for entity in self.remote_ships.values():
                 entity.update(dt)
-            
-            # Pozíció szinkronizálása a hálózaton
-            pos = self.local_ship.get_pos()
-            dg = create_pos_datagram(self.my_id, pos.x, pos.y, pos.z)
-            self.client.send(dg)
-            
-            # Ha Host vagyunk, közvetítjük az adatot a klienseknek
-            if self.server and self.server.active:
-                self.server.broadcast(dg)
+
+            # 4. Távoli hálózati hajók: interpoláció a jitter bufferből, utána a lézereik
+            self.interpolate_remote_ships(now)
+            self.draw_remote_lasers(now)
 
         return Task.cont
 
-    def update_remote_ship(self, sender_id, x, y, z):
+    def interpolate_remote_ships(self, now):
+        """Távoli hálózati hajók pozíciója a jitter bufferből, INTERP_DELAY-jel lemaradva."""
+        for sender_id, buffer in self.remote_buffers.items():
+            ship = self.remote_ships.get(sender_id)
+            sampled = buffer.sample(now)
+            if ship and ship.root and sampled:
+                ship.root.setPosHpr(*sampled[0], *sampled[1])
+                ship.sync_spatial()
+
+    def net_time(self):
+        """A hálózati időbélyegek órája (a capture visszajátszás virtuális órára cseréli)."""
+        return globalClock.getRealTime()
+
+    def network_tick(self):
+        """
+        Hálózati tick-enként (nem frame-enként!) lefutó állapotgyűjtés.
+        A küldést a tick végén a kliens/szerver flush-a végzi.
+        """
+        if not self.local_ship:
+            return
+
+        ticker = self.net_ticker()
+
+        # Transzform szinkronizálása: kvantált, delta kódolt snapshot
+        pos = self.local_ship.get_pos() - self.get_system_origin()
+        hpr = self.local_ship.get_hpr()
+        now = globalClock.getRealTime()
+        vel = Vec3(0, 0, 0)
+        if self._last_net_sample:
+            last_time, last_pos = self._last_net_sample
+            if now > last_time:
+                vel = (pos - last_pos) / (now - last_time)
+        self._last_net_sample = (now, Vec3(pos))
+
+        system_id = self.get_current_system_id()
+        stats = self.net_stats()
+        reckoner = self.dead_reckoning
+        if reckoner is not None and not reckoner.should_send(now, pos, hpr, system_id):
+            reckoner.on_suppressed()
+            if stats is not None:
+                stats.record_suppressed(None, MSG_SNAPSHOT, reckoner.last_size)
+        else:
+            state = quantize_state(pos, hpr, vel, system_id)
+            if stats is None:
+                snapshot_dg = create_snapshot_datagram(self.my_id, self.snapshot_encoder, ticker.tick_count, state)
+            else:
+                start = time.perf_counter()
+                snapshot_dg = create_snapshot_datagram(self.my_id, self.snapshot_encoder, ticker.tick_count, state)
+                stats.record_time(None, MSG_SNAPSHOT, "encode", time.perf_counter() - start)
+            if reckoner is not None:
+                reckoner.on_sent(now, pos, hpr, vel, system_id, snapshot_dg.getLength())
+            self.send_to_network(snapshot_dg, reliable=False)
+
+        # Harci lézer állapot: aktív lézernél minden tick-ben, hogy egy elveszett csomag ne ragadjon be.
+        # A célpont ID csak hálózati hajónál megy, különben a fogadó előre rajzolja a sugarat
+        laser_active = bool(self.combat_system and self.combat_system.laser_active)
+        if laser_active or self._laser_sent:
+            target = g.SELECTED_TARGET
+            target_id = 0
+            if laser_active and isinstance(target, Ship) and self.remote_ships.get(target.id) is target:
+                target_id = target.id
+            self.send_to_network(create_laser_datagram(self.my_id, laser_active, target_id), reliable=False)
+            self._laser_sent = laser_active
+
+        # Óra szinkron, majd a tick alatt gyűlt találatok a látott szerver tick-kel
+        if now >= self._next_clock_sync:
+            self._next_clock_sync = now + NET_CLOCK_SYNC_INTERVAL
+            self.send_to_network(self.client.clock_sync_datagram(self.my_id))
+        if self.pending_hits:
+            view_tick = self.client.clock_sync.view_tick(self.net_time(), NET_INTERP_DELAY)
+            if view_tick is not None:
+                for target_id, damage in self.pending_hits.items():
+                    self.send_to_network(create_hit_claim(self.my_id, target_id, view_tick, damage))
+            self.pending_hits.clear()
+
+        # A kapott snapshotok visszaigazolása (ezekhez kódolnak deltát a többiek)
+        ack_dg = self.client.take_ack_datagram(self.my_id)
+        if ack_dg:
+            self.send_to_network(ack_dg, reliable=False)
+
+    def send_to_network(self, dg, reliable=True):
+        """
+        Host módban közvetlenül a klienseknek, egyébként a szervernek küldjük.
+        reliable=False esetén a gyakori, elavuló állapotok az UDP csatornán mennek.
+        """
+        if self.server and self.server.active:
+            self.server.receive(dg)
+        elif reliable:
+            self.client.send(dg)
+        else:
+            self.client.send_unreliable(dg)
+
+    def get_current_system_id(self):
+        galaxy = getattr(self, 'galaxy', None)
+        if galaxy and galaxy.current_system_id is not None:
+            return galaxy.current_system_id
+        return 0
+
+    def get_system_origin(self):
+        """Az aktuális naprendszer origója, a snapshotok pozíciója ehhez relatív."""
+        galaxy = getattr(self, 'galaxy', None)
+        if galaxy and galaxy.current_system_id is not None:
+            return galaxy.systems[galaxy.current_system_id].root.getPos(self.render)
+        return Vec3(0, 0, 0)
+
+    def get_net_tick_rate(self):
+        """Az elért hálózati tick frekvencia (Hz)."""
+        return self.net_ticker().achieved_rate
+
+    def net_stats(self):
+        """A hálózati mérések (NetStats) forrása; None, ha a NET_STATS ki van kapcsolva."""
+        if self.server and self.server.active:
+            return self.server.stats
+        return self.client.stats
+
+    def net_ticker(self):
+        """Host módban a szerver, egyébként a kliens órája hajtja a küldést."""
+        if self.server and self.server.active:
+            return self.server.ticker
+        return self.client.ticker
+
+    def apply_remote_snapshot(self, sender_id, seq, state):
+        """
+        Dekódolt (kvantált) snapshot betétele a távoli hajó jitter bufferébe.
+        A tényleges pozíciót az update_loop interpolálja.
+        """
+        if sender_id == self.my_id:
+            return
+        pos, hpr, vel, system_id = dequantize_state(state)
+        origin = self.get_system_origin()
+        world_pos = (pos[0] + origin.x, pos[1] + origin.y, pos[2] + origin.z)
+
+        buffer = self.remote_buffers.get(sender_id)
+        if buffer is None or sender_id not in self.remote_ships:
+            # Első snapshot: azonnal a helyére tesszük, innentől interpolálunk
+            self.update_remote_ship(sender_id, *world_pos, hpr, vel)
+            buffer = self.remote_buffers[sender_id] = SnapshotBuffer()
+        else:
+            self.remote_ships[sender_id].remote_velocity = Vec3(*vel)
+        buffer.push(seq, world_pos, hpr, vel, self.net_time())
+
+    def update_remote_ship(self, sender_id, x, y, z, hpr=None, vel=None):
         """Új távoli hálózati játékos kezelése (nem a drone horda része)."""
         if sender_id == self.my_id:
             return 
@@ -230,9 +521,13 @@ class CerberusGame(ShowBase):
             print(f"[NET] Új játékos észlelve: ID {sender_id}")
             new_ship = Ship(self, sender_id, is_local=False, name=f"Pilóta-{sender_id}", ship_type="Drón")
             self.remote_ships[sender_id] = new_ship
-            
-            # Ha mi vagyunk a Host, elküldjük neki a mi felszerelésünket is
-            if self.server and self.server.active:
-                self.sync_my_equipment()
+            # A már ismert felszerelés (világállapotból vagy korábbi szinkronból)
+            for type_name, equipment_obj in self.remote_equipment.get(sender_id, {}).items():
+                self._equip_remote(new_ship, type_name, equipment_obj)
         
-        self.remote_ships[sender_id].set_pos(x, y, z)
\ No newline at end of file
+        ship = self.remote_ships[sender_id]
+        ship.set_pos(x, y, z)
+        if hpr is not None and ship.root:
+            ship.root.setHpr(*hpr)
+        if vel is not None:
+            ship.remote_velocity = Vec3(*vel)
\ No newline at end of file
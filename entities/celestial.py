@@ -78,7 +78,7 @@ class Debris(Entity):
     def __init__(self, manager, entity_id, resource_type, position):
         super().__init__(manager, entity_id, f"Loot_{resource_type}", entity_type="Loot")
         
-        self.root.setPos(position)
+        self.set_pos(position)
         self.resource_type = resource_type
         
         # 1. Vizuális rész: Zöld kocka
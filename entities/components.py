@@ -17,9 +17,13 @@ class RelicType:
 # ==============================================================================
 # COMPONENT CLASSES (Felszerelés Osztályok)
 # ==============================================================================
+# Minden osztály __slots__-ot használ: hajónként több alkatrész, több ezer hajó esetén
+# a példányonkénti __dict__ elhagyása jelentős memória, és az attribútum elérés is gyorsabb.
+# Új mezőhöz a __slots__-ot is bővíteni kell! (Mérés: python -m entities.components)
 
 class ShipComponent:
     """Alap osztály a hajó alkatrészeinek"""
+    __slots__ = ("name",)
     def __init__(self, name="Alkatrész"):
         self.name = name
 
@@ -28,6 +32,7 @@ class ShipComponent:
 
 class WeaponMount(ShipComponent):
     """Fegyver foglalat: Sebzés, lőtáv, újratöltés"""
+    __slots__ = ("damage_type", "damage", "range", "cooldown", "last_fire")
     def __init__(self, name="Alap Lézer", damage_type=DamageType.THERMIC, damage=10.0, range=100.0, cooldown=1.0):
         super().__init__(name)
         self.damage_type = damage_type
@@ -38,6 +43,7 @@ class WeaponMount(ShipComponent):
 
 class TacticalSlot(ShipComponent):
     """Taktikai modul: Speciális effektek (pl. gyorsító, zavaró)"""
+    __slots__ = ("effect_type", "value")
     def __init__(self, name="Szenzor Erősítő", effect_type="scan_range", value=1.5):
         super().__init__(name)
         self.effect_type = effect_type # pl. 'speed_boost', 'scan_range', 'jamming'
@@ -45,6 +51,7 @@ class TacticalSlot(ShipComponent):
 
 class ArmorSlot(ShipComponent):
     """Páncélzat: Extra védelem és ellenállás"""
+    __slots__ = ("armor_hp", "resistance_bonus")
     def __init__(self, name="Nanofiber Páncél", armor_hp=100.0, resistance_type=DamageType.IMPACT, resistance_val=0.1):
         super().__init__(name)
         self.armor_hp = armor_hp
@@ -53,6 +60,7 @@ class ArmorSlot(ShipComponent):
 
 class HullAugment(ShipComponent):
     """Burkolat kiegészítő: Strukturális épség és passzív bónuszok"""
+    __slots__ = ("hull_hp", "agility_penalty")
     def __init__(self, name="Szerkezeti Merevítő", hull_hp=200.0, agility_penalty=0.0):
         super().__init__(name)
         self.hull_hp = hull_hp
@@ -60,6 +68,7 @@ class HullAugment(ShipComponent):
 
 class RelicSlot(ShipComponent):
     """Ősi technológia: Különleges módosítók"""
+    __slots__ = ("relic_type", "modifiers")
     def __init__(self, name="Ismeretlen Ereklye", relic_type=RelicType.PASSIVE, modifiers=None):
         super().__init__(name)
         self.relic_type = relic_type
@@ -68,6 +77,7 @@ class RelicSlot(ShipComponent):
 
 class MiningLaser(ShipComponent):
     """Bányászati lézer: Hatótáv és hozam"""
+    __slots__ = ("range", "resource_yield", "resource_type")
     def __init__(self, name="Bányász Lézer", range=200.0, resource_yield=10, type="Veldspar"):
         super().__init__(name)
         self.range = range
@@ -76,6 +86,7 @@ class MiningLaser(ShipComponent):
 
 class Component:
     """Base class for all ship components."""
+    __slots__ = ("name", "level", "ship")
     def __init__(self, name, level):
         self.name = name
         self.level = level
@@ -88,6 +99,7 @@ class Component:
         self.ship = None
 
 class Engine(Component):
+    __slots__ = ("max_speed", "acceleration", "turn_rate")
     def __init__(self, name, level, max_speed, acceleration, turn_rate):
         super().__init__(name, level)
         self.max_speed = max_speed
@@ -95,6 +107,7 @@ class Engine(Component):
         self.turn_rate = turn_rate
 
 class Weapon(Component):
+    __slots__ = ("damage", "fire_rate", "range", "last_fired")
     def __init__(self, name, level, damage, fire_rate, range):
         super().__init__(name, level)
         self.damage = damage
@@ -103,12 +116,115 @@ class Weapon(Component):
         self.last_fired = 0
 
 class Shield(Component):
+    __slots__ = ("capacity", "recharge_rate")
     def __init__(self, name, level, capacity, recharge_rate):
         super().__init__(name, level)
         self.capacity = capacity
         self.recharge_rate = recharge_rate
 
 class Cargo(Component):
+    __slots__ = ("capacity",)
     def __init__(self, name, level, capacity):
         super().__init__(name, level)
-        self.capacity = capacity
\ No newline at end of file
+        self.capacity = capacity
+
+# ==============================================================================
+# MEMÓRIA MÉRÉS (python -m entities.components)
+# ==============================================================================
+
+class _Plain:
+    """Összehasonlítási alap: ugyanazok a mezők egy példányonkénti __dict__-ben."""
+
+
+def _slot_descriptors(cls):
+    """(név, member descriptor) párok a teljes öröklési láncból."""
+    for klass in cls.__mro__:
+        for name in klass.__dict__.get("__slots__", ()):
+            yield name, klass.__dict__[name]
+
+
+def _clone(obj):
+    """Példány másolat __init__ nélkül; a slotokat a descriptoron át írjuk (a property-ket kikerülve)."""
+    new = type(obj).__new__(type(obj))
+    for name, descriptor in _slot_descriptors(type(obj)):
+        try:
+            descriptor.__set__(new, descriptor.__get__(obj))
+        except AttributeError:
+            pass
+    if hasattr(obj, "__dict__"):
+        new.__dict__.update(obj.__dict__)
+    return new
+
+
+def _plain_copy(obj):
+    plain = _Plain()
+    for name, descriptor in _slot_descriptors(type(obj)):
+        try:
+            plain.__dict__[name] = descriptor.__get__(obj)
+        except AttributeError:
+            pass
+    if hasattr(obj, "__dict__"):
+        plain.__dict__.update(obj.__dict__)
+    return plain
+
+
+def _bytes_per_instance(factory, count):
+    import tracemalloc
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = [factory() for _ in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return round(used / count, 1), items
+
+
+def _access_ns(items, names, rounds=5):
+    import time
+    from operator import attrgetter
+    getter = attrgetter(*names)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        for obj in items:
+            getter(obj)
+        best = min(best, time.perf_counter_ns() - start)
+    return round(best / len(items), 2)
+
+
+def benchmark(ships=10000, components=100000):
+    """Példányonkénti memória és attribútum elérési idő: slotok vs. __dict__ (azonos mezőkkel)."""
+    from entities.Skills import Skill
+    from entities.ship import Ship
+
+    prototypes = {
+        "Engine": (Engine("Standard Thruster", 1, 20.0, 50.0, 3.0), components, ("max_speed", "acceleration")),
+        "Shield": (Shield("Basic Shield", 1, 500.0, 5.0), components, ("capacity", "recharge_rate")),
+        "WeaponMount": (WeaponMount(), components, ("damage", "cooldown")),
+        "Skill": (Skill("Gunnery"), ships, ("level", "_dmgRailgun")),
+        "Ship": (Ship(None, 1, name="Bench"), ships, ("is_local", "shields")),
+    }
+    results = {}
+    for name, (proto, count, fields) in prototypes.items():
+        slotted, slotted_items = _bytes_per_instance(lambda: _clone(proto), count)
+        plain, plain_items = _bytes_per_instance(lambda: _plain_copy(proto), count)
+        results[name] = {
+            "count": count,
+            "slots_bytes": slotted,
+            "dict_bytes": plain,
+            "saved_mb": round((plain - slotted) * count / 2 ** 20, 2),
+            "slots_access_ns": _access_ns(slotted_items, fields),
+            "dict_access_ns": _access_ns(plain_items, fields),
+        }
+    prototypes["Ship"][0].destroy()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="__slots__ memória mérés")
+    parser.add_argument("--ships", type=int, default=10000)
+    parser.add_argument("--components", type=int, default=100000)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.ships, args.components), indent=2))
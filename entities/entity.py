@@ -2,16 +2,24 @@
 
 from direct.showbase.DirectObject import DirectObject
 from panda3d.core import NodePath, Vec3
-import uuid
 import globals as g
+from entities.spatial import SPATIAL_INDEX
 
 class Entity(DirectObject):
     """
     Base class for all game entities (ships, stations, celestials, etc.)
     """
+    # A fix mezők slotokban; a DirectObject alaposztály miatt a __dict__ megmarad
+    # az eseti (rendszerek által ráaggatott) attribútumoknak
+    __slots__ = ("id", "handle", "manager", "name", "entity_type", "app", "root", "model",
+                 "components", "is_active", "max_hull", "current_hull")
+
     def __init__(self, manager, entity_id=None, name="Unknown", entity_type="Static", model_path=None, scale=1.0):
-        # Ha nincs megadva ID, generalunk egyet
-        self.id = entity_id if entity_id else str(uuid.uuid4())
+        # 32 bites handle (index + generáció); ha nincs megadva ID, ez lesz az ID is.
+        # Az alosztály már előre kérhetett handle-t (a Ship a tároló sorához)
+        if getattr(self, "handle", None) is None:
+            self.handle = g.ENTITIES.handles.allocate(self)
+        self.id = entity_id if entity_id else self.handle
         self.manager = manager
         self.name = name
         self.entity_type = entity_type
@@ -44,8 +52,9 @@ class Entity(DirectObject):
         self.max_hull = 100.0
         self.current_hull = 100.0
         
-        # REGISZTRÁCIÓ a globális tárolóba
-        g.ENTITIES[self.id] = self
+        # REGISZTRÁCIÓ a globális tárolóba és a térbeli indexbe
+        g.ENTITIES.add(self)
+        SPATIAL_INDEX.insert(self.id, self.get_world_pos(), self, self.entity_type)
 
     def update(self, dt):
         """
@@ -61,8 +70,8 @@ class Entity(DirectObject):
             print(f"[Entity] Destroying: {self.name} ({self.id})")
 
         # 1. TÖRLÉS a globális ENTITIES listából
-        if self.id in g.ENTITIES:
-            del g.ENTITIES[self.id]
+        g.ENTITIES.remove(self.id, self)
+        SPATIAL_INDEX.remove(self.id)
         
         self.is_active = False
         
@@ -88,6 +97,25 @@ class Entity(DirectObject):
                 self.root.setPos(x)
             else:
                 self.root.setPos(x, y, z)
+            self.sync_spatial()
+
+    def set_active(self, active):
+        """Aktív / alvó állapot (pl. a naprendszer betöltése), a registry indexével együtt."""
+        self.is_active = active
+        g.ENTITIES.set_active(self.id, active)
+
+    def get_world_pos(self):
+        """Pozíció a render-hez képest (a naprendszer alá akasztott entitásoknál is)."""
+        if self.root is None:
+            return Vec3(0, 0, 0)
+        if self.app:
+            return self.root.getPos(self.app.render)
+        return self.root.getPos()
+
+    def sync_spatial(self):
+        """A térbeli index frissítése, ha a NodePath-ot közvetlenül mozgatták."""
+        if self.root:
+            SPATIAL_INDEX.move(self.id, self.get_world_pos())
 
     def get_hpr(self):
         """Wrapper for NodePath getHpr"""
@@ -4,15 +4,50 @@ import random
 from panda3d.core import Vec3, CollisionNode, CollisionSphere, CollisionRay, CollisionHandlerQueue, BitMask32
 from entities.entity import Entity
 from entities.components import Engine, Weapon, Shield, Cargo
+from entities.store import SHIP_STORE, NO_ITEM
 import globals as g
 from panda3d.core import Material
 from panda3d.core import TextureStage, TexGenAttrib # Fontos az új import!
+
+
+def _column(name):
+    """
+    Attribútum, ami a hajó SHIP_STORE sorában tárolt oszlop értékét olvassa/írja.
+    Elavult nézetnél (megsemmisült hajó, a sor handle-je már másé) az olvasás 0,
+    az írás no-op: a sort már egy másik hajó kaphatta meg.
+    """
+    def getter(self):
+        row = self._live_row()
+        return 0.0 if row is None else float(getattr(SHIP_STORE, name)[row])
+
+    def setter(self, value):
+        row = self._live_row()
+        if row is not None:
+            getattr(SHIP_STORE, name)[row] = value
+    return property(getter, setter)
+
+
 class Ship(Entity):
+    # Az állapot a SHIP_STORE oszlopaiban él, a Ship csak nézet a saját sorára
+    max_hull = _column("max_hull")
+    current_hull = _column("hull")
+    max_shield = _column("max_shield")
+    current_shield = _column("shield")
+
+    __slots__ = ("row", "node", "is_local", "ship_type", "engines", "weapons", "shields", "cargos",
+                 "core", "support", "system", "is_mining", "is_tractoring", "ray_queue", "picker_ray",
+                 "c_np", "picker_np")
+
     def __init__(self, manager, ship_id, is_local=False, name="Unknown", ship_type="Unknown"):
+        # A sor az Entity előtt kell: az Entity.__init__ már a hull értékeket írja.
+        # A sort a handle címzi, ezért azt is itt kérjük (az Entity átveszi)
+        self.handle = g.ENTITIES.handles.allocate(self)
+        self.row = SHIP_STORE.allocate(self.handle, ship_id, self)
         # Az Entity létrehozza a self.root-ot
         super().__init__(manager, ship_id, name, entity_type="Ship")
 
         self.node = self.root
+        SHIP_STORE.nodes[self.row] = self.root
         self.is_local = is_local
         self.ship_type = ship_type
         self.model = None  # Kezdetben nincs vizuális megjelenés
@@ -24,6 +59,11 @@ class Ship(Entity):
         self.current_hull = 1000.0
         self.max_shield = 0.0
         self.current_shield = 0.0
+
+        # Felszerelt modulok (components.Core/Support/System), a hálózaton ID-vel hivatkozunk rájuk
+        self.core = None
+        self.support = None
+        self.system = None
         
         # Eszközök állapota
         self.is_mining = False
@@ -77,10 +117,12 @@ class Ship(Entity):
             if self.is_mining: self.fire_laser(dt)
             if self.is_tractoring: self.use_tractor_beam(dt)
         
-        # Pajzs regeneráció
-        for s in self.shields:
-            if self.current_shield < self.max_shield:
-                self.current_shield = min(self.max_shield, self.current_shield + s.recharge_rate * dt)
+        # Pajzs regeneráció (a felszerelt pajzsok recharge_rate összege, lásd recalculate_stats)
+        row = self._live_row()
+        if row is None:
+            return
+        store = SHIP_STORE
+        store.shield[row] = min(store.max_shield[row], store.shield[row] + store.shield_regen[row] * dt)
 
     def fire_laser(self, dt):
         """Lézeres bányászat logika."""
@@ -118,13 +160,50 @@ class Ship(Entity):
         elif isinstance(c, Shield): self.shields.append(c)
         c.on_mount(self)
 
+    def equip_core(self, core):
+        self.core = core
+        self._set_column(SHIP_STORE.core_id, _item_id(core))
+
+    def equip_support(self, support):
+        self.support = support
+        self._set_column(SHIP_STORE.support_id, _item_id(support))
+
+    def equip_system(self, system):
+        self.system = system
+        self._set_column(SHIP_STORE.system_id, _item_id(system))
+
+    def _live_row(self):
+        """A hajó sora, ha a nézet még érvényes (a sor handle-je a miénk), különben None."""
+        row = self.row
+        return row if SHIP_STORE.owns(row, self.handle) else None
+
+    def _set_column(self, column, value):
+        """Írás a hajó sorába; elavult nézetnél nem csinál semmit."""
+        row = self._live_row()
+        if row is not None:
+            column[row] = value
+
+    @property
+    def remote_velocity(self):
+        row = self._live_row()
+        if row is None:
+            return Vec3(0, 0, 0)
+        return Vec3(*SHIP_STORE.vel[row])
+
+    @remote_velocity.setter
+    def remote_velocity(self, vel):
+        self._set_column(SHIP_STORE.vel, (vel[0], vel[1], vel[2]))
+
     def recalculate_stats(self):
         """Összesített statisztikák újraszámolása."""
         self.max_shield = sum(s.capacity for s in self.shields)
         self.current_shield = min(self.current_shield, self.max_shield)
+        self._set_column(SHIP_STORE.shield_regen, sum(s.recharge_rate for s in self.shields))
 
     def take_damage(self, amount):
         """Sérüléskezelés sorrendje: Pajzs -> Hull."""
+        if self._live_row() is None:
+            return
         if self.current_shield >= amount: 
             self.current_shield -= amount
         else:
@@ -139,6 +218,20 @@ class Ship(Entity):
         if self.app: 
             self.app.messenger.send(g.EVENT_SHIP_DESTROYED, [self.id])
         super().destroy()
+        # A sor a release után bármikor egy másik hajóé lehet: a nézet innentől nem ír bele
+        if self._live_row() is not None:
+            SHIP_STORE.release(self.row)
+        self.row = None
+
+    def sync_spatial(self):
+        """
+        A térbeli index és a tároló pos oszlopának frissítése a NodePath-ból. Minden nem
+        ShipManager-es mozgatás (set_pos, setPos proxy, hálózati setPosHpr) ezen megy át.
+        """
+        super().sync_spatial()
+        if self.root:
+            pos = self.root.getPos()
+            self._set_column(SHIP_STORE.pos, (pos[0], pos[1], pos[2]))
 
     # --- NodePath Proxy Metódusok a MovingSystem hibáinak elkerülésére ---
     # Ez lehetővé teszi, hogy a Ship objektumot közvetlenül NodePath-ként kezeljük a mozgásnál.
@@ -154,14 +247,17 @@ class Ship(Entity):
                 new_args = list(args)
                 new_args[0] = first_arg.root
                 self.root.setPos(*new_args)
+                self.sync_spatial()
                 return
             elif hasattr(first_arg, 'node'):
                 new_args = list(args)
                 new_args[0] = first_arg.node
                 self.root.setPos(*new_args)
+                self.sync_spatial()
                 return
                 
         self.root.setPos(*args)
+        self.sync_spatial()
 
     def setH(self, val): self.root.setH(val)
     def setR(self, val): self.root.setR(val)
@@ -169,4 +265,9 @@ class Ship(Entity):
     def getH(self): return self.root.getH()
     def getR(self): return self.root.getR()
     def getP(self): return self.root.getP()
-    def getPos(self): return self.root.getPos()
\ No newline at end of file
+    def getPos(self): return self.root.getPos()
+
+
+def _item_id(item):
+    item_id = getattr(item, "id", None)
+    return item_id if isinstance(item_id, int) else NO_ITEM
\ No newline at end of file
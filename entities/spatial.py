@@ -0,0 +1,281 @@
+# Cerberus/entities/spatial.py
+"""
+Egyenletes rácsú térbeli hash a g.ENTITIES entitásaihoz.
+
+A teret SPATIAL_CELL_SIZE élű kockákra osztjuk; minden cella az épp benne lévő entitás
+ID-k halmaza. Mozgáskor csak cellaváltásnál nyúlunk a halmazokhoz, így az Entity.set_pos
+és a mozgató rendszerek frissítése O(1). A lekérdezések (query_radius, query_box,
+k_nearest) csak a releváns cellákat nézik végig, nem az összes entitást.
+
+A pozíciók világkoordináták (a render-hez képest), az Entity.sync_spatial tartja
+naprakészen. Benchmark a lineáris kereséssel szemben: python -m entities.spatial
+"""
+import heapq
+import itertools
+import math
+
+from globals import SPATIAL_CELL_SIZE
+
+
+class SpatialHash:
+    def __init__(self, cell_size=SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self.inv_cell = 1.0 / cell_size
+        self.cells = {}      # (ix, iy, iz) -> {entity_id}
+        self.positions = {}  # entity_id -> (x, y, z)
+        self.cell_of = {}    # entity_id -> (ix, iy, iz)
+        self.objects = {}    # entity_id -> entitás (ezt adják vissza a lekérdezések)
+        self.types = {}      # entity_type -> {entity_id}
+        self.type_of = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, entity_id):
+        return entity_id in self.positions
+
+    def _key(self, x, y, z):
+        inv = self.inv_cell
+        return math.floor(x * inv), math.floor(y * inv), math.floor(z * inv)
+
+    # --- Karbantartás ---
+    def insert(self, entity_id, pos, obj=None, entity_type=None):
+        if entity_id in self.positions:
+            self.remove(entity_id)
+        x, y, z = pos[0], pos[1], pos[2]
+        key = self._key(x, y, z)
+        self.positions[entity_id] = (x, y, z)
+        self.cell_of[entity_id] = key
+        self.cells.setdefault(key, set()).add(entity_id)
+        self.objects[entity_id] = entity_id if obj is None else obj
+        self.type_of[entity_id] = entity_type
+        self.types.setdefault(entity_type, set()).add(entity_id)
+
+    def move(self, entity_id, pos):
+        """Pozíció frissítése; a cella halmazokhoz csak cellaváltáskor nyúlunk."""
+        old_key = self.cell_of.get(entity_id)
+        if old_key is None:
+            return
+        x, y, z = pos[0], pos[1], pos[2]
+        self.positions[entity_id] = (x, y, z)
+        key = self._key(x, y, z)
+        if key != old_key:
+            cell = self.cells[old_key]
+            cell.discard(entity_id)
+            if not cell:
+                del self.cells[old_key]
+            self.cells.setdefault(key, set()).add(entity_id)
+            self.cell_of[entity_id] = key
+
+    def move_many(self, entity_ids, positions):
+        move = self.move
+        for entity_id, pos in zip(entity_ids, positions):
+            move(entity_id, pos)
+
+    def remove(self, entity_id):
+        key = self.cell_of.pop(entity_id, None)
+        if key is None:
+            return
+        cell = self.cells[key]
+        cell.discard(entity_id)
+        if not cell:
+            del self.cells[key]
+        del self.positions[entity_id]
+        del self.objects[entity_id]
+        entity_type = self.type_of.pop(entity_id)
+        ids = self.types[entity_type]
+        ids.discard(entity_id)
+        if not ids:
+            del self.types[entity_type]
+
+    def clear(self):
+        for mapping in (self.cells, self.positions, self.cell_of, self.objects, self.types, self.type_of):
+            mapping.clear()
+
+    # --- Lekérdezések ---
+    def _candidates(self, lo, hi):
+        """A (lo, hi) cella tartományt lefedő ID-k; ha a tartomány nagyobb, mint a foglalt cellák száma, azokon megyünk végig."""
+        span = (hi[0] - lo[0] + 1) * (hi[1] - lo[1] + 1) * (hi[2] - lo[2] + 1)
+        cells = self.cells
+        if span > len(cells):
+            for (ix, iy, iz), ids in cells.items():
+                if lo[0] <= ix <= hi[0] and lo[1] <= iy <= hi[1] and lo[2] <= iz <= hi[2]:
+                    yield from ids
+            return
+        for ix in range(lo[0], hi[0] + 1):
+            for iy in range(lo[1], hi[1] + 1):
+                for iz in range(lo[2], hi[2] + 1):
+                    ids = cells.get((ix, iy, iz))
+                    if ids:
+                        yield from ids
+
+    def _type_filter(self, entity_type):
+        if entity_type is None:
+            return None
+        if isinstance(entity_type, str):
+            return self.types.get(entity_type, ())
+        allowed = set()
+        for name in entity_type:
+            allowed.update(self.types.get(name, ()))
+        return allowed
+
+    def query_radius(self, center, radius, entity_type=None, only=None):
+        """
+        A center körüli radius sugarú gömbben lévő entitások (entity_type: név vagy nevek listája).
+        only: ha meg van adva, csak az ebben szereplő ID-k (pl. g.ENTITIES.active_ids()).
+        """
+        cx, cy, cz = center[0], center[1], center[2]
+        lo = self._key(cx - radius, cy - radius, cz - radius)
+        hi = self._key(cx + radius, cy + radius, cz + radius)
+        allowed = self._type_filter(entity_type)
+        r2 = radius * radius
+        positions, objects = self.positions, self.objects
+        result = []
+        for entity_id in self._candidates(lo, hi):
+            if (allowed is not None and entity_id not in allowed) or (only is not None and entity_id not in only):
+                continue
+            x, y, z = positions[entity_id]
+            dx, dy, dz = x - cx, y - cy, z - cz
+            if dx * dx + dy * dy + dz * dz <= r2:
+                result.append(objects[entity_id])
+        return result
+
+    def query_box(self, lo, hi, entity_type=None):
+        """A (lo, hi) tengelyekkel párhuzamos dobozban lévő entitások."""
+        allowed = self._type_filter(entity_type)
+        positions, objects = self.positions, self.objects
+        result = []
+        for entity_id in self._candidates(self._key(*lo), self._key(*hi)):
+            if allowed is not None and entity_id not in allowed:
+                continue
+            x, y, z = positions[entity_id]
+            if lo[0] <= x <= hi[0] and lo[1] <= y <= hi[1] and lo[2] <= z <= hi[2]:
+                result.append(objects[entity_id])
+        return result
+
+    def k_nearest(self, center, k, entity_type=None, max_radius=None, exclude=None, only=None):
+        """
+        A k legközelebbi entitás távolság szerint növekvő sorrendben (only: mint a query_radius-nál).
+        A szűrés a keresésen belül történik, így a kiszűrt entitások nem foglalnak helyet a k-ból.
+        A center cellájából gyűrűnként haladunk kifelé; megállunk, ha a k-adik találat
+        közelebb van, mint a még meg nem vizsgált gyűrűk legközelebbi pontja.
+        """
+        if k <= 0:
+            return []
+        cx, cy, cz = center[0], center[1], center[2]
+        allowed = self._type_filter(entity_type)
+        positions, cells = self.positions, self.cells
+        limit2 = math.inf if max_radius is None else max_radius * max_radius
+        ox, oy, oz = self._key(cx, cy, cz)
+        best = []  # max-heap (-d2, sorszám, id) a k legjobbhoz; a sorszám miatt az ID-k típusa mindegy
+        order = itertools.count()
+
+        def consider(entity_id):
+            if (entity_id == exclude or (allowed is not None and entity_id not in allowed)
+                    or (only is not None and entity_id not in only)):
+                return
+            x, y, z = positions[entity_id]
+            dx, dy, dz = x - cx, y - cy, z - cz
+            d2 = dx * dx + dy * dy + dz * dz
+            if d2 > limit2:
+                return
+            if len(best) < k:
+                heapq.heappush(best, (-d2, next(order), entity_id))
+            elif d2 < -best[0][0]:
+                heapq.heapreplace(best, (-d2, next(order), entity_id))
+
+        ring = 0
+        while True:
+            # A még be nem járt (ring-edik és külsőbb) gyűrűk pontjai legalább ennyire vannak
+            reach = max(0, ring - 1) * self.cell_size
+            if len(best) == k and -best[0][0] <= reach * reach:
+                break
+            if reach * reach > limit2:
+                break
+            if (2 * ring + 1) ** 3 > len(cells):
+                # A gyűrűk már több cellát fednének le, mint amennyi foglalt: a maradékot egyben nézzük
+                for (ix, iy, iz), ids in cells.items():
+                    if max(abs(ix - ox), abs(iy - oy), abs(iz - oz)) >= ring:
+                        for entity_id in ids:
+                            consider(entity_id)
+                break
+            for ix in range(ox - ring, ox + ring + 1):
+                edge_x = ix == ox - ring or ix == ox + ring
+                for iy in range(oy - ring, oy + ring + 1):
+                    edge_y = edge_x or iy == oy - ring or iy == oy + ring
+                    # A gyűrű belsejét már korábban bejártuk, ott csak a két z határ kell
+                    zs = range(oz - ring, oz + ring + 1) if edge_y else (oz - ring, oz + ring)
+                    for iz in zs:
+                        ids = cells.get((ix, iy, iz))
+                        if ids:
+                            for entity_id in ids:
+                                consider(entity_id)
+            ring += 1
+
+        objects = self.objects
+        return [objects[entry[2]] for entry in sorted(best, key=lambda e: -e[0])]
+
+    def query_by_type(self, entity_type):
+        objects = self.objects
+        return [objects[entity_id] for entity_id in self.types.get(entity_type, ())]
+
+
+# A g.ENTITIES térbeli indexe; az Entity regisztrálja / frissíti / törli magát
+SPATIAL_INDEX = SpatialHash()
+
+
+def benchmark(counts=(1000, 10000, 100000), queries=200, extent=5000.0, radius=250.0, k=8):
+    """A rács lekérdezések ideje a lineáris kereséshez képest (ms / lekérdezés)."""
+    import random
+    import time
+
+    rng = random.Random(1)
+    results = {}
+    for n in counts:
+        index = SpatialHash()
+        points = {}
+        for i in range(n):
+            p = (rng.uniform(-extent, extent), rng.uniform(-extent, extent), rng.uniform(-extent / 10, extent / 10))
+            points[i] = p
+            index.insert(i, p, entity_type="Ship" if i % 2 else "Asteroid")
+        centers = [(rng.uniform(-extent, extent), rng.uniform(-extent, extent), 0.0) for _ in range(queries)]
+
+        def linear_radius(c):
+            r2 = radius * radius
+            return [i for i, (x, y, z) in points.items() if (x - c[0]) ** 2 + (y - c[1]) ** 2 + (z - c[2]) ** 2 <= r2]
+
+        def linear_nearest(c):
+            return heapq.nsmallest(k, points, key=lambda i: (points[i][0] - c[0]) ** 2 + (points[i][1] - c[1]) ** 2 + (points[i][2] - c[2]) ** 2)
+
+        def timed(fn):
+            start = time.perf_counter()
+            for c in centers:
+                fn(c)
+            return round((time.perf_counter() - start) / queries * 1000.0, 4)
+
+        moves = [(rng.randrange(n), (rng.uniform(-extent, extent), rng.uniform(-extent, extent), 0.0)) for _ in range(queries * 10)]
+        start = time.perf_counter()
+        for i, p in moves:
+            index.move(i, p)
+            points[i] = p
+        move_us = round((time.perf_counter() - start) / len(moves) * 1e6, 3)
+
+        results[n] = {
+            "radius_grid_ms": timed(lambda c: index.query_radius(c, radius)),
+            "radius_linear_ms": timed(linear_radius),
+            "knn_grid_ms": timed(lambda c: index.k_nearest(c, k)),
+            "knn_linear_ms": timed(linear_nearest),
+            "move_us": move_us,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Térbeli hash benchmark (lineáris kereséssel összevetve)")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.counts, args.queries), indent=2))
@@ -0,0 +1,148 @@
+# Cerberus/entities/store.py
+"""
+Structure-of-arrays tároló a hajók állapotához.
+
+Minden hajó egy sort kap; az oszlopok sűrű NumPy tömbök (pozíció, sebesség, hull,
+pajzs, pajzs regeneráció, felszerelés ID-k), így a rendszerek több ezer hajót egyetlen
+vektorizált művelettel frissíthetnek. A Ship osztály csak egy vékony nézet a saját
+sorára: a current_hull / current_shield / ... attribútumai az oszlopokba írnak.
+
+A sorok stabilak: egy hajó sora a megsemmisítéséig nem változik (a felszabadult sorokat
+újrahasznosítjuk, bővítéskor a tömbök mérete duplázódik, a sorindexek megmaradnak).
+
+A sorokat az entitás handle-je (utils/handles.py) címzi: a handle indexe közvetlenül
+a row_by_index tömbbe mutat, a sor handles oszlopa pedig a teljes handle-t tárolja, így
+egy megsemmisült hajó régi handle-je / nézete a generáció eltérésén elbukik.
+"""
+from array import array
+
+import numpy as np
+
+from utils.handles import INDEX_MASK, NULL_HANDLE
+
+NO_ITEM = -1
+NO_ROW = -1
+
+
+class ShipStore:
+    def __init__(self, capacity=256):
+        self.capacity = 0
+        self.count = 0
+        self.row_by_index = array("i")  # handle index -> sor (NO_ROW = nincs)
+        self.free = []
+        self.entity_ids = []  # sor -> entity_id (a térbeli index és a naplók miatt)
+        self.ships = []      # sor -> Ship (vagy None)
+        self.nodes = []      # sor -> NodePath (a batch transzform íráshoz)
+
+        self.alive = np.zeros(0, dtype=bool)
+        self.handles = np.zeros(0, dtype=np.uint32)  # sor -> a tulajdonos teljes handle-je (NULL_HANDLE = üres)
+        # A NodePath (szülőhöz képesti) pozíciója: a drónoknál a ShipManager integrálja,
+        # minden más mozgatás (set_pos, setPos proxy, hálózati setPosHpr) a Ship.sync_spatial-on át írja
+        self.pos = np.zeros((0, 3), dtype=np.float32)
+        self.vel = np.zeros((0, 3), dtype=np.float32)
+        self.hull = np.zeros(0, dtype=np.float32)
+        self.max_hull = np.zeros(0, dtype=np.float32)
+        self.shield = np.zeros(0, dtype=np.float32)
+        self.max_shield = np.zeros(0, dtype=np.float32)
+        self.shield_regen = np.zeros(0, dtype=np.float32)  # a felszerelt pajzsok recharge_rate összege
+        # Felszerelés katalógus ID-k (NO_ITEM = üres slot)
+        self.core_id = np.zeros(0, dtype=np.int32)
+        self.support_id = np.zeros(0, dtype=np.int32)
+        self.system_id = np.zeros(0, dtype=np.int32)
+        self._grow(capacity)
+
+    COLUMNS = ("alive", "handles", "pos", "vel", "hull", "max_hull", "shield", "max_shield", "shield_regen",
+               "core_id", "support_id", "system_id")
+
+    def _grow(self, capacity):
+        added = capacity - self.capacity
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self.capacity] = column
+            setattr(self, name, grown)
+        for name in ("core_id", "support_id", "system_id"):
+            getattr(self, name)[self.capacity:] = NO_ITEM
+        self.entity_ids.extend([None] * added)
+        self.ships.extend([None] * added)
+        self.nodes.extend([None] * added)
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def allocate(self, handle, entity_id, ship=None):
+        """Új sor a handle-höz (az oszlopok nullázva); visszatérés: a sor indexe."""
+        if not self.free:
+            self._grow(self.capacity * 2)
+        row = self.free.pop()
+        index = handle & INDEX_MASK
+        if index >= len(self.row_by_index):
+            self.row_by_index.extend(array("i", [NO_ROW]) * (index + 1 - len(self.row_by_index)))
+        self.row_by_index[index] = row
+        self.handles[row] = handle
+        self.entity_ids[row] = entity_id
+        self.ships[row] = ship
+        self.alive[row] = True
+        self.count += 1
+        return row
+
+    def release(self, row):
+        if not self.alive[row]:
+            return
+        index = int(self.handles[row]) & INDEX_MASK
+        if index < len(self.row_by_index) and self.row_by_index[index] == row:
+            self.row_by_index[index] = NO_ROW
+        self.entity_ids[row] = None
+        self.ships[row] = None
+        self.nodes[row] = None
+        for name in self.COLUMNS:
+            getattr(self, name)[row] = 0
+        for name in ("core_id", "support_id", "system_id"):
+            getattr(self, name)[row] = NO_ITEM
+        self.free.append(row)
+        self.count -= 1
+
+    def row_of(self, handle):
+        """A handle sora közvetlen indexeléssel, vagy None, ha a handle elavult / nincs sora."""
+        index = handle & INDEX_MASK
+        if index >= len(self.row_by_index):
+            return None
+        row = self.row_by_index[index]
+        if row == NO_ROW or handle == NULL_HANDLE or self.handles[row] != handle:
+            return None
+        return row
+
+    def owns(self, row, handle):
+        """Igaz, ha a sor még a handle tulajdonosáé (a generáció is egyezik)."""
+        return row is not None and handle != NULL_HANDLE and self.handles[row] == handle
+
+    def live_rows(self):
+        return np.flatnonzero(self.alive)
+
+    # --- Vektorizált rendszer műveletek ---
+    def integrate(self, rows, dt):
+        """pos += vel * dt a megadott sorokra; visszatérés: maszk a ténylegesen mozgó sorokra."""
+        moving = np.any(self.vel[rows] != 0.0, axis=1)
+        active = rows[moving]
+        self.pos[active] += self.vel[active] * dt
+        return moving
+
+    def regen_shields(self, rows, dt, rate=None):
+        """Pajzs regeneráció a max_shield-ig (rate=None: a sorok saját shield_regen értéke)."""
+        gain = (self.shield_regen[rows] if rate is None else rate) * dt
+        self.shield[rows] = np.minimum(self.max_shield[rows], self.shield[rows] + gain)
+
+    def distance_sq(self, rows, point):
+        d = self.pos[rows] - np.asarray(point, dtype=np.float32)
+        return np.einsum("ij,ij->i", d, d)
+
+    def push_transforms(self, rows):
+        """Egyetlen menetben a scene graph-ba írja a sorok pozícióját."""
+        nodes = self.nodes
+        for row, (x, y, z) in zip(rows.tolist(), self.pos[rows].tolist()):
+            node = nodes[row]
+            if node is not None:
+                node.setPos(x, y, z)
+
+
+# A g.ENTITIES-hez hasonló folyamat szintű tároló; minden Ship ide kerül
+SHIP_STORE = ShipStore()
@@ -1,5 +1,6 @@
 # Cerberus/globals.py
 from panda3d.core import BitMask32
+from utils.registry import EntityRegistry
 
 MASK_WALL = BitMask32.bit(0)
 MASK_ASTEROID = BitMask32.bit(1)
@@ -16,6 +17,14 @@ LASER_DAMAGE = 1000.0
 TRACTOR_SPEED = 40.0
 LASER_RANGE = 500.0
 
+# Hajó LOD (systems/ship_manager.py)
+SHIP_LOD_NEAR = 800.0        # ezen belül minden frame-ben teljes frissítés
+SHIP_LOD_MID = 2500.0        # ezen belül csak pajzs regeneráció és transzform
+SHIP_LOD_MID_INTERVAL = 5    # a közepes hajók frame-enként 1/5-e frissül (elosztva, nem egyszerre)
+SHIP_LOD_FAR_INTERVAL = 30   # a távoli hajók transzformja ennyi frame-enként (elosztva)
+SHIP_LOD_MID_REGEN = 1.0     # pajzs / mp a közepes sávban
+SPATIAL_CELL_SIZE = 250.0    # entities/spatial.py rács cellamérete (egység)
+
 
 
 # Kepernyo beallitasok
@@ -47,8 +56,31 @@ MASK_ENVIRONMENT = 0x4
 
 # Hálózati beállítások
 PORT = 9099
+UDP_PORT = 9100  # Nem megbízható csatorna a gyakori állapotokhoz (pozíció, lézer)
 MAX_PLAYERS = 8
 MAX_RENDER_DISTANCE = 5000.0
+NET_TICK_RATE = 30  # Hz, a render frame rate-től független küldési frekvencia
+NET_INTERP_DELAY = 0.1  # mp, ennyivel a legfrissebb snapshot mögött rajzoljuk a távoli hajókat
+NET_MAX_EXTRAPOLATION = 0.25  # mp, késő csomagnál legfeljebb eddig extrapolálunk
+NET_STATS = False  # kapcsolatonkénti/üzenet típusonkénti mérések (overlay: F3)
+NET_STATS_DUMP = "netstats_{role}.jsonl"  # JSON lines dump (None = nincs dump)
+NET_STATS_INTERVAL = 1.0  # mp, a dump gyakorisága
+NET_DISPATCH_BUDGET = 0.004  # mp, frame-enként ennyi ideig dolgozzuk fel a beérkezett üzeneteket
+NET_BACKLOG_LIMIT = 2048  # ennél hosszabb backlognál a legrégebbi elavuló üzeneteket eldobjuk
+NET_CAPTURE = None  # pl. "capture_{role}.cap": minden datagram rögzítése (net/capture.py)
+NET_SEND_BUDGET = 32768  # bájt / tick / kliens a szerver kimenő sorából
+NET_SEND_QUEUE_LIMIT = 262144  # bájt; felette az elavuló állapotokat eldobjuk
+NET_BACKEND = "panda"  # "panda" (QueuedConnection pollolás) vagy "asyncio" (háttérszálas I/O, csak TCP)
+NET_SHARD_WORKERS = 4  # net/shard.py: worker folyamatok száma (naprendszer ID modulo)
+NET_HISTORY_SECONDS = 1.0  # mp, a szerver ennyi transzform előzményt tart (lag compensation)
+NET_CLOCK_SYNC_INTERVAL = 1.0  # mp, kliens óra szinkron gyakorisága
+NET_HIT_TOLERANCE = 0.1  # a visszatekert találat távolságának tűrése (LASER_RANGE arányában)
+NET_DAMAGE_BURST = 0.5  # mp-nyi lézer sebzés gyűlhet fel lövőnként (a claimek torlódása miatt)
+NET_DEAD_RECKONING = True  # snapshot csak ha a fogadók becslése túl nagyot tévedne (vagy heartbeat)
+NET_DR_POS_ERROR = 0.5  # egység, megengedett pozíció eltérés a becsléstől
+NET_DR_ANGLE_ERROR = 2.0  # fok, megengedett orientáció eltérés
+NET_DR_HEARTBEAT = 1.0  # mp, legalább ilyen gyakran küldünk
+NET_INTEREST_MARGIN = 100.0  # egység, ennyi extrapolált elmozdulás után ellenőrizzük újra a hajó AOI-ját
 
 # Galaxis generálás
 NUM_SYSTEMS = 100
@@ -57,9 +89,9 @@ NEIGHBOR_COUNT = 3
 MAP_SCALE = 0.001
 MAP_SIZE = 0.3
 
-# Központi entitás tároló
-# Key: Entity ID (UID), Value: Entity object instance
-ENTITIES = {}
+# Központi entitás tároló (utils/registry.py)
+# Key: Entity ID (UID), Value: Entity object instance; típus / naprendszer / aktív indexekkel
+ENTITIES = EntityRegistry()
 
 def log_entity_count():
     """
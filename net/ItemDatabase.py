@@ -1,5 +1,6 @@
 import json
 import os
+import zlib
 # Javított importok: abszolút elérési utat használunk a 'data' mappából
 from components.Core import ShipCore
 from components.Support import ShipSupport
@@ -10,6 +11,9 @@ class ItemDatabase:
         self.cores = {}
         self.systems = {}
         self.supports = {}
+        # A betöltött katalógus tartalmának hash-e; a hivatkozásos (ID alapú)
+        # szinkronizáció csak azonos katalógusú peerek között működik
+        self.catalog_hash = 0
 
     def load_from_json(self, file_path):
         """Betölti az összes tárgyat a megadott JSON fájlból."""
@@ -19,7 +23,9 @@ class ItemDatabase:
 
         with open(file_path, 'r', encoding='utf-8') as f:
             try:
-                data = json.load(f)
+                raw = f.read()
+                data = json.loads(raw)
+                self.catalog_hash = zlib.crc32(raw.encode('utf-8'))
                 
                 # Core-ok betöltése
                 for item_data in data.get("cores", []):
@@ -48,4 +54,18 @@ class ItemDatabase:
         return self.systems.get(item_id)
 
     def get_support(self, item_id):
-        return self.supports.get(item_id)
\ No newline at end of file
+        return self.supports.get(item_id)
+
+    def lookup(self, slot, item_id):
+        """Tárgy keresése slot név ("core"/"support"/"system") és ID alapján."""
+        if slot == "core":
+            return self.get_core(item_id)
+        if slot == "support":
+            return self.get_support(item_id)
+        if slot == "system":
+            return self.get_system(item_id)
+        return None
+
+    def is_catalog_item(self, slot, item):
+        """Igaz, ha a tárgy változatlanul szerepel a katalógusban (elég az ID-t küldeni)."""
+        return item is not None and self.lookup(slot, item.id) == item
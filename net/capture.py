@@ -0,0 +1,333 @@
+"""
+Hálózati forgalom rögzítése és determinisztikus visszajátszása (regressziós benchmarkhoz).
+
+Fájlformátum (little-endian):
+    fejléc:  8 bájt MAGIC, Uint8 szerep (0 = szerver, 1 = kliens), Uint16 saját ship ID
+    rekord:  Uint32 eltelt idő az előző rekord óta (us), Uint8 irány, Uint16 kapcsolat ID,
+             Uint16 hossz, majd az adat
+Irányok: IN / OUT datagram, CONNECT / DISCONNECT (adat nélkül). A kapcsolat ID-k
+a rögzítés sorrendjében kiosztott kis egészek, a 0 a Host helyi játéka.
+
+Visszajátszás virtuális órával: a hálózati tick és a frame-ek a rögzített időbélyegek
+szerint futnak, így ugyanarra a capture-re minden futás ugyanazt az eredményt adja
+(a kimenet SHA1 lenyomatát kiírjuk). --speed 0 a maximális sebesség.
+
+Használat:
+    python -m net.capture replay capture_server.cap
+    python -m net.capture replay capture_client.cap --speed 1
+    python -m net.capture info capture_server.cap
+"""
+import argparse
+import atexit
+import hashlib
+import struct
+import sys
+import time
+from pathlib import Path
+
+MAGIC = b"CRBCAP1\0"
+HEADER = struct.Struct("<8sBH")
+RECORD = struct.Struct("<IBHH")
+
+ROLE_SERVER = 0
+ROLE_CLIENT = 1
+
+DIR_IN = 0
+DIR_OUT = 1
+DIR_CONNECT = 2
+DIR_DISCONNECT = 3
+
+REPLAY_FRAME_RATE = 60.0
+FLUSH_INTERVAL = 1.0  # mp; ennél régebbi adat nem maradhat a fájl pufferében
+
+
+class CaptureWriter:
+    """
+    Rögzítő fájl. A puffert FLUSH_INTERVAL-onként kiírjuk, és kilépéskor (atexit) is
+    lezárjuk, így egy leállított folyamat capture-jéből legfeljebb az utolsó mp hiányzik.
+    """
+    def __init__(self, path, role, owner_id=0, clock=time.perf_counter, flush_interval=FLUSH_INTERVAL):
+        self.clock = clock
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, role, owner_id))
+        self.conn_ids = {None: 0}
+        self.records = 0
+        self.flush_interval = flush_interval
+        self._last = clock()
+        self._flushed = self._last
+        atexit.register(self.close)
+
+    def conn_id(self, conn):
+        conn_id = self.conn_ids.get(conn)
+        if conn_id is None:
+            conn_id = self.conn_ids[conn] = len(self.conn_ids)
+        return conn_id
+
+    def record(self, direction, conn, data=b""):
+        now = self.clock()
+        delta = min(int((now - self._last) * 1e6), 0xFFFFFFFF)
+        self._last = now
+        self.file.write(RECORD.pack(delta, direction, self.conn_id(conn), len(data)))
+        if data:
+            self.file.write(data)
+        self.records += 1
+        if now - self._flushed >= self.flush_interval:
+            self._flushed = now
+            self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+        atexit.unregister(self.close)
+
+
+def read_capture(path):
+    """Visszatérés: (szerep, owner_id, rekord generátor); a rekord (t, irány, kapcsolat ID, adat)."""
+    f = open(path, "rb")
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        f.close()
+        raise ValueError(f"Csonka capture fejléc: {path}")
+    magic, role, owner_id = HEADER.unpack(header)
+    if magic != MAGIC:
+        f.close()
+        raise ValueError(f"Nem capture fájl: {path}")
+
+    def records():
+        t = 0.0
+        with f:
+            while True:
+                head = f.read(RECORD.size)
+                if len(head) < RECORD.size:
+                    return
+                delta, direction, conn_id, size = RECORD.unpack(head)
+                data = f.read(size)
+                if len(data) < size:
+                    # Csonka utolsó rekord (a rögzítő folyamat a kiírás közben állt le)
+                    return
+                t += delta / 1e6
+                yield t, direction, conn_id, data
+
+    return role, owner_id, records()
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ReplayConnection:
+    """A GameServer asyncio ágán át kapja a kimenő adatot (send/flush), és lenyomatot készít róla."""
+    def __init__(self, conn_id, sink):
+        self.conn_id = conn_id
+        self.sink = sink
+        self.address = ("replay", conn_id)
+
+    def send(self, data):
+        self.sink.update(self.conn_id, data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplaySink:
+    def __init__(self):
+        self.digest = hashlib.sha1()
+        self.datagrams = 0
+        self.bytes = 0
+
+    def update(self, conn_id, data):
+        self.digest.update(conn_id.to_bytes(2, "little"))
+        self.digest.update(data)
+        self.datagrams += 1
+        self.bytes += len(data)
+
+
+class ReplayHost:
+    """
+    A Host helyi játékának helyettesítője (0. kapcsolat): a GameServer.deliver(None)
+    a manager.client.process_msg-et hívja, ez a kimenetet a lenyomatba írja.
+    """
+    def __init__(self, sink):
+        self.client = self
+        self.sink = sink
+
+    def process_msg(self, datagram):
+        self.sink.update(0, datagram.getMessage())
+
+
+def _pace(t, speed, wall_start):
+    if speed:
+        delay = wall_start + t / speed - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def replay_server(records, speed=0.0):
+    """A rögzített bejövő forgalom lejátszása egy socket nélküli GameServer-en."""
+    from direct.distributed.PyDatagram import PyDatagram
+    from net.server import GameServer
+    from net.ticker import NetworkTicker
+
+    clock = VirtualClock()
+    server = GameServer(manager=None)
+    server.ticker = NetworkTicker(rate_hz=server.ticker.rate_hz, flush_callback=server.flush, clock=clock)
+    server.ticker.add_listener(server.record_history)
+    server.ticker.add_listener(server.refresh_interest)
+    sink = ReplaySink()
+    server.transport = sink  # a flush így a ReplayConnection.send()-et hívja
+
+    conns = {}
+    recorded_out = [0, 0]
+    inbound = 0
+    busy = 0.0
+    frame = 1.0 / REPLAY_FRAME_RATE
+    next_frame = 0.0
+    wall_start = time.perf_counter()
+
+    for t, direction, conn_id, data in records:
+        while next_frame <= t:
+            clock.now = next_frame
+            start = time.perf_counter()
+            server.ticker.update(next_frame)
+            busy += time.perf_counter() - start
+            next_frame += frame
+        clock.now = t
+        _pace(t, speed, wall_start)
+
+        if conn_id == 0 and server.manager is None:
+            # Host módban készült capture: a helyi játék a None kapcsolat, a kimenete a lenyomatba megy
+            server.manager = ReplayHost(sink)
+        if direction == DIR_OUT:
+            recorded_out[0] += 1
+            recorded_out[1] += len(data)
+            continue
+        start = time.perf_counter()
+        if direction == DIR_CONNECT:
+            conns[conn_id] = ReplayConnection(conn_id, sink)
+            server.add_client(conns[conn_id])
+        elif direction == DIR_DISCONNECT:
+            if conn_id in conns:
+                server.remove_client(conns.pop(conn_id))
+        elif conn_id == 0 or conn_id in conns:
+            inbound += 1
+            server.relay(PyDatagram(data), conns.get(conn_id))
+        busy += time.perf_counter() - start
+
+    clock.now = next_frame
+    server.ticker.update(next_frame)
+    return {
+        "inbound": inbound,
+        "busy": busy,
+        "out_datagrams": sink.datagrams,
+        "out_bytes": sink.bytes,
+        "recorded_out_datagrams": recorded_out[0],
+        "recorded_out_bytes": recorded_out[1],
+        "digest": sink.digest.hexdigest(),
+    }
+
+
+def replay_client(records, owner_id, speed=0.0):
+    """
+    A rögzített bejövő forgalom lejátszása egy headless CerberusGame kliens oldalán:
+    dekódolás, jitter buffer és távoli hajó frissítés (update_remote_ship / interpoláció).
+    """
+    from panda3d.core import loadPrcFileData
+    loadPrcFileData("", "window-type none")
+    loadPrcFileData("", "audio-library-name null")
+    from direct.distributed.PyDatagram import PyDatagram
+    from core.game import CerberusGame
+
+    clock = VirtualClock()
+    game = CerberusGame()
+    game.my_id = owner_id
+    game.net_time = clock  # virtuális óra a jitter bufferhez és az interpolációhoz
+
+    inbound = 0
+    busy = 0.0
+    frame = 1.0 / REPLAY_FRAME_RATE
+    next_frame = 0.0
+    wall_start = time.perf_counter()
+
+    for t, direction, conn_id, data in records:
+        while next_frame <= t:
+            clock.now = next_frame
+            start = time.perf_counter()
+            game.interpolate_remote_ships(next_frame)
+            busy += time.perf_counter() - start
+            next_frame += frame
+        clock.now = t
+        _pace(t, speed, wall_start)
+        if direction != DIR_IN:
+            continue
+        inbound += 1
+        start = time.perf_counter()
+        game.client.process_msg(PyDatagram(data))
+        busy += time.perf_counter() - start
+
+    # A végállapot lenyomata: távoli hajók pozíciója (mm pontossággal)
+    digest = hashlib.sha1()
+    for ship_id in sorted(game.remote_ships):
+        root = getattr(game.remote_ships[ship_id], "root", None)
+        if root is not None:
+            pos = root.getPos()
+            digest.update(struct.pack("<Hiii", ship_id, *(int(round(v * 1000)) for v in pos)))
+    return {"inbound": inbound, "busy": busy, "remote_ships": len(game.remote_ships), "digest": digest.hexdigest()}
+
+
+def print_info(path):
+    role, owner_id, records = read_capture(path)
+    counts = {}
+    duration = 0.0
+    conns = set()
+    for t, direction, conn_id, data in records:
+        duration = t
+        conns.add(conn_id)
+        entry = counts.setdefault(direction, [0, 0])
+        entry[0] += 1
+        entry[1] += len(data)
+    names = {DIR_IN: "be", DIR_OUT: "ki", DIR_CONNECT: "csatlakozás", DIR_DISCONNECT: "bontás"}
+    print(f"{path}: {'szerver' if role == ROLE_SERVER else 'kliens'} (ID {owner_id}), "
+          f"{duration:.1f} mp, {len(conns)} kapcsolat")
+    for direction, (count, size) in sorted(counts.items()):
+        print(f"  {names[direction]:12s} {count:8d} rekord, {size / 1024:10.1f} KB")
+
+
+if __name__ == "__main__":
+    root_path = str(Path(__file__).parent.parent)
+    if root_path not in sys.path:
+        sys.path.append(root_path)
+
+    parser = argparse.ArgumentParser(description="Hálózati capture visszajátszása / vizsgálata")
+    parser.add_argument("command", choices=["replay", "info"])
+    parser.add_argument("path")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = valós idő, 0 = maximális sebesség")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        print_info(args.path)
+        sys.exit(0)
+
+    role, owner_id, records = read_capture(args.path)
+    wall = time.perf_counter()
+    if role == ROLE_SERVER:
+        result = replay_server(records, args.speed)
+    else:
+        result = replay_client(records, owner_id, args.speed)
+    wall = time.perf_counter() - wall
+
+    print(f"[REPLAY] {result['inbound']} bejövő üzenet, {wall:.2f} mp falióra, "
+          f"feldolgozás {result['busy'] * 1000:.1f} ms "
+          f"({result['busy'] / max(1, result['inbound']) * 1e6:.1f} us/üzenet)")
+    if role == ROLE_SERVER:
+        print(f"[REPLAY] kimenet: {result['out_datagrams']} datagram / {result['out_bytes']} bájt "
+              f"(rögzítve: {result['recorded_out_datagrams']} / {result['recorded_out_bytes']})")
+    else:
+        print(f"[REPLAY] távoli hajók: {result['remote_ships']}")
+    print(f"[REPLAY] lenyomat: {result['digest']}")
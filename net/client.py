@@ -1,80 +1,423 @@
-from panda3d.core import QueuedConnectionManager, QueuedConnectionReader, ConnectionWriter, NetDatagram
+from panda3d.core import QueuedConnectionManager, QueuedConnectionReader, ConnectionWriter, NetDatagram, NetAddress
+from direct.distributed.PyDatagram import PyDatagram
 from direct.distributed.PyDatagramIterator import PyDatagramIterator
 from direct.task import Task
-from .protocol import PORT, MSG_POSITION
+import random
+import time
+from collections import deque
+from functools import partial
+from components.Core import ShipCore
+from components.Support import ShipSupport
+from components.System import ShipSystem
+from .protocol import (
+    PORT, MSG_POSITION, MSG_SNAPSHOT, MSG_SNAPSHOT_ACK, MSG_SYNC_CORE, MSG_SYNC_SUPPORT,
+    MSG_SYNC_SYSTEM, MSG_SYNC_EQUIP_REF, MSG_SYNC_FULL_REQUEST, MSG_LOGIN, MSG_CLOCK_SYNC, MSG_DAMAGE,
+    MSG_ENTITY_ENTER, MSG_ENTITY_LEAVE, MSG_BATCH, MSG_UDP_HELLO, MSG_LASER_STATE, UNRELIABLE_MSGS,
+    read_snapshot, read_ack_entries, create_ack_datagram, create_udp_hello, pack_batches, iter_batch,
+    create_equipment_datagrams, read_equipment_refs, create_full_sync_request, create_login_datagram,
+    read_world_state, read_clock_sync_reply, create_clock_sync_request, create_clock_echo
+)
+from .lagcomp import ClockSync
+from .snapshot import SnapshotDecoder
+from .ticker import NetworkTicker
+from .transport import AsyncioTransport, EVENT_DATA, EVENT_CLOSE
+from .netstats import NetStats, MSG_NAMES, measured_batches
+from .dispatch import MessageDispatcher
+from .capture import CaptureWriter, ROLE_CLIENT, DIR_IN, DIR_OUT
+from globals import (
+    UDP_PORT, NET_BACKEND, NET_STATS, NET_STATS_DUMP, NET_STATS_INTERVAL, NET_DISPATCH_BUDGET, NET_BACKLOG_LIMIT
+)
 
 class GameClient:
-    def __init__(self, game_core):
+    def __init__(self, game_core, backend=NET_BACKEND):
         self.game = game_core
         self.cManager = QueuedConnectionManager()
         self.cReader = QueuedConnectionReader(self.cManager, 0)
         self.cWriter = ConnectionWriter(self.cManager, 0)
         self.connection = None
 
-    def connect(self, ip):
+        # Kimenő sor: a tick alatt gyűlik, a tick végén egyetlen flush-sal megy ki
+        self.outbox = []
+        self.ticker = NetworkTicker(flush_callback=self.flush)
+
+        # Nem megbízható UDP csatorna a gyakori állapotokhoz; amíg a szerver nem
+        # igazolja vissza (MSG_UDP_HELLO), ezek is a TCP kapcsolaton mennek
+        self.udp_connection = None
+        self.udp_address = None
+        self.udp_token = random.getrandbits(32)
+        self.udp_confirmed = False
+        self.udp_outbox = []
+
+        # Távoli entitásonkénti snapshot dekóderek és a még el nem küldött visszaigazolások
+        self.snapshot_decoders = {}
+        self.pending_acks = {}
+
+        # Részletes mérések (NET_STATS); kikapcsolva None
+        self.stats = NetStats() if NET_STATS else None
+        # Forgalom rögzítése visszajátszáshoz (start_capture), kikapcsolva None
+        self.capture = None
+
+        # Üzenet ID -> kezelő tábla; a beérkezett, még fel nem dolgozott datagramok backlogja
+        self.dispatcher = MessageDispatcher()
+        for msg_type, handler in (
+            (MSG_BATCH, self._on_batch),
+            (MSG_SNAPSHOT, self._on_snapshot),
+            (MSG_SNAPSHOT_ACK, self._on_snapshot_ack),
+            (MSG_LASER_STATE, self._on_laser_state),
+            (MSG_UDP_HELLO, self._on_udp_hello),
+            (MSG_ENTITY_ENTER, self._on_entity_enter),
+            (MSG_ENTITY_LEAVE, self._on_entity_leave),
+            (MSG_POSITION, self._on_position),
+            (MSG_SYNC_CORE, partial(self._on_equipment, "core", ShipCore)),
+            (MSG_SYNC_SUPPORT, partial(self._on_equipment, "support", ShipSupport)),
+            (MSG_SYNC_SYSTEM, partial(self._on_equipment, "system", ShipSystem)),
+            (MSG_SYNC_EQUIP_REF, self._on_equipment_ref),
+            (MSG_SYNC_FULL_REQUEST, self._on_full_sync_request),
+            (MSG_LOGIN, self._on_login),
+            (MSG_CLOCK_SYNC, self._on_clock_sync),
+            (MSG_DAMAGE, self._on_damage),
+        ):
+            self.dispatcher.register(msg_type, handler)
+        self.backlog = deque()  # (érkezési idő, datagram, UDP-n jött-e)
+
+        # Szerver tick becslés a lag compensation-höz (melyik tick-et látja a játékos)
+        self.clock_sync = ClockSync()
+
+        # Asyncio backend: háttérszálas TCP I/O, a frame csak a kész üzeneteket veszi át
+        self.transport = AsyncioTransport() if backend == "asyncio" else None
+
+    def _connect_asyncio(self, ip):
+        # Az asyncio backend csak TCP-t kezel, az UDP csatorna ilyenkor nem nyílik meg
+        self.connection = self.transport.connect(ip, PORT)
+        if self.connection:
+            taskMgr.add(self.transport_task, "ClientNetworkTask")
+            taskMgr.add(self.ticker.task, "ClientNetworkTickTask")
+            self._start_instrumentation()
+            print(f"[CLIENT] Sikeres csatlakozás: {ip} (asyncio backend)")
+            return True
+        return False
+
+    def connect(self, ip, udp_port=UDP_PORT):
+        if self.transport is not None:
+            return self._connect_asyncio(ip)
         self.connection = self.cManager.openTCPClientConnection(ip, PORT, 3000)
         if self.connection:
+            # A TCP írásokat összegyűjtjük, a flush() küldi ki őket egyben
+            self.connection.setCollectTcp(True)
+            self.connection.setCollectTcpInterval(self.ticker.interval)
             self.cReader.addConnection(self.connection)
+
+            # UDP socket tetszőleges helyi porton; a szerver a HELLO alapján rendeli hozzánk
+            self.udp_connection = self.cManager.openUDPConnection(0)
+            if self.udp_connection:
+                self.cReader.addConnection(self.udp_connection)
+                self.udp_address = NetAddress()
+                self.udp_address.setHost(ip, udp_port)
             taskMgr.add(self.network_task, "ClientNetworkTask")
+            taskMgr.add(self.ticker.task, "ClientNetworkTickTask")
+            self._start_instrumentation()
             print(f"[CLIENT] Sikeres csatlakozás: {ip}")
             return True
         return False
 
+    def _start_instrumentation(self):
+        if self.stats is None:
+            return
+        self.stats.set_label(self.connection, "tcp")
+        self.stats.add_section("dispatch", self.dispatch_stats)
+        if self.udp_connection:
+            self.stats.set_label(self.udp_connection, "udp")
+        if NET_STATS_DUMP:
+            taskMgr.doMethodLater(NET_STATS_INTERVAL, self.stats.dump_task(NET_STATS_DUMP.format(role="client")),
+                                  "ClientNetStatsDump")
+
+    def start_capture(self, path, owner_id):
+        self.capture = CaptureWriter(path, ROLE_CLIENT, owner_id)
+        print(f"[CLIENT] Forgalom rögzítése: {path}")
+
+    def stop_capture(self):
+        if self.capture is not None:
+            self.capture.close()
+            print(f"[CLIENT] Rögzítés lezárva: {self.capture.records} rekord.")
+            self.capture = None
+
     def send(self, datagram):
+        """Datagram sorba állítása, a következő hálózati tick-ben megy ki."""
         if self.connection:
-            self.cWriter.send(datagram, self.connection, True)
+            self.outbox.append(datagram)
+
+    def send_unreliable(self, datagram):
+        """Gyakori, elavuló állapot (pozíció, lézer): UDP-n megy, ha a csatorna már él."""
+        if not self.connection:
+            return
+        if self.udp_confirmed:
+            self.udp_outbox.append(datagram)
+        else:
+            self.outbox.append(datagram)
+
+    def flush(self):
+        """A tick alatt összegyűlt datagramok kiküldése egyetlen flush-sal."""
+        if not self.connection:
+            return
+
+        # Másodpercenként HELLO, amíg a szerver vissza nem igazolja az UDP csatornát
+        if self.udp_connection and not self.udp_confirmed and self.game.my_id:
+            if (self.ticker.tick_count - 1) % max(1, int(self.ticker.rate_hz)) == 0:
+                hello = create_udp_hello(self.game.my_id, self.udp_token)
+                self.outbox.append(hello)
+                self.cWriter.send(hello, self.udp_connection, self.udp_address)
+
+        if self.udp_outbox:
+            for datagram in self._batches(self.udp_outbox, self.udp_connection):
+                if self.capture is not None:
+                    self.capture.record(DIR_OUT, self.udp_connection, datagram.getMessage())
+                self.cWriter.send(datagram, self.udp_connection, self.udp_address)
+            self.udp_outbox.clear()
+
+        if not self.outbox:
+            return
+        for datagram in self._batches(self.outbox, self.connection):
+            if self.capture is not None:
+                self.capture.record(DIR_OUT, self.connection, datagram.getMessage())
+            if self.transport is not None:
+                self.connection.send(datagram.getMessage())
+            else:
+                self.cWriter.send(datagram, self.connection, True)
+        self.outbox.clear()
+        self.connection.flush()
+
+    def _batches(self, queue, conn):
+        if self.stats is None:
+            return pack_batches(queue)
+        return measured_batches(self.stats, conn, queue)
 
     def network_task(self, task):
+        """A beérkezett datagramok a backlog végére kerülnek, a feldolgozás időkerettel fut."""
+        now = time.perf_counter()
+        stats = self.stats
         while self.cReader.dataAvailable():
             datagram = NetDatagram()
             if self.cReader.getData(datagram):
-                self.process_msg(datagram)
+                if stats is not None:
+                    stats.record_in(datagram.getConnection(), None, datagram.getLength())
+                if self.capture is not None:
+                    self.capture.record(DIR_IN, datagram.getConnection(), datagram.getMessage())
+                self.backlog.append((now, datagram, datagram.getConnection() == self.udp_connection))
+        self.process_backlog(now)
         return Task.cont
 
-    def process_msg(self, datagram):
-        iterator = PyDatagramIterator(datagram)
-        msg_type = iterator.getUint8()
+    def transport_task(self, task):
+        now = time.perf_counter()
+        for event, conn, data in self.transport.poll():
+            if event == EVENT_DATA:
+                if self.stats is not None:
+                    self.stats.record_in(conn, None, len(data))
+                if self.capture is not None:
+                    self.capture.record(DIR_IN, conn, data)
+                self.backlog.append((now, PyDatagram(data), False))
+            elif event == EVENT_CLOSE:
+                print("[CLIENT] A szerver bontotta a kapcsolatot.")
+                self.connection = None
+        self.process_backlog(now)
+        return Task.cont
+
+    def process_backlog(self, now):
+        """
+        Feldolgozás a frame-enkénti időkeretig (NET_DISPATCH_BUDGET); ami kimarad,
+        a következő frame-ben folytatódik, így egy csomag-löket nem akasztja meg a renderelést.
+        """
+        backlog = self.backlog
+        if len(backlog) > NET_BACKLOG_LIMIT:
+            self._shed_backlog()
+        dispatcher = self.dispatcher
+        if len(backlog) > dispatcher.backlog_peak:
+            dispatcher.backlog_peak = len(backlog)
+        if self.stats is not None:
+            self.stats.record_queue_depth(len(backlog))
+
+        deadline = now + NET_DISPATCH_BUDGET
+        late_after = self.ticker.interval
+        while backlog:
+            arrival, datagram, _ = backlog.popleft()
+            msg_type = self.process_msg(datagram)
+            if now - arrival > late_after:
+                dispatcher.late[msg_type] += 1
+            if time.perf_counter() >= deadline:
+                break
 
-        if msg_type == MSG_POSITION:
-            sender_id = iterator.getUint16()
-            x = iterator.getFloat64()
-            y = iterator.getFloat64()
-            z = iterator.getFloat64()
-            
-            # Kliens oldali logika: frissítjük a távoli hajót
-            self.game.update_remote_ship(sender_id, x, y, z)
-
-            # Ha mi vagyunk a Host, továbbítanunk kell (Relay)
-            if self.game.server and self.game.server.active:
-                # A Datagram már tartalmazza a nyers adatot, továbbküldjük
-                self.game.server.broadcast(datagram, exclude_conn=datagram.getConnection())
-
-    def send_ship_setup(self, ship_id, core_obj, support_obj, system_obj):
-        """Elküldi a teljes felszerelést a szervernek"""
-        # 1. Core küldése
-        dg = PyDatagram()
-        dg.addUint8(MSG_SYNC_CORE)
-        dg.addUint16(ship_id)
-        core_obj.pack(dg)
-        self.send(dg)
-
-        # 2. Support küldése
-        dg = PyDatagram()
-        dg.addUint8(MSG_SYNC_SUPPORT)
-        dg.addUint16(ship_id)
-        support_obj.pack(dg)
-        self.send(dg)
+    def _shed_backlog(self):
+        """
+        Túlcsordult backlog: a legrégebbi elavuló üzeneteket (UDP-n jött vagy UNRELIABLE_MSGS)
+        eldobjuk, ezeket úgyis felülírja a következő tick. A megbízhatóakat soha.
+        """
+        excess = len(self.backlog) - NET_BACKLOG_LIMIT
+        kept = deque()
+        for entry in self.backlog:
+            datagram = entry[1]
+            msg_type = datagram.getMessage()[0]
+            if excess > 0 and (entry[2] or msg_type in UNRELIABLE_MSGS):
+                self.dispatcher.dropped[msg_type] += 1
+                excess -= 1
+                continue
+            kept.append(entry)
+        self.backlog = kept
+
+    def dispatch_stats(self):
+        """Backlog és típusonkénti késés/eldobás számlálók a NetStats dumphoz."""
+        names = lambda counts: {MSG_NAMES.get(t, str(t)): n for t, n in counts.items()}
+        return {
+            "backlog": len(self.backlog),
+            "backlog_peak": self.dispatcher.backlog_peak,
+            "late": names(self.dispatcher.late),
+            "dropped": names(self.dispatcher.dropped),
+        }
 
     def process_msg(self, datagram):
+        """Egy datagram azonnali feldolgozása; visszatérés: az üzenet típusa."""
+        stats = self.stats
+        if stats is None:
+            iterator = PyDatagramIterator(datagram)
+            msg_type = iterator.getUint8()
+            self.dispatcher.dispatch(msg_type, iterator)
+            return msg_type
+        start = time.perf_counter()
         iterator = PyDatagramIterator(datagram)
         msg_type = iterator.getUint8()
+        self.dispatcher.dispatch(msg_type, iterator)
+        stats.record_time(self.connection, msg_type, "decode", time.perf_counter() - start)
+        stats.record_in(self.connection, msg_type, datagram.getLength())
+        return msg_type
+
+    # --- Üzenet kezelők (a típus byte utáni iterátort kapják) ---
+    def _on_batch(self, iterator):
+        for sub_datagram in iter_batch(iterator):
+            self.process_msg(sub_datagram)
+
+    def _on_snapshot(self, iterator):
+        sender_id = iterator.getUint16()
+        decoder = self.snapshot_decoders.get(sender_id)
+        if decoder is None:
+            decoder = self.snapshot_decoders[sender_id] = SnapshotDecoder()
+        result = read_snapshot(iterator, decoder)
+        if result is None:
+            # Hiányzó baseline vagy elavult csomag: a következő kulcskockát várjuk
+            return
+        seq, state = result
+        self.pending_acks[sender_id] = seq
+        self.game.apply_remote_snapshot(sender_id, seq, state)
+
+    def _on_snapshot_ack(self, iterator):
+        acker_id = iterator.getUint16()
+        for entity_id, seq in read_ack_entries(iterator):
+            if entity_id == self.game.my_id:
+                self.game.snapshot_encoder.on_ack(acker_id, seq)
+
+    def _on_laser_state(self, iterator):
+        sender_id = iterator.getUint16()
+        active = iterator.getUint8() != 0
+        self.game.set_remote_laser(sender_id, active, iterator.getUint16())
+
+    def _on_udp_hello(self, iterator):
+        if not self.udp_confirmed:
+            self.udp_confirmed = True
+            print("[CLIENT] UDP csatorna aktív.")
+
+    def _on_entity_enter(self, iterator):
+        # Új baseline-t csak a következő kulcskockából kapunk; a belépő is újrakezdi a
+        # dekóderét, így a saját kódolónk a korábbi ACK-jait sem használhatja
+        entity_id = iterator.getUint16()
+        self.snapshot_decoders.pop(entity_id, None)
+        self.game.snapshot_encoder.add_peer(entity_id)
+
+    def _on_entity_leave(self, iterator):
+        entity_id = iterator.getUint16()
+        self.snapshot_decoders.pop(entity_id, None)
+        self.pending_acks.pop(entity_id, None)
+        self.game.snapshot_encoder.forget_peer(entity_id)
+        self.game.remove_remote_ship(entity_id)
+
+    def _on_position(self, iterator):
+        # Régi, kvantálatlan pozíció csomag (visszafelé kompatibilitás)
+        sender_id = iterator.getUint16()
+        x = iterator.getFloat64()
+        y = iterator.getFloat64()
+        z = iterator.getFloat64()
+        self.game.update_remote_ship(sender_id, x, y, z)
+
+    def _on_equipment(self, slot, item_cls, iterator):
+        target_ship_id = iterator.getUint16()
+        item = item_cls.unpack(iterator)
+        self.game.update_remote_equipment(target_ship_id, slot, item)
+
+    def _on_equipment_ref(self, iterator):
+        target_ship_id = iterator.getUint16()
+        catalog_hash, refs = read_equipment_refs(iterator)
+        self.resolve_equipment_refs(target_ship_id, catalog_hash, refs)
+
+    def _on_full_sync_request(self, iterator):
+        iterator.getUint16()
+        if iterator.getUint16() == self.game.my_id:
+            self.game.sync_my_equipment(force_full=True)
+
+    def _on_login(self, iterator):
+        # Belépéskori világállapot: transzformok a játéknak, a felszerelés ID-k a katalógusból
+        iterator.getUint16()
+        entities = read_world_state(iterator)
+        self.game.apply_world_state(entities)
+        for record, _ in entities:
+            if record.equipment and record.entity_id != self.game.my_id:
+                self.resolve_equipment_refs(record.entity_id, record.catalog_hash, list(record.equipment.items()))
+
+    def _on_clock_sync(self, iterator):
+        ship_id = iterator.getUint16()
+        client_time, server_tick, tick_rate, server_time = read_clock_sync_reply(iterator)
+        self.clock_sync.on_reply(client_time, server_tick, tick_rate, self.game.net_time())
+        # A szerver a saját idejének visszaérkezéséből méri az RTT-t (a rewind felső korlátja)
+        self.game.send_to_network(create_clock_echo(ship_id, server_time))
+
+    def _on_damage(self, iterator):
+        # A szerver által validált találat
+        target_id = iterator.getUint16()
+        shooter_id = iterator.getUint16()
+        self.game.apply_damage(target_id, shooter_id, iterator.getFloat32())
+
+    def clock_sync_datagram(self, ship_id):
+        return create_clock_sync_request(ship_id, self.game.net_time())
+
+    def send_login(self, ship_id, system_id, pos, hull, shield):
+        """Bejelentkezés: a szerver erre egyetlen világállapot csomaggal válaszol."""
+        self.send(create_login_datagram(ship_id, system_id, pos, hull, shield))
+
+    def resolve_equipment_refs(self, ship_id, catalog_hash, refs):
+        """Hivatkozott tárgyak feloldása a helyi ItemDatabase-ből."""
+        item_db = self.game.item_db
+        if item_db is None or item_db.catalog_hash != catalog_hash:
+            # Eltérő katalógus: a tulajdonostól teljes szerializációt kérünk
+            print(f"[CLIENT] Eltérő tárgy katalógus ({ship_id}), teljes felszerelés kérése.")
+            self.game.send_to_network(create_full_sync_request(self.game.my_id, ship_id))
+            return
+
+        for slot, item_id in refs:
+            item = item_db.lookup(slot, item_id)
+            if item is None:
+                self.game.send_to_network(create_full_sync_request(self.game.my_id, ship_id))
+                return
+            self.game.update_remote_equipment(ship_id, slot, item)
+
+    def take_ack_datagram(self, my_id):
+        """Az utolsó tick óta fogadott snapshotok visszaigazolása egyetlen csomagban."""
+        if not self.pending_acks:
+            return None
+        entries = list(self.pending_acks.items())[:255]
+        for entity_id, _ in entries:
+            del self.pending_acks[entity_id]
+        return create_ack_datagram(my_id, entries)
 
-        if msg_type == MSG_SYNC_CORE:
-            target_ship_id = iterator.getUint16()
-            received_core = Core.unpack(iterator)
-            print(f"Szerver küldte: {target_ship_id} hajó új Core-t kapott: {received_core.name}")
-            self.game.update_remote_equipment(target_ship_id, "core", received_core)
-            
-            # Host/Relay logika
-            if self.game.server and self.game.server.active:
-                self.game.server.broadcast(datagram, exclude_conn=datagram.getConnection())
\ No newline at end of file
+    def send_ship_setup(self, ship_id, core_obj, support_obj, system_obj, force_full=False):
+        """
+        Elküldi a felszerelést a szervernek. A katalógusbeli tárgyakból csak az ID megy,
+        a teljes szerializáció csak egyedi vagy a katalógusban nem szereplő tárgyaknál.
+        """
+        equipment = {"core": core_obj, "support": support_obj, "system": system_obj}
+        for dg in create_equipment_datagrams(ship_id, self.game.item_db, equipment, force_full):
+            self.send(dg)
@@ -0,0 +1,73 @@
+"""
+Küldő oldali dead reckoning.
+
+A küldő ugyanazt a modellt futtatja, amit a fogadók (SnapshotBuffer) használnak:
+az utoljára elküldött pozíció + sebesség * eltelt idő, változatlan orientációval.
+Snapshotot csak akkor küldünk, ha a valódi állapot ettől NET_DR_POS_ERROR /
+NET_DR_ANGLE_ERROR-nál jobban eltér, a naprendszer megváltozott, vagy letelt a
+NET_DR_HEARTBEAT. Álló vagy egyenesen haladó hajónál így tick-enként egy snapshot
+helyett másodpercenként egy megy ki.
+"""
+from globals import NET_DR_POS_ERROR, NET_DR_ANGLE_ERROR, NET_DR_HEARTBEAT
+
+
+def extrapolate(pos, vel, dt):
+    """A fogadók és a szerver közös modellje: pozíció + sebesség * eltelt idő."""
+    return pos[0] + vel[0] * dt, pos[1] + vel[1] * dt, pos[2] + vel[2] * dt
+
+
+def _angle_error(a, b):
+    return max(abs((x - y + 180.0) % 360.0 - 180.0) for x, y in zip(a, b))
+
+
+class DeadReckoner:
+    def __init__(self, pos_error=NET_DR_POS_ERROR, angle_error=NET_DR_ANGLE_ERROR, heartbeat=NET_DR_HEARTBEAT):
+        self.pos_error = pos_error
+        self.angle_error = angle_error
+        self.heartbeat = heartbeat
+
+        self.last_time = None
+        self.last_pos = None
+        self.last_hpr = None
+        self.last_vel = None
+        self.last_system = None
+        self.last_size = 0  # az utolsó elküldött snapshot mérete (az elnyomott forgalom becsléséhez)
+
+        self.sent = 0
+        self.suppressed = 0
+        self.suppressed_bytes = 0
+
+    def predict(self, now):
+        return extrapolate(self.last_pos, self.last_vel, now - self.last_time)
+
+    def should_send(self, now, pos, hpr, system_id):
+        """Igaz, ha a fogadók becslése már túl nagyot tévedne (vagy heartbeat / rendszerváltás)."""
+        if self.last_time is None or system_id != self.last_system or now - self.last_time >= self.heartbeat:
+            return True
+        px, py, pz = self.predict(now)
+        dx, dy, dz = pos[0] - px, pos[1] - py, pos[2] - pz
+        if dx * dx + dy * dy + dz * dz > self.pos_error * self.pos_error:
+            return True
+        return _angle_error(hpr, self.last_hpr) > self.angle_error
+
+    def on_sent(self, now, pos, hpr, vel, system_id, size):
+        self.last_time = now
+        self.last_pos = tuple(pos)
+        self.last_hpr = tuple(hpr)
+        self.last_vel = tuple(vel)
+        self.last_system = system_id
+        self.last_size = size
+        self.sent += 1
+
+    def on_suppressed(self):
+        self.suppressed += 1
+        self.suppressed_bytes += self.last_size
+
+    def metrics(self):
+        total = self.sent + self.suppressed
+        return {
+            "sent": self.sent,
+            "suppressed": self.suppressed,
+            "suppressed_bytes": self.suppressed_bytes,
+            "suppressed_ratio": round(self.suppressed / total, 3) if total else 0.0,
+        }
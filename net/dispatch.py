@@ -0,0 +1,30 @@
+"""
+Táblázat alapú üzenet dispatcher: üzenet ID (net/protocol.py) -> kezelő függvény.
+
+A kezelő a típus byte utáni iterátort kapja. Egy ID-hez csak egy kezelő
+regisztrálható, így egy véletlen második definíció nem írhatja felül csendben
+az elsőt. Típusonként számoljuk a késve feldolgozott és az eldobott üzeneteket.
+"""
+from collections import defaultdict
+
+
+class MessageDispatcher:
+    def __init__(self):
+        self.handlers = {}
+        self.late = defaultdict(int)      # msg_type -> késve (egy tick után) feldolgozott üzenetek
+        self.dropped = defaultdict(int)   # msg_type -> eldobott (ismeretlen vagy túlcsordult) üzenetek
+        self.backlog_peak = 0
+
+    def register(self, msg_type, handler):
+        if msg_type in self.handlers:
+            raise ValueError(f"A(z) {msg_type} üzenet típushoz már van kezelő")
+        self.handlers[msg_type] = handler
+
+    def dispatch(self, msg_type, iterator):
+        """Visszatérés: True, ha volt kezelő az üzenet típushoz."""
+        handler = self.handlers.get(msg_type)
+        if handler is None:
+            self.dropped[msg_type] += 1
+            return False
+        handler(iterator)
+        return True
@@ -0,0 +1,119 @@
+"""
+Snapshot interpoláció távoli entitásokhoz (jitter buffer).
+
+A beérkező snapshotokat a küldő tick száma alapján időbélyegezzük, egy kis
+gyűrűpufferben tároljuk, és a megjelenítés INTERP_DELAY-jel a legfrissebb
+állapot mögött interpolál. Késő csomagoknál legfeljebb MAX_EXTRAPOLATION
+ideig a sebesség alapján extrapolálunk. A költség entitásonként állandó.
+
+Dead reckoning mellett (net/deadreckoning.py) a küldő szándékosan hallgat, amíg
+a sebesség alapú becslés elég pontos: a kihagyott tick-eket átfogó réseken is a két
+közrefogó snapshot között interpolálunk, a legfrissebb után pedig a heartbeat idejéig
+ugyanazzal a modellel extrapolálunk, amit a küldő is futtat.
+"""
+from globals import NET_TICK_RATE, NET_INTERP_DELAY, NET_MAX_EXTRAPOLATION, NET_DEAD_RECKONING, NET_DR_HEARTBEAT
+from .snapshot import seq_diff
+
+BUFFER_SIZE = 16
+
+# Ilyen gyorsan követi az óra eltolás becslése a lassabb érkezéseket (tick-enként)
+OFFSET_RELAX = 0.01
+
+# Dead reckoning esetén a csend a heartbeat-ig normális, addig extrapolálunk
+DEFAULT_EXTRAPOLATION = NET_DR_HEARTBEAT + NET_MAX_EXTRAPOLATION if NET_DEAD_RECKONING else NET_MAX_EXTRAPOLATION
+
+
+def _lerp_angle(a, b, t):
+    """Legrövidebb úton történő szög interpoláció (fokban)."""
+    d = (b - a + 180.0) % 360.0 - 180.0
+    return a + d * t
+
+
+class SnapshotBuffer:
+    """
+    Egy távoli entitás időbélyegzett snapshotjainak gyűrűpuffere.
+    A tárolók előre le vannak foglalva, push/sample nem allokál új listát.
+    """
+    def __init__(self, tick_interval=1.0 / NET_TICK_RATE, delay=NET_INTERP_DELAY,
+                 max_extrapolation=DEFAULT_EXTRAPOLATION, size=BUFFER_SIZE):
+        self.tick_interval = tick_interval
+        self.delay = delay
+        self.max_extrapolation = max_extrapolation
+        self.size = size
+
+        self.times = [0.0] * size
+        self.positions = [None] * size
+        self.hprs = [None] * size
+        self.velocities = [None] * size
+        self.count = 0
+        self.head = -1  # a legfrissebb elem indexe
+
+        self._last_seq = None
+        self._tick = 0          # a küldő tick száma, átfordulás nélkül
+        self.clock_offset = None  # helyi idő - küldő idő becslése
+
+    def push(self, seq, pos, hpr, vel, arrival_time):
+        """Új snapshot a küldő tick számával (seq) és a helyi érkezési idővel."""
+        if self._last_seq is None:
+            self._tick = seq
+        else:
+            d = seq_diff(seq, self._last_seq)
+            if d <= 0:
+                return  # régebbi vagy duplikált csomag
+            self._tick += d
+        self._last_seq = seq
+
+        sender_time = self._tick * self.tick_interval
+        sample = arrival_time - sender_time
+        # A legkisebb késleltetés a legjobb becslés; lassan engedünk a nagyobb felé (óra drift)
+        if self.clock_offset is None or sample < self.clock_offset:
+            self.clock_offset = sample
+        else:
+            self.clock_offset += (sample - self.clock_offset) * OFFSET_RELAX
+
+        self.head = (self.head + 1) % self.size
+        self.times[self.head] = sender_time
+        self.positions[self.head] = pos
+        self.hprs[self.head] = hpr
+        self.velocities[self.head] = vel
+        if self.count < self.size:
+            self.count += 1
+
+    def sample(self, now):
+        """
+        Interpolált (pos, hpr) a megadott helyi időpontra, INTERP_DELAY késleltetéssel.
+        None, ha még nincs adat.
+        """
+        if self.count == 0:
+            return None
+        target = now - self.delay - self.clock_offset
+
+        newest = self.head
+        if target >= self.times[newest]:
+            # Késik a következő csomag: korlátozott extrapoláció a sebesség alapján
+            dt = min(target - self.times[newest], self.max_extrapolation)
+            p, v = self.positions[newest], self.velocities[newest]
+            return (p[0] + v[0] * dt, p[1] + v[1] * dt, p[2] + v[2] * dt), self.hprs[newest]
+
+        # Visszafelé keressük az első snapshotot, ami nem későbbi a célidőnél
+        later = newest
+        for step in range(1, self.count):
+            idx = (newest - step) % self.size
+            t0 = self.times[idx]
+            if t0 <= target:
+                # A két közrefogó snapshot között interpolálunk akkor is, ha a rés több tick-nyi
+                t1 = self.times[later]
+                f = (target - t0) / (t1 - t0) if t1 > t0 else 1.0
+                p0, p1 = self.positions[idx], self.positions[later]
+                h0, h1 = self.hprs[idx], self.hprs[later]
+                pos = (p0[0] + (p1[0] - p0[0]) * f,
+                       p0[1] + (p1[1] - p0[1]) * f,
+                       p0[2] + (p1[2] - p0[2]) * f)
+                hpr = (_lerp_angle(h0[0], h1[0], f),
+                       _lerp_angle(h0[1], h1[1], f),
+                       _lerp_angle(h0[2], h1[2], f))
+                return pos, hpr
+            later = idx
+
+        # A célidő a legrégebbi tárolt snapshot előtt van
+        return self.positions[later], self.hprs[later]
@@ -0,0 +1,115 @@
+"""
+Szerver oldali lag compensation.
+
+TransformHistory: entitásonként az utolsó NET_HISTORY_SECONDS másodperc pozíciói
+szerver tick szerint, előre lefoglalt tömbökben (array). A gyűrű indexe tick % méret,
+egy minta csak akkor érvényes, ha a bélyege (a rögzítés tick-je) egyezik, így a
+visszatekerés tick alapján O(1), törlés vagy keresés nélkül.
+
+ClockSync: kliens oldali óra szinkron (MSG_CLOCK_SYNC). A legkisebb RTT-jű minta
+adja a szerver tick becslést, ebből számoljuk, melyik szerver tick állapotát látja
+éppen a játékos (a jitter buffer késleltetésével együtt).
+"""
+import math
+from array import array
+from collections import deque
+
+from globals import NET_HISTORY_SECONDS
+
+
+class TransformHistory:
+    def __init__(self, rate_hz, seconds=NET_HISTORY_SECONDS, capacity=64):
+        self.rate_hz = rate_hz
+        self.size = int(math.ceil(rate_hz * seconds)) + 1  # tick / entitás
+        self.slots = {}          # entity_id -> slot index
+        self.free = []
+        self.capacity = 0
+        self.positions = array("f")  # (slot * size + tick % size) * 3
+        self.stamps = array("q")     # slot * size + tick % size -> rögzítés tick-je (-1 = üres)
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        added = capacity - self.capacity
+        self.positions.extend(array("f", bytes(4 * added * self.size * 3)))
+        self.stamps.extend(array("q", [-1]) * (added * self.size))
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def _slot(self, entity_id):
+        slot = self.slots.get(entity_id)
+        if slot is None:
+            if not self.free:
+                self._grow(self.capacity * 2)
+            slot = self.slots[entity_id] = self.free.pop()
+        return slot
+
+    def record(self, tick, records, now=None):
+        """
+        Egy tick pillanatképe: records az EntityRecord-ok (WorldState.entities.values()).
+        now megadásakor a rekordok now-ra extrapolált pozícióját rögzítjük (EntityRecord.predict).
+        """
+        index = tick % self.size
+        positions, stamps, size = self.positions, self.stamps, self.size
+        for record in records:
+            i = self._slot(record.entity_id) * size + index
+            stamps[i] = tick
+            x, y, z = record.pos if now is None else record.predict(now)
+            i *= 3
+            positions[i] = x
+            positions[i + 1] = y
+            positions[i + 2] = z
+
+    def forget(self, entity_id):
+        slot = self.slots.pop(entity_id, None)
+        if slot is None:
+            return
+        start = slot * self.size
+        self.stamps[start:start + self.size] = array("q", [-1]) * self.size
+        self.free.append(slot)
+
+    def sample(self, entity_id, tick):
+        """A tick-ben rögzített pozíció, vagy None, ha nincs (kiesett az ablakból / nem volt még)."""
+        slot = self.slots.get(entity_id)
+        if slot is None:
+            return None
+        i = slot * self.size + tick % self.size
+        if self.stamps[i] != tick:
+            return None
+        return self.positions[i * 3], self.positions[i * 3 + 1], self.positions[i * 3 + 2]
+
+    def position_at(self, entity_id, tick):
+        """Pozíció tört tick-re, a két szomszédos minta között lineárisan interpolálva."""
+        base = math.floor(tick)
+        a = self.sample(entity_id, base)
+        b = self.sample(entity_id, base + 1)
+        if a is None or b is None:
+            return a or b
+        t = tick - base
+        return a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t, a[2] + (b[2] - a[2]) * t
+
+
+class ClockSync:
+    def __init__(self, window=8):
+        self.samples = deque(maxlen=window)  # (rtt, offset): becsült szerver tick = idő * rate + offset
+        self.rate_hz = None
+        self.rtt = 0.0
+
+    def on_reply(self, client_time, server_tick, rate_hz, now):
+        rtt = max(0.0, now - client_time)
+        self.rate_hz = rate_hz
+        # A válasz a kérés és a fogadás között félúton készült
+        self.samples.append((rtt, server_tick + rtt / 2 * rate_hz - now * rate_hz))
+        self.rtt = sum(s[0] for s in self.samples) / len(self.samples)
+
+    def server_tick(self, now):
+        """A szerver jelenlegi tick-jének becslése (a legkisebb RTT-jű, legpontosabb mintából)."""
+        if not self.samples:
+            return None
+        return now * self.rate_hz + min(self.samples)[1]
+
+    def view_tick(self, now, interp_delay):
+        """Annak a szerver tick-nek a becslése, amelynek állapotát a játékos most látja."""
+        tick = self.server_tick(now)
+        if tick is None:
+            return None
+        return tick - (self.rtt / 2 + interp_delay) * self.rate_hz
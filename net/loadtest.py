@@ -0,0 +1,330 @@
+"""
+Terheléses teszt a GameServer relay-hez: N könnyűsúlyú bot kliens localhoston.
+
+A szerver külön folyamatként, headless módban indul (--stats jelentéssel), a botok
+pedig a valódi net/protocol.py formátumokat küldik: snapshotokat (visszaigazolással)
+és felszerelés szinkront, állítható frekvenciával. A botok egy vagy több folyamatban
+futnak, mindegyik egy selector ciklusban kezeli a saját socketjeit.
+
+A botok alapértelmezésben egy síkban, az érdeklődési kör (MAX_RENDER_DISTANCE) által
+lefedett területen belül indulnak, így minden pár látja egymást és a relay teljes
+terhelést kap; a --spread nagyobb értékével mérhető a részleges láthatóság.
+
+Mért értékek:
+    - relay késleltetés (küldés -> bármelyik másik bot fogadása, folyamatok között is:
+      a küldési időket egy közös memóriában lévő tömb tárolja, time.monotonic órával) p50/p95/p99,
+    - be- és kimenő üzenet/s a szerveren,
+    - szerver CPU idő üzenetenként (/proc/<pid>/stat),
+    - a szerver kimenő sorának csúcsa intervallumonként (növekedés = lemaradás).
+
+Használat:
+    python -m net.loadtest --clients 8 32 128 --seconds 20
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import selectors
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+root_path = str(Path(__file__).parent.parent)
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+from direct.distributed.PyDatagram import PyDatagram
+from direct.distributed.PyDatagramIterator import PyDatagramIterator
+from components.Core import ShipCore
+from globals import MAX_RENDER_DISTANCE
+from net.protocol import (
+    MSG_SNAPSHOT, MSG_SNAPSHOT_ACK, MSG_BATCH, MSG_SYNC_CORE, MSG_ENTITY_ENTER, MSG_ENTITY_LEAVE,
+    create_snapshot_datagram, create_ack_datagram, create_sync_dg, read_snapshot, read_ack_entries,
+    iter_batch, pack_batches
+)
+from net.snapshot import SnapshotEncoder, SnapshotDecoder, quantize_state, SEQ_MOD, POS_RANGE
+
+HEADER = struct.Struct("<H")
+BOT_ID_BASE = 1000
+ORBIT_MAX = 300.0
+# Ekkora négyzetben bármely két bot (a körpályájukkal együtt) az érdeklődési körön belül van
+DEFAULT_SPREAD = (MAX_RENDER_DISTANCE - 2 * ORBIT_MAX) / math.sqrt(2)
+
+
+class Bot:
+    """Egy szimulált játékos: körpályán mozgó hajó a saját snapshot kódolójával."""
+    def __init__(self, bot_id, center, rng):
+        self.bot_id = bot_id
+        self.center = center
+        self.radius = rng.uniform(50.0, ORBIT_MAX)
+        self.speed = rng.uniform(0.2, 1.0)  # rad/s
+        self.phase = rng.uniform(0.0, 2 * math.pi)
+        self.encoder = SnapshotEncoder()
+        self.decoders = {}
+        self.pending_acks = {}
+        self.sock = None
+        self.buffer = bytearray()
+        self.outbox = []
+
+    def state_at(self, t):
+        angle = self.phase + self.speed * t
+        pos = (self.center[0] + math.cos(angle) * self.radius,
+               self.center[1] + math.sin(angle) * self.radius,
+               self.center[2])
+        vel = (-math.sin(angle) * self.radius * self.speed, math.cos(angle) * self.radius * self.speed, 0.0)
+        return quantize_state(pos, (math.degrees(angle) + 90.0, 0.0, 0.0), vel, 0)
+
+
+class BotSwarm:
+    """
+    Botok egy csoportja egyetlen folyamatban. A küldési idők a folyamatok közös sent_at
+    tömbjébe kerülnek ((bot_id - BOT_ID_BASE) * SEQ_MOD + seq), így a késleltetés bármelyik
+    küldőre mérhető; az óra time.monotonic, ami egy gépen a folyamatok között közös.
+    """
+    def __init__(self, port, bot_ids, spread, pos_hz, equip_hz, seed, sent_at):
+        rng = random.Random(seed)
+        half = min(spread / 2.0, POS_RANGE * 0.9)
+        # Sík elrendezés: a z szórás csak a látható párok arányát rontaná
+        self.bots = [Bot(bot_id, (rng.uniform(-half, half), rng.uniform(-half, half), 0.0), rng)
+                     for bot_id in bot_ids]
+        self.port = port
+        self.pos_interval = 1.0 / pos_hz
+        self.equip_interval = 1.0 / equip_hz if equip_hz > 0 else None
+
+        # (küldő, seq) -> küldés ideje; a seq 12 bites, ezért küldőnként SEQ_MOD hosszú szakasz
+        self.sent_at = sent_at
+        self.latencies = []
+        self.received = 0
+        self.sent = 0
+        self.selector = selectors.DefaultSelector()
+
+    def connect(self):
+        for bot in self.bots:
+            bot.sock = socket.create_connection(("127.0.0.1", self.port))
+            bot.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Blokkoló socket: a sendall nem vághat ketté keretet; olvasás csak a selector jelzése után
+            self.selector.register(bot.sock, selectors.EVENT_READ, bot)
+
+    def tick(self, seq, t, send_equipment):
+        for bot in self.bots:
+            bot.outbox.append(create_snapshot_datagram(bot.bot_id, bot.encoder, seq, bot.state_at(t)))
+            self.sent_at[(bot.bot_id - BOT_ID_BASE) * SEQ_MOD + seq % SEQ_MOD] = time.monotonic()
+            if bot.pending_acks:
+                bot.outbox.append(create_ack_datagram(bot.bot_id, list(bot.pending_acks.items())[:255]))
+                bot.pending_acks.clear()
+            if send_equipment:
+                core = ShipCore(id=bot.bot_id, name=f"Bot-{bot.bot_id}", price=1000)
+                bot.outbox.append(create_sync_dg(MSG_SYNC_CORE, bot.bot_id, core))
+            self.flush(bot)
+
+    def flush(self, bot):
+        frames = []
+        for datagram in pack_batches(bot.outbox):
+            data = datagram.getMessage()
+            frames.append(HEADER.pack(len(data)))
+            frames.append(data)
+            self.sent += 1
+        bot.outbox.clear()
+        bot.sock.sendall(b"".join(frames))
+
+    def handle(self, bot, datagram, now):
+        iterator = PyDatagramIterator(datagram)
+        msg_type = iterator.getUint8()
+        if msg_type == MSG_BATCH:
+            for sub_datagram in iter_batch(iterator):
+                self.handle(bot, sub_datagram, now)
+            return
+        self.received += 1
+        if msg_type == MSG_SNAPSHOT:
+            sender_id = iterator.getUint16()
+            decoder = bot.decoders.get(sender_id)
+            if decoder is None:
+                decoder = bot.decoders[sender_id] = SnapshotDecoder()
+            result = read_snapshot(iterator, decoder)
+            if result is None:
+                return
+            bot.pending_acks[sender_id] = result[0]
+            sent = self.sent_at[(sender_id - BOT_ID_BASE) * SEQ_MOD + result[0]]
+            if sent > 0.0:
+                self.latencies.append(now - sent)
+        elif msg_type == MSG_SNAPSHOT_ACK:
+            acker_id = iterator.getUint16()
+            for entity_id, seq in read_ack_entries(iterator):
+                if entity_id == bot.bot_id:
+                    bot.encoder.on_ack(acker_id, seq)
+        elif msg_type == MSG_ENTITY_ENTER:
+            # Mint a GameClient: a belépő újrakezdi a dekóderét, a régi ACK-jai érvénytelenek
+            entity_id = iterator.getUint16()
+            bot.decoders.pop(entity_id, None)
+            bot.encoder.add_peer(entity_id)
+        elif msg_type == MSG_ENTITY_LEAVE:
+            entity_id = iterator.getUint16()
+            bot.decoders.pop(entity_id, None)
+            bot.pending_acks.pop(entity_id, None)
+            bot.encoder.forget_peer(entity_id)
+
+    def read(self, timeout):
+        for key, _ in self.selector.select(timeout=timeout):
+            bot = key.data
+            chunk = bot.sock.recv(262144)
+            if not chunk:
+                self.selector.unregister(bot.sock)
+                continue
+            now = time.monotonic()
+            buf = bot.buffer
+            buf += chunk
+            offset = 0
+            while len(buf) - offset >= HEADER.size:
+                size = HEADER.unpack_from(buf, offset)[0]
+                if len(buf) - offset - HEADER.size < size:
+                    break
+                start = offset + HEADER.size
+                self.handle(bot, PyDatagram(bytes(buf[start:start + size])), now)
+                offset = start + size
+            del buf[:offset]
+
+    def run(self, seconds, warmup):
+        self.connect()
+        start = time.perf_counter()
+        end = start + warmup + seconds
+        next_pos = start
+        next_equip = start
+        seq = 0
+        while True:
+            now = time.perf_counter()
+            if now >= end:
+                break
+            if now >= next_pos:
+                send_equipment = self.equip_interval is not None and now >= next_equip
+                if send_equipment:
+                    next_equip += self.equip_interval
+                self.tick(seq, now - start, send_equipment)
+                seq += 1
+                next_pos += self.pos_interval
+                if now - start < warmup:
+                    # A bemelegedés alatti mintákat eldobjuk (kapcsolódás, első kulcskockák)
+                    self.latencies.clear()
+                    self.received = 0
+            self.read(max(0.0, min(next_pos, end) - time.perf_counter()))
+        for bot in self.bots:
+            bot.sock.close()
+        return {"latencies": self.latencies, "received": self.received, "sent": self.sent}
+
+
+def _swarm_worker(args, sent_at, result_queue):
+    port, bot_ids, spread, pos_hz, equip_hz, seed, seconds, warmup = args
+    swarm = BotSwarm(port, bot_ids, spread, pos_hz, equip_hz, seed, sent_at)
+    result_queue.put(swarm.run(seconds, warmup))
+
+
+def read_cpu_seconds(pid):
+    """Egy folyamat user+system CPU ideje másodpercben (Linux /proc)."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float("nan")
+    idx = min(len(sorted_values) - 1, max(0, int(round(p / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+def run_load_test(clients, seconds, warmup, port, udp_port, procs, spread, pos_hz, equip_hz, tick_rate):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "net.server", "--headless", "--port", str(port), "--udp-port", str(udp_port),
+         "--tick-rate", str(tick_rate), "--stats", "1.0"],
+        cwd=root_path, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+
+    stats = []
+    started = threading.Event()
+
+    def read_server_output():
+        for line in server.stdout:
+            if line.startswith("[STATS] "):
+                stats.append((time.perf_counter(), json.loads(line[len("[STATS] "):])))
+            elif "Szerver elindítva" in line:
+                started.set()
+
+    threading.Thread(target=read_server_output, daemon=True).start()
+    if not started.wait(10.0):
+        server.kill()
+        raise RuntimeError("A szerver nem indult el 10 mp alatt")
+
+    procs = max(1, min(procs, clients))
+    ids = [BOT_ID_BASE + i for i in range(clients)]
+    groups = [ids[i::procs] for i in range(procs)]
+    result_queue = multiprocessing.Queue()
+    # Közös küldési idő tömb; minden bot csak a saját szakaszát írja, ezért zár nélkül
+    sent_at = multiprocessing.Array("d", clients * SEQ_MOD, lock=False)
+    workers = [multiprocessing.Process(target=_swarm_worker,
+                                       args=((port, group, spread, pos_hz, equip_hz, i, seconds, warmup),
+                                             sent_at, result_queue))
+               for i, group in enumerate(groups)]
+    for worker in workers:
+        worker.start()
+
+    time.sleep(warmup)
+    cpu_start, wall_start = read_cpu_seconds(server.pid), time.perf_counter()
+    stats_start = len(stats)
+    time.sleep(seconds)
+    cpu_end, wall_end = read_cpu_seconds(server.pid), time.perf_counter()
+    window = [s for _, s in stats[stats_start:]]
+
+    results = [result_queue.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    server.terminate()
+    server.wait()
+
+    latencies = sorted(l for r in results for l in r["latencies"])
+    elapsed = wall_end - wall_start
+    if len(window) >= 2:
+        msgs_in = window[-1]["msgs_in"] - window[0]["msgs_in"]
+        msgs_out = window[-1]["msgs_out"] - window[0]["msgs_out"]
+        span = len(window) - 1
+    else:
+        msgs_in = msgs_out = 0
+        span = 1
+    cpu = cpu_end - cpu_start
+
+    print(f"\n=== {clients} kliens ({procs} bot folyamat, {seconds:.0f} mp) ===")
+    print(f"relay késleltetés: p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+          f"p95 {percentile(latencies, 95) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms "
+          f"({len(latencies)} minta)")
+    print(f"szerver átvitel: be {msgs_in / span:.0f} üzenet/s, ki {msgs_out / span:.0f} üzenet/s")
+    print(f"szerver CPU: {cpu / elapsed * 100:.1f}%, "
+          f"{cpu / max(1, msgs_in + msgs_out) * 1e6:.1f} us/üzenet (be+ki)")
+    if window:
+        peaks = [s["peak_queue"] for s in window]
+        print(f"kimenő sor csúcs: első {peaks[0]}, utolsó {peaks[-1]}, max {max(peaks)} | "
+              f"tick: min {min(s['tick_rate'] for s in window):.1f} Hz")
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bot raj terheléses teszt a GameServer relay-hez")
+    parser.add_argument("--clients", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--procs", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="bot folyamatok száma")
+    parser.add_argument("--spread", type=float, default=DEFAULT_SPREAD,
+                        help="a botok kezdőpozícióinak kiterjedése (alapérték: mind az AOI-n belül)")
+    parser.add_argument("--pos-rate", type=float, default=30.0, help="snapshot küldés (Hz)")
+    parser.add_argument("--equip-rate", type=float, default=0.5, help="felszerelés szinkron (Hz), 0 = ki")
+    parser.add_argument("--tick-rate", type=float, default=30.0, help="szerver hálózati tick (Hz)")
+    parser.add_argument("--port", type=int, default=9300)
+    args = parser.parse_args()
+
+    port = args.port
+    for clients in args.clients:
+        run_load_test(clients, args.seconds, args.warmup, port, port + 1, args.procs, args.spread,
+                      args.pos_rate, args.equip_rate, args.tick_rate)
+        port += 2
@@ -0,0 +1,139 @@
+"""
+Helyi UDP proxy csomagvesztés, késleltetés és jitter szimulálásához (loopback teszteléshez).
+
+Használat:
+    python -m net.lossy_proxy --listen 9200 --target 9100 --loss 0.05 --latency 80 --jitter 20
+majd a kliens a proxyhoz csatlakozik UDP-n:
+    client.connect("127.0.0.1", udp_port=9200)
+
+Másodpercenként kiírja az átküldött/eldobott csomagok számát és a mért
+érkezési jittert (egymást követő csomagok késleltetésének eltérése).
+"""
+import argparse
+import asyncio
+import random
+import time
+
+
+class LinkStats:
+    """Egy irány (kliens->szerver vagy vissza) statisztikái."""
+    def __init__(self, name):
+        self.name = name
+        self.forwarded = 0
+        self.dropped = 0
+        self.reordered = 0
+        self.jitter_ms = 0.0
+        self._last_delay = None
+        self._last_send_at = 0.0
+
+    def record(self, delay, send_at):
+        self.forwarded += 1
+        if send_at < self._last_send_at:
+            self.reordered += 1
+        self._last_send_at = max(self._last_send_at, send_at)
+        if self._last_delay is not None:
+            # RFC 3550 stílusú simított jitter becslés
+            self.jitter_ms += (abs(delay - self._last_delay) * 1000.0 - self.jitter_ms) / 16.0
+        self._last_delay = delay
+
+    def line(self):
+        return (f"{self.name}: továbbítva {self.forwarded}, eldobva {self.dropped}, "
+                f"átrendezve {self.reordered}, jitter {self.jitter_ms:.1f} ms")
+
+
+class LossyLink:
+    """Csomagvesztés + késleltetés + jitter egy irányra."""
+    def __init__(self, loss=0.0, latency_ms=0.0, jitter_ms=0.0, stats=None, rng=None):
+        self.loss = loss
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.stats = stats
+        self.rng = rng or random.Random()
+
+    def schedule(self, loop, send, data):
+        if self.rng.random() < self.loss:
+            if self.stats:
+                self.stats.dropped += 1
+            return
+        delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        send_at = time.perf_counter() + delay
+        if self.stats:
+            self.stats.record(delay, send_at)
+        loop.call_later(delay, send, data)
+
+
+class _UpstreamProtocol(asyncio.DatagramProtocol):
+    """Egy klienshez tartozó socket a szerver felé; a válaszokat visszaküldi a kliensnek."""
+    def __init__(self, proxy, client_addr):
+        self.proxy = proxy
+        self.client_addr = client_addr
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.proxy.downlink.schedule(self.proxy.loop, self._send_to_client, data)
+
+    def _send_to_client(self, data):
+        self.proxy.transport.sendto(data, self.client_addr)
+
+
+class LossyUdpProxy(asyncio.DatagramProtocol):
+    def __init__(self, target, uplink, downlink):
+        self.target = target
+        self.uplink = uplink
+        self.downlink = downlink
+        self.loop = asyncio.get_event_loop()
+        self.transport = None
+        self.upstreams = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        upstream = self.upstreams.get(addr)
+        if upstream is None:
+            upstream = _UpstreamProtocol(self, addr)
+            self.upstreams[addr] = upstream
+            self.loop.create_task(self._open_upstream(upstream))
+        self.uplink.schedule(self.loop, lambda d, u=upstream: u.transport and u.transport.sendto(d), data)
+
+    async def _open_upstream(self, upstream):
+        await self.loop.create_datagram_endpoint(lambda: upstream, remote_addr=self.target)
+
+
+async def run_proxy(listen_port, target_host, target_port, loss, latency_ms, jitter_ms, seed=None):
+    rng = random.Random(seed)
+    up_stats, down_stats = LinkStats("kliens->szerver"), LinkStats("szerver->kliens")
+    uplink = LossyLink(loss, latency_ms, jitter_ms, up_stats, rng)
+    downlink = LossyLink(loss, latency_ms, jitter_ms, down_stats, rng)
+
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: LossyUdpProxy((target_host, target_port), uplink, downlink),
+        local_addr=("127.0.0.1", listen_port))
+    print(f"[PROXY] UDP {listen_port} -> {target_host}:{target_port} "
+          f"(vesztés {loss:.0%}, késleltetés {latency_ms:.0f}±{jitter_ms:.0f} ms)")
+    try:
+        while True:
+            await asyncio.sleep(1.0)
+            print(f"[PROXY] {up_stats.line()} | {down_stats.line()}")
+    finally:
+        transport.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Veszteséges/késleltetett UDP proxy loopback teszteléshez")
+    parser.add_argument("--listen", type=int, default=9200)
+    parser.add_argument("--target-host", default="127.0.0.1")
+    parser.add_argument("--target", type=int, default=9100)
+    parser.add_argument("--loss", type=float, default=0.05, help="csomagvesztés aránya (0..1)")
+    parser.add_argument("--latency", type=float, default=80.0, help="egyirányú késleltetés (ms)")
+    parser.add_argument("--jitter", type=float, default=20.0, help="± véletlen eltérés (ms)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_proxy(args.listen, args.target_host, args.target, args.loss, args.latency, args.jitter, args.seed))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,239 @@
+"""
+Kapcsolatonkénti és üzenet típusonkénti hálózati mérések (NET_STATS).
+
+Két szinten számolunk:
+    - "wire": a ténylegesen küldött/fogadott datagramok (batch borítékkal együtt),
+    - üzenet típusonként: a logikai üzenetek darabszáma, mérete és a kódolás /
+      dekódolás / relay ideje.
+Mindkettőhöz 1 mp-es és 1 perces gördülő ráta tartozik. A dead reckoning miatt
+el sem küldött (elnyomott) üzeneteket is számoljuk, becsült méretükkel együtt. A QueuedConnectionReader
+sormélységét pollonként mérjük (ennyi üzenet várakozott az ürítéskor).
+
+Kikapcsolt állapotban a GameServer/GameClient stats attribútuma None, a
+hívási helyeken csak egy None ellenőrzés marad.
+"""
+import json
+import time
+
+from . import protocol
+
+RATE_WINDOW = 60  # mp, a hosszú ráta ablaka
+
+# Üzenet ID -> olvasható név (MSG_SNAPSHOT -> "SNAPSHOT"); a None a wire szint
+MSG_NAMES = {value: name[4:] for name, value in vars(protocol).items()
+             if name.startswith("MSG_") and isinstance(value, int)}
+MSG_NAMES[None] = "wire"
+
+TIMING_KINDS = ("encode", "decode", "relay")
+
+
+class RollingRate:
+    """Másodperces vödrök az utolsó RATE_WINDOW másodpercre."""
+    def __init__(self, now):
+        self.buckets = [0] * (RATE_WINDOW + 1)
+        self.second = int(now)
+        self.started = self.second
+
+    def _advance(self, second):
+        if second <= self.second:
+            return
+        for s in range(self.second + 1, min(second, self.second + len(self.buckets)) + 1):
+            self.buckets[s % len(self.buckets)] = 0
+        self.second = second
+
+    def add(self, value, now):
+        second = int(now)
+        self._advance(second)
+        self.buckets[second % len(self.buckets)] += value
+
+    def rates(self, now):
+        """(utolsó teljes másodperc, átlag/mp az utolsó percben)"""
+        second = int(now)
+        self._advance(second)
+        size = len(self.buckets)
+        last = self.buckets[(second - 1) % size]
+        completed = min(RATE_WINDOW, second - self.started)
+        total = sum(self.buckets) - self.buckets[second % size]
+        return last, (total / completed if completed > 0 else 0.0)
+
+
+class MessageCounter:
+    """Egy (kapcsolat, üzenet típus) pár számlálói."""
+    def __init__(self, now):
+        self.msgs_in = 0
+        self.msgs_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.rate_in = RollingRate(now)
+        self.rate_out = RollingRate(now)
+        self.bytes_rate_in = RollingRate(now)
+        self.bytes_rate_out = RollingRate(now)
+        self.msgs_suppressed = 0
+        self.bytes_suppressed = 0
+        self.rate_suppressed = RollingRate(now)
+        self.time_total = dict.fromkeys(TIMING_KINDS, 0.0)
+        self.time_count = dict.fromkeys(TIMING_KINDS, 0)
+
+    def to_dict(self, now):
+        in_1s, in_1m = self.rate_in.rates(now)
+        out_1s, out_1m = self.rate_out.rates(now)
+        bin_1s, bin_1m = self.bytes_rate_in.rates(now)
+        bout_1s, bout_1m = self.bytes_rate_out.rates(now)
+        data = {
+            "msgs_in": self.msgs_in, "msgs_out": self.msgs_out,
+            "bytes_in": self.bytes_in, "bytes_out": self.bytes_out,
+            "msgs_in_1s": in_1s, "msgs_in_1m": round(in_1m, 2),
+            "msgs_out_1s": out_1s, "msgs_out_1m": round(out_1m, 2),
+            "bytes_in_1s": bin_1s, "bytes_in_1m": round(bin_1m, 2),
+            "bytes_out_1s": bout_1s, "bytes_out_1m": round(bout_1m, 2),
+        }
+        if self.msgs_suppressed:
+            supp_1s, supp_1m = self.rate_suppressed.rates(now)
+            data.update({
+                "msgs_suppressed": self.msgs_suppressed, "bytes_suppressed": self.bytes_suppressed,
+                "msgs_suppressed_1s": supp_1s, "msgs_suppressed_1m": round(supp_1m, 2),
+            })
+        for kind in TIMING_KINDS:
+            if self.time_count[kind]:
+                data[f"{kind}_us"] = round(self.time_total[kind] / self.time_count[kind] * 1e6, 2)
+        return data
+
+
+class NetStats:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.connections = {}   # kapcsolat -> {msg_type: MessageCounter}
+        self.labels = {}        # kapcsolat -> megjelenített név
+        self.queue_depth = 0
+        self.peak_queue_depth = 0
+        self._dump_file = None
+        self.sections = {}      # név -> függvény, ami a dumphoz extra dict-et ad (pl. dispatcher)
+
+    # --- Rögzítés ---
+    def counter(self, conn, msg_type):
+        per_conn = self.connections.get(conn)
+        if per_conn is None:
+            per_conn = self.connections[conn] = {}
+            self.labels.setdefault(conn, "local" if conn is None else f"#{len(self.labels) + 1}")
+        counter = per_conn.get(msg_type)
+        if counter is None:
+            counter = per_conn[msg_type] = MessageCounter(self.clock())
+        return counter
+
+    def record_in(self, conn, msg_type, nbytes):
+        now = self.clock()
+        counter = self.counter(conn, msg_type)
+        counter.msgs_in += 1
+        counter.bytes_in += nbytes
+        counter.rate_in.add(1, now)
+        counter.bytes_rate_in.add(nbytes, now)
+
+    def record_out(self, conn, msg_type, nbytes):
+        now = self.clock()
+        counter = self.counter(conn, msg_type)
+        counter.msgs_out += 1
+        counter.bytes_out += nbytes
+        counter.rate_out.add(1, now)
+        counter.bytes_rate_out.add(nbytes, now)
+
+    def record_suppressed(self, conn, msg_type, nbytes):
+        """Egy el nem küldött üzenet (a fogadók becslése elég pontos), nbytes a becsült mérete."""
+        now = self.clock()
+        counter = self.counter(conn, msg_type)
+        counter.msgs_suppressed += 1
+        counter.bytes_suppressed += nbytes
+        counter.rate_suppressed.add(1, now)
+
+    def record_time(self, conn, msg_type, kind, seconds):
+        counter = self.counter(conn, msg_type)
+        counter.time_total[kind] += seconds
+        counter.time_count[kind] += 1
+
+    def record_queue_depth(self, depth):
+        self.queue_depth = depth
+        if depth > self.peak_queue_depth:
+            self.peak_queue_depth = depth
+
+    def add_section(self, name, provider):
+        self.sections[name] = provider
+
+    def set_label(self, conn, label):
+        self.labels[conn] = label
+
+    def forget(self, conn):
+        self.connections.pop(conn, None)
+        self.labels.pop(conn, None)
+
+    # --- Kimenet ---
+    def snapshot(self):
+        now = self.clock()
+        return {
+            "t": round(time.time(), 3),
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self.peak_queue_depth,
+            "connections": {
+                self.labels.get(conn, "?"): {MSG_NAMES.get(t, str(t)): c.to_dict(now) for t, c in per_conn.items()}
+                for conn, per_conn in self.connections.items()
+            },
+            **{name: provider() for name, provider in self.sections.items()},
+        }
+
+    def dump(self, path):
+        """Egy JSON sor hozzáfűzése a fájlhoz (a fájl nyitva marad a következő dumphoz)."""
+        if self._dump_file is None:
+            self._dump_file = open(path, "a", encoding="utf-8")
+        self._dump_file.write(json.dumps(self.snapshot()) + "\n")
+        self._dump_file.flush()
+        self.peak_queue_depth = 0
+
+    def summary_lines(self, limit=12):
+        """Rövid összesítő az overlay-hez: kapcsolatonként a wire forgalom, majd a top üzenettípusok."""
+        now = self.clock()
+        lines = [f"NET  sor: {self.queue_depth} (csúcs {self.peak_queue_depth})"]
+        by_type = {}
+        for conn, per_conn in self.connections.items():
+            wire = per_conn.get(None)
+            if wire is not None:
+                in_1s = wire.bytes_rate_in.rates(now)[0]
+                out_1s = wire.bytes_rate_out.rates(now)[0]
+                lines.append(f"{self.labels.get(conn, '?'):>8}  be {in_1s / 1024:6.1f} KB/s  ki {out_1s / 1024:6.1f} KB/s")
+            for msg_type, counter in per_conn.items():
+                if msg_type is not None:
+                    by_type.setdefault(msg_type, []).append(counter)
+
+        rows = []
+        for msg_type, counters in by_type.items():
+            msgs = sum(c.rate_in.rates(now)[0] + c.rate_out.rates(now)[0] for c in counters)
+            rows.append((msgs, msg_type, counters))
+        rows.sort(key=lambda r: r[0], reverse=True)
+        for msgs, msg_type, counters in rows[:limit]:
+            timing = ""
+            suppressed = sum(c.rate_suppressed.rates(now)[0] for c in counters)
+            if suppressed:
+                timing += f"  elnyomva {suppressed}/s"
+            for kind in TIMING_KINDS:
+                count = sum(c.time_count[kind] for c in counters)
+                if count:
+                    timing += f"  {kind} {sum(c.time_total[kind] for c in counters) / count * 1e6:.0f}us"
+            lines.append(f"{MSG_NAMES.get(msg_type, msg_type):>14}  {msgs:5d} msg/s{timing}")
+        return lines
+
+    def dump_task(self, path):
+        """taskMgr.doMethodLater-hez: periodikus JSON lines dump."""
+        def task(task):
+            self.dump(path)
+            return task.again
+        return task
+
+
+def measured_batches(stats, conn, queue):
+    """pack_batches méréssel: logikai üzenetek típusonként, a batch építés ideje és a wire datagramok."""
+    for datagram in queue:
+        data = datagram.getMessage()
+        stats.record_out(conn, data[0], len(data))
+    start = time.perf_counter()
+    batches = protocol.pack_batches(queue)
+    stats.record_time(conn, protocol.MSG_BATCH, "encode", time.perf_counter() - start)
+    for datagram in batches:
+        stats.record_out(conn, None, datagram.getLength())
+    return batches
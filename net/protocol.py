@@ -1,16 +1,70 @@
+import zlib
 from direct.distributed.PyDatagram import PyDatagram
+from direct.distributed.PyDatagramIterator import PyDatagramIterator
 from globals import PORT, MAX_RENDER_DISTANCE
+from .snapshot import BitWriter, BitReader
+from .world import EntityRecord
 
 # --- Üzenet típusok (Message IDs) ---
+# Kliens -> szerver: bejelentkezés (ship ID, naprendszer, pozíció);
+# szerver -> kliens: tömörített világállapot az összes replikált entitással
 MSG_LOGIN = 1
 MSG_POSITION = 2
 MSG_DISCONNECT = 3
 
+# Kvantált, delta kódolt transzform (lásd net/snapshot.py)
+MSG_SNAPSHOT = 4
+MSG_SNAPSHOT_ACK = 5
+
+# Area-of-interest értesítések: egy hajó belépett / kilépett a látókörből
+MSG_ENTITY_ENTER = 6
+MSG_ENTITY_LEAVE = 7
+
+# Boríték: több al-üzenet (típus + entitás ID + adat) egyetlen datagramban
+MSG_BATCH = 8
+BATCH_MTU = 1200  # bájt, egy batch datagram felső mérete
+
+# UDP csatorna összerendelése a TCP kapcsolattal (ship ID + véletlen token)
+MSG_UDP_HELLO = 9
+
 # ÚJ: Item szinkronizációs ID-k
 MSG_SYNC_CORE = 10
 MSG_SYNC_SUPPORT = 11
 MSG_SYNC_SYSTEM = 12
 
+# Lézersugár állapota (aktív-e), a nem megbízható csatornán megy
+MSG_LASER_STATE = 13
+
+# Felszerelés hivatkozással: csak item ID-k + a katalógus hash-e (ItemDatabase)
+MSG_SYNC_EQUIP_REF = 14
+# Teljes felszerelés kérése a tulajdonostól (pl. eltérő katalógus esetén)
+MSG_SYNC_FULL_REQUEST = 15
+
+# Óra szinkron (kliens idő -> szerver tick) és szerver által validált találatok
+MSG_CLOCK_SYNC = 16
+MSG_HIT_CLAIM = 17
+MSG_DAMAGE = 18
+# A válasz szerver idejének azonnali visszaküldése: ebből a szerver maga méri az RTT-t
+MSG_CLOCK_ECHO = 19
+
+# Slot azonosítók a hivatkozásos csomagban: (slot kód, teljes üzenet típusa, slot név)
+EQUIP_SLOTS = (
+    (0, MSG_SYNC_CORE, "core"),
+    (1, MSG_SYNC_SUPPORT, "support"),
+    (2, MSG_SYNC_SYSTEM, "system"),
+)
+EQUIP_SLOT_NAMES = {code: name for code, _, name in EQUIP_SLOTS}
+EQUIP_SLOT_CODES = {name: code for code, _, name in EQUIP_SLOTS}
+
+# Világállapot csomag: ismeretlen naprendszer és az entitásonkénti jelzőbitek
+NO_SYSTEM = 0xFFFF
+WORLD_HAS_HULL = 1
+WORLD_HAS_SHIELD = 2
+WORLD_VISIBLE = 4  # a címzett érdeklődési körén (AOI) belül van
+
+# Ezek a nem megbízható (UDP) csatornán mennek, ha az már él; minden más TCP-n
+UNRELIABLE_MSGS = (MSG_POSITION, MSG_SNAPSHOT, MSG_SNAPSHOT_ACK, MSG_LASER_STATE)
+
 def create_pos_datagram(sender_id, x, y, z):
     """Segédfüggvény pozíció csomag készítéséhez"""
     dg = PyDatagram()
@@ -21,6 +75,100 @@ def create_pos_datagram(sender_id, x, y, z):
     dg.addFloat64(z)
     return dg
 
+def create_snapshot_datagram(sender_id, encoder, seq, state):
+    """Snapshot csomag: a mezők a fogadók által visszaigazolt baseline-hoz képest."""
+    writer = BitWriter()
+    encoder.encode(writer, seq, state)
+    dg = PyDatagram()
+    dg.addUint8(MSG_SNAPSHOT)
+    dg.addUint16(sender_id)
+    dg.appendData(writer.to_bytes())
+    return dg
+
+def read_snapshot(iterator, decoder):
+    """A típus és a küldő ID után következő bitfolyam dekódolása."""
+    return decoder.decode(BitReader(iterator.getRemainingBytes()))
+
+def create_ack_datagram(acker_id, entries):
+    """
+    Snapshot visszaigazolások egy csomagban.
+    :param entries: [(entity_id, seq), ...]
+    """
+    dg = PyDatagram()
+    dg.addUint8(MSG_SNAPSHOT_ACK)
+    dg.addUint16(acker_id)
+    dg.addUint8(len(entries))
+    for entity_id, seq in entries:
+        dg.addUint16(entity_id)
+        dg.addUint16(seq)
+    return dg
+
+def create_interest_datagram(msg_type, entity_id):
+    """MSG_ENTITY_ENTER / MSG_ENTITY_LEAVE értesítés."""
+    dg = PyDatagram()
+    dg.addUint8(msg_type)
+    dg.addUint16(entity_id)
+    return dg
+
+def pack_batches(datagrams, budget=BATCH_MTU):
+    """
+    Datagramok összecsomagolása MSG_BATCH borítékokba, legfeljebb budget bájt méretig.
+    Minden al-üzenet a saját Uint8 típusával és Uint16 entitás ID-jével kezdődik,
+    elé csak egy Uint16 hossz kerül. Az egyedül maradó üzenet boríték nélkül megy.
+    """
+    batches = []
+    pending = []
+    size = 3
+    for dg in datagrams:
+        data = dg.getMessage()
+        if pending and size + 2 + len(data) > budget:
+            batches.append(_close_batch(pending))
+            pending = []
+            size = 3
+        pending.append(data)
+        size += 2 + len(data)
+    if pending:
+        batches.append(_close_batch(pending))
+    return batches
+
+def _close_batch(messages):
+    if len(messages) == 1:
+        return PyDatagram(messages[0])
+    dg = PyDatagram()
+    dg.addUint8(MSG_BATCH)
+    dg.addUint16(len(messages))
+    for data in messages:
+        dg.addUint16(len(data))
+        dg.appendData(data)
+    return dg
+
+def iter_batch(iterator):
+    """Egy MSG_BATCH boríték al-üzenetei önálló datagramként (a típus byte után hívandó)."""
+    count = iterator.getUint16()
+    for _ in range(count):
+        size = iterator.getUint16()
+        yield PyDatagram(iterator.extractBytes(size))
+
+def read_ack_entries(iterator):
+    count = iterator.getUint8()
+    return [(iterator.getUint16(), iterator.getUint16()) for _ in range(count)]
+
+def create_udp_hello(sender_id, token):
+    dg = PyDatagram()
+    dg.addUint8(MSG_UDP_HELLO)
+    dg.addUint16(sender_id)
+    dg.addUint32(token)
+    return dg
+
+def create_laser_datagram(sender_id, active, target_id=0):
+    """Harci lézer állapota; target_id 0, ha a lézer nem hálózati célpontra, hanem előre lő."""
+    dg = PyDatagram()
+    dg.addUint8(MSG_LASER_STATE)
+    dg.addUint16(sender_id)
+    dg.addUint8(1 if active else 0)
+    dg.addUint16(target_id)
+    return dg
+
 def create_sync_dg(msg_type, sender_id, item_obj):
     """
     Univerzális segédfüggvény itemek küldéséhez.
@@ -30,4 +178,192 @@ def create_sync_dg(msg_type, sender_id, item_obj):
     dg.addUint8(msg_type)
     dg.addUint16(sender_id)
     item_obj.pack(dg)
-    return dg
\ No newline at end of file
+    return dg
+
+def create_equipment_datagrams(sender_id, item_db, equipment, force_full=False):
+    """
+    Felszerelés szinkron csomagok. A katalógusban változatlanul szereplő tárgyakból
+    csak az ID megy (MSG_SYNC_EQUIP_REF), az egyedi / hiányzó tárgyak teljes
+    szerializációval (MSG_SYNC_CORE/SUPPORT/SYSTEM).
+    :param equipment: {"core": obj, "support": obj, "system": obj}, a None slotok kimaradnak
+    """
+    datagrams = []
+    refs = []
+    for code, msg_type, slot in EQUIP_SLOTS:
+        item = equipment.get(slot)
+        if item is None:
+            continue
+        if not force_full and item_db and item_db.is_catalog_item(slot, item):
+            refs.append((code, item.id))
+        else:
+            datagrams.append(create_sync_dg(msg_type, sender_id, item))
+
+    if refs:
+        datagrams.insert(0, create_equipment_ref_datagram(sender_id, item_db.catalog_hash, refs))
+    return datagrams
+
+def create_equipment_ref_datagram(sender_id, catalog_hash, refs):
+    """:param refs: [(slot kód, item ID), ...]"""
+    dg = PyDatagram()
+    dg.addUint8(MSG_SYNC_EQUIP_REF)
+    dg.addUint16(sender_id)
+    dg.addUint32(catalog_hash)
+    dg.addUint8(len(refs))
+    for code, item_id in refs:
+        dg.addUint8(code)
+        dg.addInt32(item_id)
+    return dg
+
+def read_equipment_refs(iterator):
+    """Visszatérés: (katalógus hash, [(slot név, item ID), ...])"""
+    catalog_hash = iterator.getUint32()
+    count = iterator.getUint8()
+    refs = []
+    for _ in range(count):
+        code = iterator.getUint8()
+        refs.append((EQUIP_SLOT_NAMES.get(code), iterator.getInt32()))
+    return catalog_hash, refs
+
+def create_full_sync_request(requester_id, target_id):
+    dg = PyDatagram()
+    dg.addUint8(MSG_SYNC_FULL_REQUEST)
+    dg.addUint16(requester_id)
+    dg.addUint16(target_id)
+    return dg
+
+def create_login_datagram(ship_id, system_id, pos, hull, shield):
+    dg = PyDatagram()
+    dg.addUint8(MSG_LOGIN)
+    dg.addUint16(ship_id)
+    dg.addUint16(NO_SYSTEM if system_id is None else system_id)
+    for v in pos:
+        dg.addFloat32(v)
+    dg.addFloat32(hull)
+    dg.addFloat32(shield)
+    return dg
+
+def read_login(iterator):
+    """Visszatérés: (naprendszer ID vagy None, pozíció a rendszer origójához képest, hull, pajzs)"""
+    system_id = iterator.getUint16()
+    pos = (iterator.getFloat32(), iterator.getFloat32(), iterator.getFloat32())
+    return (None if system_id == NO_SYSTEM else system_id), pos, iterator.getFloat32(), iterator.getFloat32()
+
+def create_world_state_datagram(recipient_id, entities):
+    """
+    Belépéskori világállapot egyetlen zlib tömörített csomagban: entitásonként típus,
+    transzform, hull/shield és a katalógusbeli felszerelés ID-k. Az egyedi (katalógusban
+    nem szereplő) tárgyak nem férnek bele, azok külön MSG_SYNC_* csomagban mennek.
+    :param entities: [(EntityRecord, látható-e), ...]
+    """
+    body = PyDatagram()
+    for record, visible in entities:
+        flags = WORLD_VISIBLE if visible else 0
+        if record.hull is not None:
+            flags |= WORLD_HAS_HULL
+        if record.shield is not None:
+            flags |= WORLD_HAS_SHIELD
+        body.addUint16(record.entity_id)
+        body.addString(record.entity_type)
+        body.addUint16(NO_SYSTEM if record.system_id is None else record.system_id)
+        body.addUint8(flags)
+        for v in (*record.pos, *record.hpr, *record.vel):
+            body.addFloat32(v)
+        if record.hull is not None:
+            body.addFloat32(record.hull)
+        if record.shield is not None:
+            body.addFloat32(record.shield)
+        refs = [(EQUIP_SLOT_CODES[slot], item_id) for slot, item_id in record.equipment.items()
+                if slot not in record.custom_items]
+        body.addUint32(record.catalog_hash)
+        body.addUint8(len(refs))
+        for code, item_id in refs:
+            body.addUint8(code)
+            body.addInt32(item_id)
+
+    dg = PyDatagram()
+    dg.addUint8(MSG_LOGIN)
+    dg.addUint16(recipient_id)
+    dg.addUint16(len(entities))
+    dg.addBlob(zlib.compress(body.getMessage()))
+    return dg
+
+def read_world_state(iterator):
+    """Visszatérés: [(EntityRecord, látható-e), ...]; az equipment csak katalógus ID-ket tartalmaz."""
+    count = iterator.getUint16()
+    body = PyDatagramIterator(PyDatagram(zlib.decompress(iterator.getBlob())))
+    entities = []
+    for _ in range(count):
+        record = EntityRecord(body.getUint16(), body.getString())
+        system_id = body.getUint16()
+        record.system_id = None if system_id == NO_SYSTEM else system_id
+        flags = body.getUint8()
+        values = [body.getFloat32() for _ in range(9)]
+        record.pos, record.hpr, record.vel = tuple(values[0:3]), tuple(values[3:6]), tuple(values[6:9])
+        if flags & WORLD_HAS_HULL:
+            record.hull = body.getFloat32()
+        if flags & WORLD_HAS_SHIELD:
+            record.shield = body.getFloat32()
+        record.catalog_hash = body.getUint32()
+        for _ in range(body.getUint8()):
+            code = body.getUint8()
+            record.equipment[EQUIP_SLOT_NAMES.get(code)] = body.getInt32()
+        entities.append((record, bool(flags & WORLD_VISIBLE)))
+    return entities
+
+def create_clock_sync_request(ship_id, client_time):
+    dg = PyDatagram()
+    dg.addUint8(MSG_CLOCK_SYNC)
+    dg.addUint16(ship_id)
+    dg.addFloat64(client_time)
+    return dg
+
+def read_clock_sync_request(iterator):
+    """Visszatérés: a kliens ideje"""
+    return iterator.getFloat64()
+
+def create_clock_sync_reply(ship_id, client_time, server_tick, tick_rate, server_time):
+    dg = PyDatagram()
+    dg.addUint8(MSG_CLOCK_SYNC)
+    dg.addUint16(ship_id)
+    dg.addFloat64(client_time)
+    dg.addUint32(server_tick)
+    dg.addFloat32(tick_rate)
+    dg.addFloat64(server_time)
+    return dg
+
+def read_clock_sync_reply(iterator):
+    """Visszatérés: (a kérés kliens ideje, szerver tick, szerver tick frekvencia, szerver idő)"""
+    return iterator.getFloat64(), iterator.getUint32(), iterator.getFloat32(), iterator.getFloat64()
+
+def create_clock_echo(ship_id, server_time):
+    """A szinkron válasz szerver idejének visszaküldése (a kliens a válasz feldolgozásakor azonnal küldi)."""
+    dg = PyDatagram()
+    dg.addUint8(MSG_CLOCK_ECHO)
+    dg.addUint16(ship_id)
+    dg.addFloat64(server_time)
+    return dg
+
+def read_clock_echo(iterator):
+    return iterator.getFloat64()
+
+def create_hit_claim(shooter_id, target_id, view_tick, damage):
+    """:param view_tick: a lövő által látott szerver tick (tört érték, ClockSync.view_tick)"""
+    dg = PyDatagram()
+    dg.addUint8(MSG_HIT_CLAIM)
+    dg.addUint16(shooter_id)
+    dg.addUint16(target_id)
+    dg.addFloat64(view_tick)
+    dg.addFloat32(damage)
+    return dg
+
+def read_hit_claim(iterator):
+    """Visszatérés: (célpont ID, látott szerver tick, sebzés)"""
+    return iterator.getUint16(), iterator.getFloat64(), iterator.getFloat32()
+
+def create_damage_datagram(target_id, shooter_id, amount):
+    dg = PyDatagram()
+    dg.addUint8(MSG_DAMAGE)
+    dg.addUint16(target_id)
+    dg.addUint16(shooter_id)
+    dg.addFloat32(amount)
+    return dg
@@ -0,0 +1,202 @@
+"""
+Kapcsolatonkénti kimenő sor prioritási osztályokkal és bájt kerettel.
+
+Prioritások (ebben a sorrendben mennek ki):
+    CONTROL    megbízható vezérlő üzenetek (belépés/kilépés, HELLO, kérések) - mindig kimennek
+    EQUIPMENT  felszerelés szinkron - a tick bájt keretéig, a maradék a következő tick-re vár
+    STATE      snapshot / pozíció / lézer / ACK - elavulnak: pozíció / lézer entitásonként
+               csak a legújabb marad a sorban, túlcsordulásnál a legrégebbiek eldobhatók
+
+A snapshotok delta kódoltak, ezért nem vonjuk össze őket: egy új kulcskocka csak a
+saját entitásának korábbi (várakozó) snapshotjait váltja ki. Túlcsordulásnál előbb a
+többi állapot üzenet megy, snapshot csak végső esetben - egy el nem küldött frame-et
+a fogadó nem igazolhat vissza, így a kódoló baseline-ja sem lehet (net/snapshot.py).
+
+Egy lassú kliens így a saját sorát növeli (ahol összevonjuk és eldobjuk az elavult
+állapotokat), nem a Panda belső puffereit. Ha a megbízható forgalom önmagában is
+túllépi a limitet, az overflowed jelzés alapján a szerver bontja a kapcsolatot.
+"""
+from collections import deque
+from itertools import count
+
+from globals import NET_SEND_BUDGET, NET_SEND_QUEUE_LIMIT
+from .snapshot import is_keyframe
+from .protocol import (
+    MSG_POSITION, MSG_SNAPSHOT, MSG_SNAPSHOT_ACK, MSG_LASER_STATE, MSG_ENTITY_LEAVE,
+    MSG_SYNC_CORE, MSG_SYNC_SUPPORT, MSG_SYNC_SYSTEM, MSG_SYNC_EQUIP_REF
+)
+
+PRIO_CONTROL = 0
+PRIO_EQUIPMENT = 1
+PRIO_STATE = 2
+
+PRIORITIES = {
+    MSG_SYNC_CORE: PRIO_EQUIPMENT,
+    MSG_SYNC_SUPPORT: PRIO_EQUIPMENT,
+    MSG_SYNC_SYSTEM: PRIO_EQUIPMENT,
+    MSG_SYNC_EQUIP_REF: PRIO_EQUIPMENT,
+    MSG_POSITION: PRIO_STATE,
+    MSG_SNAPSHOT: PRIO_STATE,
+    MSG_LASER_STATE: PRIO_STATE,
+    MSG_SNAPSHOT_ACK: PRIO_STATE,
+}
+
+# Ezeknél (típus, entitás ID) szerint csak a legújabb kell; az ACK-ok különböző
+# entitásokat igazolnak vissza, a snapshotok pedig egymásra épülő deltát hordozhatnak,
+# ezért azokat nem vonjuk össze
+COLLAPSIBLE = (MSG_POSITION, MSG_LASER_STATE)
+
+
+class SendQueue:
+    def __init__(self, budget=NET_SEND_BUDGET, limit=NET_SEND_QUEUE_LIMIT):
+        self.budget = budget    # bájt / tick
+        self.limit = limit      # bájt, a sor teljes mérete
+        self.control = deque()  # (datagram, méret, nem megbízható-e)
+        self.equipment = deque()
+        self.state = {}         # kulcs -> (datagram, méret, nem megbízható-e), legrégebbi elöl
+        self.snapshots = {}     # entitás ID -> a várakozó snapshotjai state kulcsainak listája
+        self._unique = count()
+
+        self.bytes = 0
+        self.overflowed = False
+        # Metrikák
+        self.peak_length = 0
+        self.collapsed = 0
+        self.dropped = 0
+        self.sent_bytes = 0
+
+    def __len__(self):
+        return len(self.control) + len(self.equipment) + len(self.state)
+
+    def push(self, datagram, unreliable=False):
+        data = datagram.getMessage()
+        msg_type = data[0]
+        size = len(data)
+        entry = (datagram, size, unreliable)
+        prio = PRIORITIES.get(msg_type, PRIO_CONTROL)
+
+        if prio == PRIO_STATE:
+            if msg_type == MSG_SNAPSHOT:
+                entity_id = data[1] | (data[2] << 8)
+                if is_keyframe(data[3:]):
+                    # A kulcskocka a korábbi várakozó frame-ek nélkül is teljes állapotot ad
+                    self._discard_snapshots(entity_id, collapsed=True)
+                key = (msg_type, entity_id, next(self._unique))
+                self.snapshots.setdefault(entity_id, []).append(key)
+            elif msg_type in COLLAPSIBLE:
+                key = (msg_type, data[1] | (data[2] << 8))
+                old = self.state.pop(key, None)
+                if old is not None:
+                    self.bytes -= old[1]
+                    self.collapsed += 1
+            else:
+                key = (msg_type, next(self._unique))
+            self.state[key] = entry
+        elif prio == PRIO_EQUIPMENT:
+            self.equipment.append(entry)
+        else:
+            if msg_type == MSG_ENTITY_LEAVE:
+                # A vezérlő üzenetek előre sorolódnak: a kilépett entitás még várakozó
+                # állapotai nem érkezhetnek meg a kilépés után
+                self._discard_entity(data[1] | (data[2] << 8))
+            self.control.append(entry)
+
+        self.bytes += size
+        if self.bytes > self.limit:
+            self._shed()
+        length = len(self)
+        if length > self.peak_length:
+            self.peak_length = length
+
+    def _discard_entity(self, entity_id):
+        for msg_type in COLLAPSIBLE:
+            old = self.state.pop((msg_type, entity_id), None)
+            if old is not None:
+                self.bytes -= old[1]
+        self._discard_snapshots(entity_id)
+
+    def _discard_snapshots(self, entity_id, collapsed=False):
+        for key in self.snapshots.pop(entity_id, ()):
+            old = self.state.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+                if collapsed:
+                    self.collapsed += 1
+
+    def _pop_state(self, key):
+        entry = self.state.pop(key)
+        if key[0] == MSG_SNAPSHOT:
+            keys = self.snapshots[key[1]]
+            keys.remove(key)
+            if not keys:
+                del self.snapshots[key[1]]
+        return entry
+
+    def _shed(self):
+        """
+        A legrégebbi állapot üzenetek eldobása, amíg a sor a limit alá nem kerül;
+        snapshotot csak akkor, ha a többi állapot eldobása sem volt elég.
+        """
+        for key in [k for k in self.state if k[0] != MSG_SNAPSHOT]:
+            if self.bytes <= self.limit:
+                break
+            self.bytes -= self.state.pop(key)[1]
+            self.dropped += 1
+        while self.bytes > self.limit and self.state:
+            self.bytes -= self._pop_state(next(iter(self.state)))[1]
+            self.dropped += 1
+        if self.bytes > self.limit:
+            self.overflowed = True
+
+    def take(self):
+        """
+        A tick-ben kiküldendő datagramok prioritási sorrendben, a bájt keretig.
+        Visszatérés: (megbízható lista, nem megbízható lista)
+        """
+        reliable, unreliable = [], []
+        remaining = self.budget
+
+        while self.control:
+            datagram, size, udp = self.control.popleft()
+            (unreliable if udp else reliable).append(datagram)
+            remaining -= size
+            self.bytes -= size
+
+        while self.equipment and remaining > 0:
+            datagram, size, udp = self.equipment.popleft()
+            (unreliable if udp else reliable).append(datagram)
+            remaining -= size
+            self.bytes -= size
+
+        while self.state and remaining > 0:
+            datagram, size, udp = self._pop_state(next(iter(self.state)))
+            (unreliable if udp else reliable).append(datagram)
+            remaining -= size
+            self.bytes -= size
+
+        self.sent_bytes += self.budget - remaining
+        return reliable, unreliable
+
+    def drain(self):
+        """A teljes sor a bájt keret figyelembe vétele nélkül (pl. a kapcsolat átadása előtt)."""
+        reliable, unreliable = [], []
+        for entries in (self.control, self.equipment, self.state.values()):
+            for datagram, size, udp in entries:
+                (unreliable if udp else reliable).append(datagram)
+                self.sent_bytes += size
+        self.control.clear()
+        self.equipment.clear()
+        self.state.clear()
+        self.snapshots.clear()
+        self.bytes = 0
+        return reliable, unreliable
+
+    def metrics(self):
+        return {
+            "length": len(self),
+            "bytes": self.bytes,
+            "peak_length": self.peak_length,
+            "collapsed": self.collapsed,
+            "dropped": self.dropped,
+            "sent_bytes": self.sent_bytes,
+        }
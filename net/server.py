@@ -1,9 +1,15 @@
 from panda3d.core import QueuedConnectionManager, QueuedConnectionListener, ConnectionWriter, QueuedConnectionReader, PointerToConnection, NetAddress, NetDatagram
 from direct.task import Task
+from direct.task.TaskManagerGlobal import taskMgr
 from direct.distributed.PyDatagram import PyDatagram
+from direct.distributed.PyDatagramIterator import PyDatagramIterator
+import argparse
 import json
+import time
+import signal
 import sys
 import os
+from collections import deque
 from pathlib import Path
 
 # Path fix az importokhoz
@@ -11,11 +17,73 @@ root_path = str(Path(__file__).parent.parent)
 if root_path not in sys.path:
     sys.path.append(root_path)
 
-from globals import PORT
+from globals import (
+    PORT, UDP_PORT, MAX_RENDER_DISTANCE, NET_BACKEND, NET_STATS, NET_STATS_DUMP, NET_STATS_INTERVAL, NET_CAPTURE,
+    NET_INTERP_DELAY, NET_HIT_TOLERANCE, NET_HISTORY_SECONDS, NET_DAMAGE_BURST, LASER_RANGE, LASER_DAMAGE,
+    NET_INTEREST_MARGIN
+)
+from net.ticker import NetworkTicker
+from net.world import WorldState
+from net.lagcomp import TransformHistory
+from net.transport import AsyncioTransport, EVENT_CONNECT, EVENT_DATA
+from net.netstats import NetStats, measured_batches
+from net.sendqueue import SendQueue
+from net.capture import CaptureWriter, ROLE_SERVER, DIR_IN, DIR_OUT, DIR_CONNECT, DIR_DISCONNECT
+from components.Core import ShipCore
+from components.Support import ShipSupport
+from components.System import ShipSystem
+from net.snapshot import SnapshotDecoder, dequantize_state
+from net.protocol import (
+    MSG_POSITION, MSG_SNAPSHOT, MSG_SNAPSHOT_ACK, MSG_SYNC_CORE, MSG_SYNC_SUPPORT, MSG_SYNC_SYSTEM,
+    MSG_SYNC_EQUIP_REF, MSG_SYNC_FULL_REQUEST, MSG_LOGIN, MSG_CLOCK_SYNC, MSG_CLOCK_ECHO, MSG_HIT_CLAIM,
+    MSG_ENTITY_ENTER, MSG_ENTITY_LEAVE, MSG_BATCH, MSG_UDP_HELLO, MSG_LASER_STATE, EQUIP_SLOTS, EQUIP_SLOT_CODES,
+    read_snapshot, read_ack_entries, create_interest_datagram, create_udp_hello, pack_batches, iter_batch,
+    read_equipment_refs, read_login, create_world_state_datagram, create_equipment_ref_datagram, create_sync_dg,
+    read_clock_sync_request, create_clock_sync_reply, read_clock_echo, read_hit_claim, create_damage_datagram
+)
+
+POSITION_MSGS = (MSG_POSITION, MSG_SNAPSHOT)
+# Ezeket csak az érdeklődési körön (AOI) belüli kliensek kapják meg
+INTEREST_MSGS = POSITION_MSGS + (MSG_LASER_STATE,)
+EQUIPMENT_MSGS = (MSG_SYNC_CORE, MSG_SYNC_SUPPORT, MSG_SYNC_SYSTEM, MSG_SYNC_EQUIP_REF)
+# Teljes szerializációjú felszerelés: üzenet típus -> (slot név, osztály)
+FULL_SYNC_TYPES = {
+    MSG_SYNC_CORE: ("core", ShipCore),
+    MSG_SYNC_SUPPORT: ("support", ShipSupport),
+    MSG_SYNC_SYSTEM: ("system", ShipSystem),
+}
+# slot név -> teljes szerializációjú üzenet típus
+FULL_SYNC_MSGS = {slot: msg_type for _, msg_type, slot in EQUIP_SLOTS}
+
+class ConnectionState:
+    """Egy kapcsolat (vagy Host esetén a helyi játék) hajójának szerver oldali nyilvántartása."""
+    def __init__(self):
+        self.ship_id = None
+        self.pos = None
+        self.system_id = None
+        self.visible = set()  # Azok a kapcsolatok, akiknek a hajóját ez a kliens jelenleg látja
+        self.interest_pos = None  # A hajó (extrapolált) pozíciója a legutóbbi teljes AOI ellenőrzéskor
+
+        # UDP csatorna: a TCP-n kapott token alapján rendeljük hozzá a címet
+        self.udp_token = None
+        self.udp_address = None
+
+        # A szerver által mért oda-vissza késleltetés (MSG_CLOCK_ECHO), mp. A minták minimuma
+        # számít: a kliens a visszhang késleltetésével csak növelni tudná, csökkenteni nem
+        self.rtt = 0.0
+        self.rtt_samples = deque(maxlen=8)
+
+        # Lövőnkénti sebzés keret: LASER_DAMAGE / mp töltődik, legfeljebb NET_DAMAGE_BURST mp-nyi
+        self.damage_budget = 0.0
+        self.budget_time = None
 
 class GameServer:
-    def __init__(self, manager=None):
+    def __init__(self, manager=None, interest_radius=MAX_RENDER_DISTANCE, port=PORT, udp_port=UDP_PORT,
+                 backend=NET_BACKEND):
         self.manager = manager
+        self.port = port
+        self.udp_port = udp_port
+        self.interest_radius = interest_radius
         self.cManager = QueuedConnectionManager()
         self.cListener = QueuedConnectionListener(self.cManager, 0)
         self.cReader = QueuedConnectionReader(self.cManager, 0) # Ez olvassa az adatokat
@@ -23,18 +91,125 @@ class GameServer:
         self.clients = []
         self.active = False
 
+        # Kliensenkénti prioritásos kimenő sor (SendQueue), a szerver tick végén a bájt keretig ürül
+        self.outboxes = {}
+        self.ticker = NetworkTicker(flush_callback=self.flush)
+
+        # Area-of-interest: kapcsolatonkénti hajó pozíció és naprendszer.
+        # A None kulcs a Host helyi játékát jelöli.
+        self.conn_states = {None: ConnectionState()}
+        self.snapshot_decoders = {}
+
+        # Autoritatív világállapot (pozíciók, felszerelés) scene graph nélkül
+        self.world = WorldState()
+        # Transzform előzmények tick-enként a találatok visszatekert validálásához
+        self.history = None
+        self.ticker.add_listener(self.record_history)
+        # A snapshotok között is extrapolált pozíciók miatt az AOI tick-enként frissül
+        self.ticker.add_listener(self.refresh_interest)
+        self.hits_accepted = 0
+        self.hits_rejected = 0
+
+        # Nem megbízható csatorna: "ip:port" -> TCP kapcsolat
+        self.udpSocket = None
+        self.udp_clients = {}
+
+        # Terhelési számlálók (a --stats kimenethez és a net/loadtest.py-hoz)
+        self.msgs_in = 0
+        self.msgs_out = 0
+        self.peak_queue = 0
+
+        # Részletes mérések (NET_STATS); kikapcsolva None, a hívási helyeken csak ez az ellenőrzés fut
+        self.stats = NetStats() if NET_STATS else None
+
+        # Forgalom rögzítése visszajátszáshoz (start_capture), kikapcsolva None
+        self.capture = None
+
+        # Asyncio backend: az I/O háttérszálon fut, a frame csak a kész üzeneteket veszi át
+        self.transport = AsyncioTransport() if backend == "asyncio" else None
+
     def start(self):
-        self.tcpSocket = self.cManager.openTCPServerRendezvous(PORT, 1000)
+        if self.transport is not None:
+            return self._start_asyncio()
+
+        self.tcpSocket = self.cManager.openTCPServerRendezvous(self.port, 1000)
         if self.tcpSocket:
             self.cListener.addConnection(self.tcpSocket)
             self.active = True
+
+            # UDP csatorna a pozícióknak; ha nem nyitható meg, minden a TCP-n megy
+            self.udpSocket = self.cManager.openUDPConnection(self.udp_port)
+            if self.udpSocket:
+                self.cReader.addConnection(self.udpSocket)
+            else:
+                print(f"[SERVER] Figyelem: az UDP port ({self.udp_port}) nem nyitható meg, csak TCP.")
             # Két task kell: egyik az új kapcsolatoknak, másik az adatoknak
             taskMgr.add(self.listen_task, "ServerListenTask")
             taskMgr.add(self.data_reader_task, "ServerDataReaderTask")
-            print(f"[SERVER] Szerver elindítva a {PORT}-es porton.")
+            taskMgr.add(self.ticker.task, "ServerNetworkTickTask")
+            self._start_instrumentation()
+            print(f"[SERVER] Szerver elindítva a {self.port}-es porton.")
             return True
         return False
 
+    def _start_asyncio(self):
+        # Az asyncio backend csak TCP-t kezel; UDP nélkül minden a megbízható csatornán megy
+        if not self.transport.listen(self.port):
+            return False
+        self.active = True
+        taskMgr.add(self.transport_task, "ServerTransportTask")
+        taskMgr.add(self.ticker.task, "ServerNetworkTickTask")
+        self._start_instrumentation()
+        print(f"[SERVER] Szerver elindítva a {self.port}-es porton (asyncio backend).")
+        return True
+
+    def start_capture(self, path):
+        self.capture = CaptureWriter(path, ROLE_SERVER)
+        print(f"[SERVER] Forgalom rögzítése: {path}")
+
+    def stop_capture(self):
+        if self.capture is not None:
+            self.capture.close()
+            print(f"[SERVER] Rögzítés lezárva: {self.capture.records} rekord.")
+            self.capture = None
+
+    def _start_instrumentation(self):
+        if NET_CAPTURE and self.capture is None:
+            self.start_capture(NET_CAPTURE.format(role="server"))
+        if self.stats is None:
+            return
+        if self.udpSocket:
+            self.stats.set_label(self.udpSocket, "udp")
+        self.stats.add_section("send_queues", self.send_queue_metrics)
+        if NET_STATS_DUMP:
+            taskMgr.doMethodLater(NET_STATS_INTERVAL, self.stats.dump_task(NET_STATS_DUMP.format(role="server")),
+                                  "ServerNetStatsDump")
+
+    def transport_task(self, task):
+        """Az asyncio szál által beérkezett események feldolgozása (socket pollolás nélkül)."""
+        stats = self.stats
+        for event, conn, data in self.transport.poll():
+            if event == EVENT_DATA:
+                if stats is not None:
+                    stats.record_in(conn, None, len(data))
+                if conn in self.conn_states:
+                    self.receive(PyDatagram(data), conn)
+            elif event == EVENT_CONNECT:
+                self.add_client(conn, f"{conn.address[0]}:{conn.address[1]}")
+                print(f"[SERVER] Új kliens csatlakozott: {conn.address[0]}")
+            else:
+                self.remove_client(conn)
+        return Task.cont
+
+    def add_client(self, conn, label=None):
+        if self.stats is not None and label:
+            self.stats.set_label(conn, label)
+        if self.capture is not None:
+            self.capture.record(DIR_CONNECT, conn)
+        self.clients.append(conn)
+        self.outboxes[conn] = SendQueue()
+        self.conn_states[conn] = ConnectionState()
+
     def listen_task(self, task):
         """Új kliensek figyelése"""
         if self.cListener.newConnectionAvailable():
@@ -44,31 +219,561 @@ class GameServer:
             
             if self.cListener.getNewConnection(rendezvous, netAddress, newConnection):
                 newConnection = newConnection.p()
-                self.clients.append(newConnection)
+                newConnection.setCollectTcp(True)
+                newConnection.setCollectTcpInterval(self.ticker.interval)
+                self.add_client(newConnection, f"{netAddress.getIpString()}:{netAddress.getPort()}")
                 self.cReader.addConnection(newConnection) # Hozzáadjuk a readerhez!
                 print(f"[SERVER] Új kliens csatlakozott: {netAddress.getIpString()}")
+
+        # Bontott kapcsolatok takarítása
+        while self.cManager.resetConnectionAvailable():
+            connection = PointerToConnection()
+            if self.cManager.getResetConnection(connection):
+                self.remove_client(connection.p())
         return Task.cont
 
+    def remove_client(self, conn):
+        """Kapcsolat eltávolítása; akik látták a hajóját, kilépés értesítést kapnak."""
+        state = self.conn_states.pop(conn, None)
+        if state is None:
+            return
+        if self.capture is not None:
+            self.capture.record(DIR_DISCONNECT, conn)
+        for other_conn in state.visible:
+            other = self.conn_states.get(other_conn)
+            if other is not None:
+                other.visible.discard(conn)
+                if state.ship_id is not None:
+                    self._notify_interest(other_conn, state.ship_id, False)
+
+        if conn in self.clients:
+            self.clients.remove(conn)
+        self.outboxes.pop(conn, None)
+        if self.stats is not None:
+            self.stats.forget(conn)
+        for key in [k for k, c in self.udp_clients.items() if c == conn]:
+            del self.udp_clients[key]
+        if state.ship_id is not None:
+            self.snapshot_decoders.pop(state.ship_id, None)
+            self.world.remove(state.ship_id)
+            if self.history is not None:
+                self.history.forget(state.ship_id)
+
+        if self.transport is not None:
+            conn.close()
+        else:
+            self.cReader.removeConnection(conn)
+            self.cManager.closeConnection(conn)
+        print(f"[SERVER] Kliens lecsatlakozott: {state.ship_id}")
+
     def data_reader_task(self, task):
-        """Beérkező adatok olvasása és továbbítása (Broadcast/Relay)"""
+        """Beérkező adatok olvasása és továbbítása (Relay)"""
+        stats = self.stats
+        drained = 0
         while self.cReader.dataAvailable():
             datagram = NetDatagram()
             if self.cReader.getData(datagram):
-                # A szerver itt csak egy "Postás": amit kap, továbbküldi mindenkinek
-                # Kivéve annak, akitől kapta (exclude_conn)
-                self.broadcast(datagram, exclude_conn=datagram.getConnection())
+                conn = datagram.getConnection()
+                if stats is not None:
+                    drained += 1
+                    stats.record_in(conn, None, datagram.getLength())
+                if self.udpSocket and conn == self.udpSocket:
+                    self.read_udp(datagram)
+                else:
+                    self.receive(datagram, conn)
+        if stats is not None:
+            stats.record_queue_depth(drained)
         return Task.cont
 
+    def read_udp(self, datagram):
+        """UDP datagram: a küldő címét a HELLO-ban kapott token alapján rendeljük kapcsolathoz."""
+        address = datagram.getAddress()
+        key = f"{address.getIpString()}:{address.getPort()}"
+        source_conn = self.udp_clients.get(key)
+        if source_conn is not None:
+            if datagram.getMessage()[:1] == bytes((MSG_UDP_HELLO,)):
+                # A kliens addig ismétli a HELLO-t, amíg nem kap választ: az elveszett
+                # visszaigazolást újraküldjük (a relay-be nem kerül, a token már ismert)
+                state = self.conn_states[source_conn]
+                iterator = PyDatagramIterator(datagram)
+                iterator.getUint8()
+                self.cWriter.send(create_udp_hello(iterator.getUint16(), state.udp_token), self.udpSocket,
+                                  state.udp_address)
+                return
+            self.receive(datagram, source_conn)
+            return
+
+        iterator = PyDatagramIterator(datagram)
+        if iterator.getUint8() != MSG_UDP_HELLO:
+            return
+        ship_id = iterator.getUint16()
+        token = iterator.getUint32()
+        for conn in self.clients:
+            state = self.conn_states[conn]
+            if state.udp_token == token:
+                state.udp_address = NetAddress()
+                state.udp_address.setHost(address.getIpString(), address.getPort())
+                self.udp_clients[key] = conn
+                self.cWriter.send(create_udp_hello(ship_id, token), self.udpSocket, state.udp_address)
+                print(f"[SERVER] UDP csatorna összerendelve: {ship_id} ({key})")
+                return
+
+    def stats_task(self, task):
+        """Egysoros JSON terhelési jelentés (a net/loadtest.py ezt olvassa)."""
+        print("[STATS] " + json.dumps({
+            "clients": len(self.clients),
+            "msgs_in": self.msgs_in,
+            "msgs_out": self.msgs_out,
+            "peak_queue": self.peak_queue,
+            "send_queues": self.send_queue_metrics(),
+            "hits": [self.hits_accepted, self.hits_rejected],
+            "tick_rate": round(self.ticker.achieved_rate, 1),
+        }), flush=True)
+        self.peak_queue = 0
+        return Task.again
+
+    def send_queue_metrics(self):
+        """Összesített kimenő sor metrikák (a leghosszabb sor és az összevont/eldobott állapotok)."""
+        queues = list(self.outboxes.values())
+        return {
+            "max_length": max((len(q) for q in queues), default=0),
+            "max_bytes": max((q.bytes for q in queues), default=0),
+            "collapsed": sum(q.collapsed for q in queues),
+            "dropped": sum(q.dropped for q in queues),
+        }
+
+    def is_host(self):
+        """Host módban a szerver mellett egy helyi játék is fut (None kapcsolatként kezeljük)."""
+        return self.manager is not None and hasattr(self.manager, 'client')
+
+    def recipients(self):
+        if self.is_host():
+            return self.clients + [None]
+        return self.clients
+
+    def deliver(self, conn, datagram, reliable=True):
+        """Egy címzettnek szóló datagram: kliensnél sorba áll, Host esetén azonnal feldolgozzuk."""
+        self.msgs_out += 1
+        if conn is None:
+            if self.stats is not None:
+                data = datagram.getMessage()
+                self.stats.record_out(None, data[0], len(data))
+            if self.capture is not None:
+                self.capture.record(DIR_OUT, None, datagram.getMessage())
+            self.manager.client.process_msg(datagram)
+        else:
+            self.outboxes[conn].push(datagram, unreliable=not reliable and self.conn_states[conn].udp_address is not None)
+
+    def receive(self, datagram, source_conn=None):
+        """Egy beérkezett (wire szintű) datagram: rögzítés, majd relay."""
+        if self.capture is not None:
+            self.capture.record(DIR_IN, source_conn, datagram.getMessage())
+        self.relay(datagram, source_conn)
+
+    def relay(self, datagram, source_conn=None):
+        """
+        Datagram továbbítása az érdeklődési kör (AOI) alapján.
+        source_conn=None esetén a Host helyi játéka a küldő.
+        """
+        stats = self.stats
+        if stats is None:
+            self._relay(datagram, source_conn)
+            return
+        start = time.perf_counter()
+        msg_type = self._relay(datagram, source_conn)
+        stats.record_time(source_conn, msg_type, "relay", time.perf_counter() - start)
+        stats.record_in(source_conn, msg_type, datagram.getLength())
+
+    def _relay(self, datagram, source_conn):
+        iterator = PyDatagramIterator(datagram)
+        msg_type = iterator.getUint8()
+        state = self.conn_states.get(source_conn)
+        if msg_type != MSG_BATCH:
+            self.msgs_in += 1
+
+        if msg_type == MSG_BATCH:
+            # A borítékot kibontjuk, az al-üzenetek egyenként mennek át az AOI szűrőn,
+            # majd a címzettenkénti flush újra összecsomagolja őket
+            for sub_datagram in iter_batch(iterator):
+                self.relay(sub_datagram, source_conn)
+
+        elif msg_type == MSG_LOGIN and state is not None:
+            # Belépés: AOI, majd a teljes világállapot egyetlen csomagban
+            state.ship_id = iterator.getUint16()
+            state.system_id, state.pos, hull, shield = read_login(iterator)
+            record = self.world.update_transform(state.ship_id, state.pos, system_id=state.system_id,
+                                                 now=self.ticker.clock())
+            record.hull, record.shield = hull, shield
+            self.update_interest(source_conn)
+            self.send_world_state(source_conn)
+
+        elif msg_type == MSG_CLOCK_SYNC and state is not None:
+            state.ship_id = iterator.getUint16()
+            client_time = read_clock_sync_request(iterator)
+            self.deliver(source_conn, create_clock_sync_reply(
+                state.ship_id, client_time, self.ticker.tick_count, self.ticker.rate_hz, self.ticker.clock()))
+
+        elif msg_type == MSG_CLOCK_ECHO and state is not None:
+            state.ship_id = iterator.getUint16()
+            rtt = self.ticker.clock() - read_clock_echo(iterator)
+            # Jövőbeli vagy az előzmény ablakon túli idő csak hamis / elavult visszhang lehet
+            if 0.0 <= rtt <= NET_HISTORY_SECONDS:
+                state.rtt_samples.append(rtt)
+                state.rtt = min(state.rtt_samples)
+
+        elif msg_type == MSG_HIT_CLAIM and state is not None:
+            state.ship_id = iterator.getUint16()
+            self.validate_hit(state, *read_hit_claim(iterator))
+
+        elif msg_type == MSG_UDP_HELLO and state is not None:
+            # TCP oldali HELLO: a token alapján azonosítjuk majd az UDP címet
+            state.ship_id = iterator.getUint16()
+            state.udp_token = iterator.getUint32()
+
+        elif msg_type in INTEREST_MSGS and state is not None:
+            state.ship_id = iterator.getUint16()
+            if msg_type in POSITION_MSGS:
+                self._read_position(msg_type, iterator, state, source_conn)
+                self.update_interest(source_conn)
+            for client in self.recipients():
+                if client != source_conn and source_conn in self.conn_states[client].visible:
+                    self.deliver(client, datagram, reliable=False)
+
+        elif msg_type in EQUIPMENT_MSGS and state is not None:
+            if not self._record_equipment(msg_type, iterator):
+                return msg_type
+            # A felszerelés az egész naprendszerre érvényes, nem csak a látótávon belül
+            for client in self.recipients():
+                if client != source_conn and self._same_system(state, self.conn_states[client]):
+                    self.deliver(client, datagram)
+
+        elif msg_type == MSG_SYNC_FULL_REQUEST:
+            # Csak a kért hajó tulajdonosa kapja meg
+            iterator.getUint16()
+            target_id = iterator.getUint16()
+            for client in self.recipients():
+                if client != source_conn and self.conn_states[client].ship_id == target_id:
+                    self.deliver(client, datagram)
+
+        elif msg_type == MSG_SNAPSHOT_ACK:
+            # A visszaigazolást csak az érintett hajók tulajdonosai kapják meg
+            iterator.getUint16()
+            owners = {entity_id for entity_id, _ in read_ack_entries(iterator)}
+            for client in self.recipients():
+                if client != source_conn and self.conn_states[client].ship_id in owners:
+                    self.deliver(client, datagram, reliable=False)
+
+        else:
+            self.broadcast(datagram, exclude_conn=source_conn)
+        return msg_type
+
+    def _read_position(self, msg_type, iterator, state, source_conn=None):
+        if msg_type == MSG_POSITION:
+            # A régi pozíció üzenet nem hordoz sebességet: a hajót állónak tekintjük
+            state.pos = (iterator.getFloat64(), iterator.getFloat64(), iterator.getFloat64())
+            self.world.update_transform(state.ship_id, state.pos, vel=(0.0, 0.0, 0.0), now=self.ticker.clock())
+            return
+
+        decoder = self.snapshot_decoders.get(state.ship_id)
+        if decoder is None:
+            decoder = self.snapshot_decoders[state.ship_id] = SnapshotDecoder()
+        if self.stats is None:
+            result = read_snapshot(iterator, decoder)
+        else:
+            start = time.perf_counter()
+            result = read_snapshot(iterator, decoder)
+            self.stats.record_time(source_conn, MSG_SNAPSHOT, "decode", time.perf_counter() - start)
+        if result is not None:
+            pos, hpr, vel, system_id = dequantize_state(result[1])
+            state.pos = pos
+            state.system_id = system_id
+            self.world.update_transform(state.ship_id, pos, hpr, vel, system_id, now=self.ticker.clock())
+
+    def _record_equipment(self, msg_type, iterator):
+        """
+        Felszerelés nyilvántartása a világállapotban (a datagram változatlanul megy tovább).
+        Hamis, ha az üzenet nem olvasható (eltérő séma hash, csonka csomag): ilyenkor
+        se a világállapotba, se a többi klienshez nem kerül.
+        """
+        ship_id = iterator.getUint16()
+        try:
+            if msg_type == MSG_SYNC_EQUIP_REF:
+                catalog_hash, refs = read_equipment_refs(iterator)
+                refs = [(slot, item_id) for slot, item_id in refs if slot is not None]
+            else:
+                slot, item_cls = FULL_SYNC_TYPES[msg_type]
+                item = item_cls.unpack(iterator)
+        except (ValueError, AssertionError) as e:
+            print(f"[SERVER] Hibás felszerelés üzenet eldobva ({ship_id}, típus {msg_type}): {e}")
+            return False
+
+        if msg_type == MSG_SYNC_EQUIP_REF:
+            self.world.get_or_create(ship_id).catalog_hash = catalog_hash
+            for slot, item_id in refs:
+                self.world.set_equipment(ship_id, slot, item_id)
+        else:
+            self.world.set_equipment(ship_id, slot, item.id, custom_item=item)
+        return True
+
+    def record_history(self):
+        """
+        Tick-enkénti pillanatkép a világállapot pozícióiról (a ticker listenere).
+        A pozíciókat a tick idejére extrapoláljuk, ahogy a kliensek is látják őket
+        (a dead reckoning miatt a snapshotok ritkábban jönnek, mint a tick-ek).
+        """
+        if self.history is None or self.history.rate_hz != self.ticker.rate_hz:
+            self.history = TransformHistory(self.ticker.rate_hz)
+        self.history.record(self.ticker.tick_count, self.world.entities.values(), self.ticker.clock())
+
+    def validate_hit(self, state, target_id, view_tick, damage):
+        """
+        Lézer találat validálása: a célpontot arra a tick-re tekerjük vissza, amit a lövő
+        látott (legfeljebb a szerver által mért RTT + interpolációs késleltetés), és ott
+        ellenőrizzük a hatótávot. A sebzés a lövő keretéből fogy (LASER_DAMAGE * eltelt idő),
+        a keretet túllépő claimet elutasítjuk.
+        Elfogadott találatnál a sebzést a rendszer minden kliense megkapja (a lövő is).
+        """
+        shooter = self.world.entities.get(state.ship_id)
+        target = self.world.entities.get(target_id)
+        if shooter is None or target is None or shooter.system_id != target.system_id:
+            self.hits_rejected += 1
+            return
+
+        now_tick = self.ticker.tick_count
+        max_rewind = (state.rtt + NET_INTERP_DELAY) * self.ticker.rate_hz + 1
+        view_tick = min(now_tick, max(view_tick, now_tick - max_rewind))
+        pos = None
+        if self.history is not None:
+            pos = self.history.position_at(target_id, view_tick)
+        now = self.ticker.clock()
+        if pos is None:
+            pos = target.predict(now)
+        shooter_pos = shooter.predict(now)
+
+        max_range = LASER_RANGE * (1.0 + NET_HIT_TOLERANCE)
+        dx, dy, dz = pos[0] - shooter_pos[0], pos[1] - shooter_pos[1], pos[2] - shooter_pos[2]
+        if dx * dx + dy * dy + dz * dz > max_range * max_range:
+            self.hits_rejected += 1
+            return
+
+        # Egy claim legfeljebb két tick-nyi folyamatos lézer sebzést hordozhat
+        damage = min(damage, LASER_DAMAGE * self.ticker.interval * 2)
+        if not self._spend_damage(state, damage, now):
+            self.hits_rejected += 1
+            return
+        self.hits_accepted += 1
+        # A belépők világállapota így a sebzett hull/pajzs értékeket kapja
+        self.world.apply_damage(target_id, damage)
+        datagram = create_damage_datagram(target_id, state.ship_id, damage)
+        for client in self.recipients():
+            if self._same_system(state, self.conn_states[client]):
+                self.deliver(client, datagram)
+
+    def _spend_damage(self, state, damage, now):
+        """A lövő sebzés keretének töltése az eltelt szerver idővel, majd a claim levonása, ha belefér."""
+        cap = LASER_DAMAGE * NET_DAMAGE_BURST
+        if state.budget_time is None:
+            state.damage_budget = cap
+        else:
+            state.damage_budget = min(cap, state.damage_budget + LASER_DAMAGE * (now - state.budget_time))
+        state.budget_time = now
+        if damage > state.damage_budget:
+            return False
+        state.damage_budget -= damage
+        return True
+
+    def send_world_state(self, conn):
+        """
+        A belépő kliens egyetlen tömörített csomagban kapja a naprendszere összes
+        replikált entitását (a látókörön belülieket megjelölve) és a felszereléseket.
+        """
+        state = self.conn_states[conn]
+        visible_ids = {self.conn_states[c].ship_id for c in state.visible if c in self.conn_states}
+        entities = [(record, record.entity_id in visible_ids) for record in self.world.entities.values()
+                    if record.entity_id != state.ship_id
+                    and (state.system_id is None or record.system_id in (None, state.system_id))]
+        self.deliver(conn, create_world_state_datagram(state.ship_id or 0, entities))
+        # Az egyedi tárgyak nem férnek a világállapotba, ezek teljes szerializációval mennek
+        for record, _ in entities:
+            for slot, item in record.custom_items.items():
+                self.deliver(conn, create_sync_dg(FULL_SYNC_MSGS[slot], record.entity_id, item))
+
+    def equipment_datagrams(self, record):
+        """Egy entitás nyilvántartott felszerelése szinkron csomagokként (katalógus ID-k + egyedi tárgyak)."""
+        refs = [(EQUIP_SLOT_CODES[slot], item_id) for slot, item_id in record.equipment.items()
+                if slot not in record.custom_items]
+        datagrams = [create_sync_dg(FULL_SYNC_MSGS[slot], record.entity_id, item)
+                     for slot, item in record.custom_items.items()]
+        if refs:
+            datagrams.insert(0, create_equipment_ref_datagram(record.entity_id, record.catalog_hash, refs))
+        return datagrams
+
+    def _same_system(self, a, b):
+        # Amíg egy kliens rendszere ismeretlen, mindent megkap
+        return a.system_id is None or b.system_id is None or a.system_id == b.system_id
+
+    def _position(self, state, now):
+        """A kapcsolat hajójának now-ra extrapolált pozíciója (EntityRecord.predict), vagy None."""
+        record = self.world.entities.get(state.ship_id)
+        if record is None:
+            return state.pos
+        return record.predict(now)
+
+    def _in_interest(self, a, b, now):
+        if not self._same_system(a, b):
+            return False
+        a_pos, b_pos = self._position(a, now), self._position(b, now)
+        if a_pos is None or b_pos is None:
+            return True
+        dx, dy, dz = a_pos[0] - b_pos[0], a_pos[1] - b_pos[1], a_pos[2] - b_pos[2]
+        return dx * dx + dy * dy + dz * dz <= self.interest_radius * self.interest_radius
+
+    def refresh_interest(self):
+        """
+        A mozgó (nem nulla sebességű) hajók AOI-ja a két snapshot közötti extrapolált pozíciókkal.
+        A teljes (kliensszámmal arányos) ellenőrzés csak akkor fut, ha a hajó a legutóbbi óta
+        NET_INTEREST_MARGIN-nál többet mozdult; egy pár láthatósága így legfeljebb két margónyit késhet.
+        """
+        entities = self.world.entities
+        now = self.ticker.clock()
+        margin_sq = NET_INTEREST_MARGIN * NET_INTEREST_MARGIN
+        for conn, state in list(self.conn_states.items()):
+            record = entities.get(state.ship_id)
+            if record is None or record.vel == (0.0, 0.0, 0.0) or conn not in self.conn_states:
+                continue
+            last = state.interest_pos
+            if last is not None:
+                pos = record.predict(now)
+                dx, dy, dz = pos[0] - last[0], pos[1] - last[1], pos[2] - last[2]
+                if dx * dx + dy * dy + dz * dz <= margin_sq:
+                    continue
+            self.update_interest(conn)
+
+    def update_interest(self, conn):
+        """
+        A mozgó hajó és az összes többi közötti láthatóság frissítése.
+        Határátlépéskor belépés/kilépés értesítést küldünk mindkét félnek.
+        """
+        state = self.conn_states[conn]
+        now = self.ticker.clock()
+        state.interest_pos = self._position(state, now)
+        for other_conn in self.recipients():
+            other = self.conn_states[other_conn]
+            if other_conn == conn or other.ship_id is None:
+                continue
+            visible = self._in_interest(state, other, now)
+            if visible == (conn in other.visible):
+                continue
+
+            if visible:
+                other.visible.add(conn)
+                state.visible.add(other_conn)
+            else:
+                other.visible.discard(conn)
+                state.visible.discard(other_conn)
+            self._notify_interest(other_conn, state.ship_id, visible)
+            self._notify_interest(conn, other.ship_id, visible)
+
+    def _notify_interest(self, observer_conn, ship_id, visible):
+        msg_type = MSG_ENTITY_ENTER if visible else MSG_ENTITY_LEAVE
+        self.deliver(observer_conn, create_interest_datagram(msg_type, ship_id))
+
     def broadcast(self, datagram, exclude_conn=None):
-        """Adat küldése minden kliensnek"""
-        for client in self.clients:
+        """Adat sorba állítása minden kliensnek (a következő szerver tick küldi ki)"""
+        for client in self.recipients():
             if client != exclude_conn:
-                self.cWriter.send(datagram, client, True)
+                self.deliver(client, datagram)
+
+    def flush(self):
+        """
+        Kapcsolatonként egyetlen flush: a prioritásos sorból a tick bájt keretéig.
+        A megbízható forgalmával is túlcsorduló (lassú) klienst bontjuk.
+        """
+        queued = sum(len(q) for q in self.outboxes.values())
+        self.peak_queue = max(self.peak_queue, queued)
+        slow_clients = []
+        for client in self.clients:
+            queue = self.outboxes[client]
+            if queue.overflowed:
+                slow_clients.append(client)
+                continue
+            if not len(queue):
+                continue
+            reliable, unreliable = queue.take()
+
+            if reliable:
+                batches = pack_batches(reliable) if self.stats is None else measured_batches(self.stats, client, reliable)
+                for datagram in batches:
+                    if self.capture is not None:
+                        self.capture.record(DIR_OUT, client, datagram.getMessage())
+                    if self.transport is not None:
+                        client.send(datagram.getMessage())
+                    else:
+                        self.cWriter.send(datagram, client, True)
+                client.flush()
+
+            if unreliable:
+                address = self.conn_states[client].udp_address
+                batches = pack_batches(unreliable) if self.stats is None else measured_batches(self.stats, client, unreliable)
+                for datagram in batches:
+                    if self.capture is not None:
+                        self.capture.record(DIR_OUT, client, datagram.getMessage())
+                    self.cWriter.send(datagram, self.udpSocket, address)
+
+        for client in slow_clients:
+            print(f"[SERVER] Kimenő sor túlcsordult, kapcsolat bontása: {self.conn_states[client].ship_id}")
+            self.remove_client(client)
+
+def run_headless(server, frame_rate):
+    """
+    Dedikált szerver ablak, hang és renderelés nélkül: csak a task manager fut,
+    korlátozott ciklusidővel, így egy gépen több példány is elfér.
+    """
+    from panda3d.core import loadPrcFileData, ClockObject
+    loadPrcFileData("", "window-type none")
+    loadPrcFileData("", "audio-library-name null")
+    # A globális óra a taskMgr importjakor már létrejött, ezért közvetlenül állítjuk
+    clock = ClockObject.getGlobalClock()
+    clock.setMode(ClockObject.MLimited)
+    clock.setFrameRate(frame_rate)
+    if not server.start():
+        print(f"[SERVER] Nem sikerült elindítani a szervert a {server.port}-es porton.")
+        sys.exit(1)
+    # SIGTERM-re is rendes kilépés, hogy a capture puffere kiíródjon
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        taskMgr.run()
+    finally:
+        server.stop_capture()
 
 # Ez a rész csak akkor fut le, ha közvetlenül indítod a fájlt
 if __name__ == "__main__":
-    from direct.showbase.ShowBase import ShowBase
-    base = ShowBase()
-    server = GameServer()
-    server.start()
-    base.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cerberus relay szerver")
+    parser.add_argument("--headless", action="store_true", help="dedikált mód ablak és renderelés nélkül")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--udp-port", type=int, default=UDP_PORT)
+    parser.add_argument("--tick-rate", type=float, default=None, help="hálózati tick (Hz)")
+    parser.add_argument("--backend", choices=["panda", "asyncio"], default=NET_BACKEND)
+    parser.add_argument("--capture", default=None, help="forgalom rögzítése ebbe a fájlba (net/capture.py)")
+    parser.add_argument("--stats", type=float, default=0.0, help="terhelési jelentés gyakorisága (mp), 0 = ki")
+    parser.add_argument("--frame-rate", type=int, default=120, help="headless ciklus felső korlátja (Hz)")
+    args = parser.parse_args()
+
+    server = GameServer(port=args.port, udp_port=args.udp_port, backend=args.backend)
+    if args.tick_rate:
+        server.ticker.set_rate(args.tick_rate)
+    if args.capture:
+        server.start_capture(args.capture)
+    if args.stats > 0:
+        taskMgr.doMethodLater(args.stats, server.stats_task, "ServerStatsTask")
+
+    if args.headless:
+        run_headless(server, args.frame_rate)
+    else:
+        from direct.showbase.ShowBase import ShowBase
+        base = ShowBase()
+        server.start()
+        try:
+            base.run()
+        finally:
+            server.stop_capture()
@@ -0,0 +1,407 @@
+"""
+Több folyamatos (sharded) szerver: naprendszerenként (csoportonként) egy worker folyamat.
+
+Felépítés:
+    router   egyetlen asyncio TCP listener a PORT-on (a Panda keretezéssel kompatibilis),
+             kapcsolatonként eldönti, melyik worker kapja a forgalmat, és visszaírja a
+             worker válaszait a kliens socketjére
+    worker   egy GameServer (ShardServer) socketek nélkül; a router pipe-on küldi a
+             beérkező datagramokat, a tick végén egyetlen üzenetben kapja vissza a kimenetet
+
+A naprendszer -> worker hozzárendelés: system_id % worker szám. Amíg egy kapcsolat
+rendszere ismeretlen, a 0. worker kezeli. Ha egy snapshot más worker rendszerét hozza
+(Galaxy.warp_player kapuugrás után), a worker átadja a hajót (handoff): a régi peerek
+kilépés értesítést kapnak, a hajó világállapota és snapshot dekódere átkerül az új
+workerre, ahol az érkező egyetlen világállapot csomagot kap (MSG_LOGIN), a rendszer
+többi kliense pedig a nyilvántartott felszerelését.
+
+Csak TCP: a UDP HELLO-ra nem jön válasz, így a kliensek a megbízható csatornán maradnak.
+
+Használat:
+    python -m net.shard --workers 4 --port 9099
+"""
+import argparse
+import asyncio
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+from itertools import count
+from pathlib import Path
+
+root_path = str(Path(__file__).parent.parent)
+if root_path not in sys.path:
+    sys.path.append(root_path)
+
+from direct.distributed.PyDatagram import PyDatagram
+
+from globals import PORT, NET_SHARD_WORKERS
+from net.server import GameServer
+from net.transport import HEADER, new_event_loop
+from net.protocol import pack_batches
+
+# Router <-> worker üzenetek (pipe-on, pickle-lel)
+LINK_CONNECT = 0     # (LINK_CONNECT, conn_id, handoff állapot vagy None)
+LINK_DATA = 1        # (LINK_DATA, [(conn_id, bytes), ...])
+LINK_DISCONNECT = 2  # (LINK_DISCONNECT, conn_id) - a kliens bontott
+LINK_CLOSE = 3       # (LINK_CLOSE, conn_id) - a worker bontja a klienst (pl. túlcsorduló sor)
+LINK_HANDOFF = 4     # (LINK_HANDOFF, conn_id, system_id, handoff állapot)
+LINK_STOP = 5
+
+
+def shard_for(system_id, workers):
+    """A naprendszert kezelő worker indexe (ismeretlen rendszer: 0)."""
+    if system_id is None:
+        return 0
+    return system_id % workers
+
+
+# --- Worker oldal ---
+class ShardLink:
+    """A worker pipe vége: a kimenő datagramokat gyűjti, tick-enként egy üzenetben küldi."""
+    def __init__(self, pipe):
+        self.pipe = pipe
+        self.pending = []
+
+    def send_data(self, conn_id, data):
+        self.pending.append((conn_id, data))
+
+    def control(self, message):
+        # A sorrend megmarad: az addig gyűjtött adat a vezérlő üzenet előtt megy ki
+        self.flush()
+        self.pipe.send(message)
+
+    def flush(self):
+        if self.pending:
+            self.pipe.send((LINK_DATA, self.pending))
+            self.pending = []
+
+
+class ShardConnection:
+    """Egy routeren át érkező kliens a worker felől (a GameServer transport ágát használja)."""
+    def __init__(self, conn_id, link):
+        self.conn_id = conn_id
+        self.link = link
+        self.address = ("shard", conn_id)
+        self.detached = False  # átadás vagy kliens oldali bontás után a close() nem szól a routernek
+
+    def send(self, data):
+        self.link.send_data(self.conn_id, data)
+
+    def flush(self):
+        # A ShardServer.flush a tick végén egyszerre üríti a linket
+        pass
+
+    def close(self):
+        if not self.detached:
+            self.link.control((LINK_CLOSE, self.conn_id))
+
+
+class ShardServer(GameServer):
+    """Egy worker GameServer-e: a router pipe-ja a transport, a kliensek ShardConnection-ök."""
+    def __init__(self, index, workers, link):
+        super().__init__(manager=None)
+        # A workeren nincs Host helyi játék: a None kulcs csak elnyelné az átadott kapcsolatok késő üzeneteit
+        self.conn_states.pop(None, None)
+        self.index = index
+        self.workers = workers
+        self.link = link
+        self.transport = link  # a flush így a ShardConnection.send()-et hívja
+        self.connections = {}  # conn_id -> ShardConnection
+        self.pending_handoffs = []
+        self.handoffs_out = 0
+        self.handoffs_in = 0
+
+    def handle(self, message):
+        kind = message[0]
+        if kind == LINK_DATA:
+            for conn_id, data in message[1]:
+                # Átadott / bontott kapcsolat még úton lévő datagramjait eldobjuk
+                conn = self.connections.get(conn_id)
+                if conn is not None and conn in self.conn_states:
+                    self.receive(PyDatagram(data), conn)
+        elif kind == LINK_CONNECT:
+            _, conn_id, handoff = message
+            conn = self.connections[conn_id] = ShardConnection(conn_id, self.link)
+            self.add_client(conn, f"#{conn_id}")
+            if handoff is not None:
+                self.adopt(conn, handoff)
+        elif kind == LINK_DISCONNECT:
+            conn = self.connections.pop(message[1], None)
+            if conn is not None:
+                conn.detached = True
+                self.remove_client(conn)
+
+    def update_interest(self, conn):
+        state = self.conn_states[conn]
+        if conn is not None and shard_for(state.system_id, self.workers) != self.index:
+            # Az átadás a tick elejére halasztódik, így az ugyanabban a csomagban
+            # érkező további üzenetek (pl. felszerelés) még a világállapotba kerülnek
+            if conn not in self.pending_handoffs:
+                self.pending_handoffs.append(conn)
+            return
+        super().update_interest(conn)
+
+    def hand_off(self, conn):
+        state = self.conn_states[conn]
+        # A hajó eddigi peerjei eltűnnek a kliensnél; a várakozó állapotaik ezzel törlődnek
+        for other_conn in state.visible:
+            other = self.conn_states.get(other_conn)
+            if other is not None and other.ship_id is not None:
+                self._notify_interest(conn, other.ship_id, False)
+        # A teljes sor kimegy a LINK_HANDOFF előtt: a keret feletti maradék a régi
+        # workerrel együtt veszne el (a kapcsolatot az új worker üres sorral veszi át)
+        reliable, _ = self.outboxes[conn].drain()
+        for datagram in pack_batches(reliable):
+            conn.send(datagram.getMessage())
+
+        handoff = {
+            "ship_id": state.ship_id,
+            "system_id": state.system_id,
+            "pos": state.pos,
+            "record": self.world.entities.get(state.ship_id),
+            "decoder": self.snapshot_decoders.get(state.ship_id),
+        }
+        conn.detached = True
+        self.connections.pop(conn.conn_id, None)
+        self.link.control((LINK_HANDOFF, conn.conn_id, state.system_id, handoff))
+        self.handoffs_out += 1
+        self.remove_client(conn)
+
+    def adopt(self, conn, handoff):
+        """Átvett hajó: állapot, világrekord és dekóder, majd AOI és felszerelés szinkron."""
+        state = self.conn_states[conn]
+        state.ship_id = handoff["ship_id"]
+        state.system_id = handoff["system_id"]
+        state.pos = handoff["pos"]
+        if handoff["record"] is not None:
+            self.world.entities[state.ship_id] = handoff["record"]
+        if handoff["decoder"] is not None:
+            self.snapshot_decoders[state.ship_id] = handoff["decoder"]
+        self.handoffs_in += 1
+        self.update_interest(conn)
+
+        # Az érkező a rendszer világállapotát kapja, a rendszer többi kliense az érkező felszerelését
+        self.send_world_state(conn)
+        if handoff["record"] is not None:
+            datagrams = self.equipment_datagrams(handoff["record"])
+            for other_conn in self.clients:
+                if other_conn != conn and self._same_system(state, self.conn_states[other_conn]):
+                    for datagram in datagrams:
+                        self.deliver(other_conn, datagram)
+
+    def send_world_state(self, conn):
+        # Átadásra váró kapcsolat: a világállapotot már az új worker küldi
+        if conn not in self.pending_handoffs:
+            super().send_world_state(conn)
+
+    def flush(self):
+        handoffs, self.pending_handoffs = self.pending_handoffs, []
+        for conn in handoffs:
+            if conn in self.conn_states:
+                self.hand_off(conn)
+        super().flush()
+        self.link.flush()
+
+    def stats_task(self, task):
+        print(f"[SHARD {self.index}] átadás ki/be: {self.handoffs_out}/{self.handoffs_in}", flush=True)
+        return super().stats_task(task)
+
+
+def run_worker(index, workers, pipe, tick_rate=None, stats_interval=0.0):
+    """Worker folyamat: pipe pollolás a tick-ek között, socketek és taskMgr nélkül."""
+    server = ShardServer(index, workers, ShardLink(pipe))
+    if tick_rate:
+        server.ticker.set_rate(tick_rate)
+    print(f"[SHARD {index}] Worker elindítva ({workers} közül).", flush=True)
+
+    next_stats = time.perf_counter() + stats_interval
+    wait = server.ticker.interval / 4
+    try:
+        while True:
+            if pipe.poll(wait):
+                while pipe.poll():
+                    message = pipe.recv()
+                    if message[0] == LINK_STOP:
+                        return
+                    server.handle(message)
+            server.ticker.update()
+            if stats_interval > 0 and time.perf_counter() >= next_stats:
+                next_stats += stats_interval
+                server.stats_task(None)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        server.stop_capture()
+
+
+# --- Router oldal ---
+class PipeFeeder:
+    """
+    Router -> worker írás háttérszálon. A pipe send blokkol, ha a worker lemarad; ha ez az
+    eseményhurokban történne, a router nem olvasná a worker kimenetét, a worker pedig a
+    saját (nagy) tick kimenetének küldésében akadna el - kölcsönös holtpont. Így a hurok
+    sosem blokkol, a lemaradt worker üzenetei a sorban várnak.
+    """
+    def __init__(self, pipe, name):
+        self.pipe = pipe
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def send(self, message):
+        self.queue.put(message)
+
+    def close(self):
+        self.queue.put(None)
+
+    def _run(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                return
+            try:
+                self.pipe.send(message)
+            except (BrokenPipeError, OSError):
+                return
+
+
+class ShardRouter:
+    def __init__(self, pipes, port=PORT):
+        self.pipes = pipes
+        self.port = port
+        self.loop = None
+        self.writers = {}  # conn_id -> StreamWriter
+        self.owner = {}    # conn_id -> worker index
+        self._ids = count(1)
+        self.feeders = [PipeFeeder(pipe, f"CerberusRouterFeed-{index}") for index, pipe in enumerate(pipes)]
+        self._pending = [[] for _ in pipes]  # workerenként a következő LINK_DATA tartalma
+        self._flush_scheduled = False
+        self._server = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        for index, pipe in enumerate(self.pipes):
+            self.loop.add_reader(pipe.fileno(), self._on_worker, index)
+        self._server = await asyncio.start_server(self._on_client, None, self.port)
+        print(f"[ROUTER] Router elindítva a {self.port}-es porton, {len(self.pipes)} worker.")
+
+    def _send(self, index, message):
+        # Az addig gyűjtött adat a vezérlő üzenet előtt megy ki (a feeder sorrendtartó)
+        pending = self._pending[index]
+        if pending:
+            self.feeders[index].send((LINK_DATA, pending))
+            self._pending[index] = []
+        self.feeders[index].send(message)
+
+    def _forward(self, conn_id, data):
+        self._pending[self.owner[conn_id]].append((conn_id, data))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.loop.call_soon(self._flush_pending)
+
+    def _flush_pending(self):
+        self._flush_scheduled = False
+        for index, pending in enumerate(self._pending):
+            if pending:
+                self.feeders[index].send((LINK_DATA, pending))
+                self._pending[index] = []
+
+    async def _on_client(self, reader, writer):
+        conn_id = next(self._ids)
+        self.writers[conn_id] = writer
+        self.owner[conn_id] = 0
+        self._send(0, (LINK_CONNECT, conn_id, None))
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                self._forward(conn_id, await reader.readexactly(HEADER.unpack(header)[0]))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self.writers.pop(conn_id, None)
+            index = self.owner.pop(conn_id, None)
+            if index is not None:
+                self._send(index, (LINK_DISCONNECT, conn_id))
+
+    def _on_worker(self, index):
+        pipe = self.pipes[index]
+        try:
+            while pipe.poll():
+                self._handle_worker(index, pipe.recv())
+        except EOFError:
+            print(f"[ROUTER] A(z) {index}. worker leállt.")
+            self.loop.remove_reader(pipe.fileno())
+
+    def _handle_worker(self, index, message):
+        kind = message[0]
+        if kind == LINK_DATA:
+            chunks = {}
+            for conn_id, data in message[1]:
+                chunks.setdefault(conn_id, []).extend((HEADER.pack(len(data)), data))
+            for conn_id, parts in chunks.items():
+                writer = self.writers.get(conn_id)
+                if writer is not None and not writer.is_closing():
+                    writer.write(b"".join(parts))
+        elif kind == LINK_HANDOFF:
+            _, conn_id, system_id, handoff = message
+            if conn_id not in self.owner:
+                return  # a kliens időközben bontott
+            target = shard_for(system_id, len(self.pipes))
+            self.owner[conn_id] = target
+            self._send(target, (LINK_CONNECT, conn_id, handoff))
+            print(f"[ROUTER] Átadás: {handoff['ship_id']} -> {system_id}. rendszer ({index}. -> {target}. worker)")
+        elif kind == LINK_CLOSE:
+            conn_id = message[1]
+            if self.owner.get(conn_id) == index:
+                self.owner.pop(conn_id)
+                writer = self.writers.get(conn_id)
+                if writer is not None:
+                    writer.close()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+        for feeder in self.feeders:
+            feeder.send((LINK_STOP,))
+            feeder.close()
+        for feeder in self.feeders:
+            feeder.thread.join(timeout=2.0)
+
+
+def run_sharded(workers, port=PORT, tick_rate=None, stats_interval=0.0):
+    context = multiprocessing.get_context("spawn")
+    pipes, processes = [], []
+    for index in range(workers):
+        parent_end, child_end = context.Pipe()
+        process = context.Process(target=run_worker, args=(index, workers, child_end, tick_rate, stats_interval),
+                                  name=f"CerberusShard-{index}", daemon=True)
+        process.start()
+        pipes.append(parent_end)
+        processes.append(process)
+
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    router = ShardRouter(pipes, port)
+    try:
+        loop.run_until_complete(router.start())
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        router.stop()
+        for process in processes:
+            process.join(timeout=2.0)
+        loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cerberus sharded szerver (naprendszerenkénti worker folyamatok)")
+    parser.add_argument("--workers", type=int, default=NET_SHARD_WORKERS)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--tick-rate", type=float, default=None, help="hálózati tick (Hz)")
+    parser.add_argument("--stats", type=float, default=0.0, help="workerenkénti terhelési jelentés (mp), 0 = ki")
+    args = parser.parse_args()
+    run_sharded(max(1, args.workers), args.port, args.tick_rate, args.stats)
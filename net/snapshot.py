@@ -0,0 +1,433 @@
+"""
+Kvantált, delta kódolt transzform snapshotok (MSG_SNAPSHOT).
+
+Egy snapshot a hajó pozícióját (a naprendszer origójához képest), orientációját
+(heading/pitch/roll), sebességét és a naprendszer azonosítóját írja le.
+Csak azokat a mezőket küldjük, amelyek eltérnek a fogadók által utoljára
+visszaigazolt (ACK) állapottól (baseline).
+
+Bitfolyam felépítése (a Uint8 típus és Uint16 entitás ID után):
+    seq        SEQ_BITS        küldő tick száma (modulo), egyben időbélyeg
+    baseline   BASELINE_BITS   seq - baseline_seq, 0 = kulcskocka (nincs baseline)
+    mask       4 bit           pos | hpr | vel | system
+    pos        2 bit méretosztály + 3 tengely (delta vagy abszolút)
+    hpr        3 bit tengely maszk + változott tengelyek ANGLE_BITS-en
+    vel        3 x VEL_BITS
+    system     SYSTEM_BITS
+
+Round-trip önellenőrzés (kvantálási hiba, delta dekódolás): python -m net.snapshot
+"""
+from collections import deque
+
+# --- Kvantálási paraméterek ---
+POS_RANGE = 16384.0     # ± egység a naprendszer origójától
+POS_BITS = 20           # ~3 cm felbontás
+ANGLE_BITS = 12         # ~0.09 fok felbontás
+VEL_RANGE = 512.0       # ± egység/s
+VEL_BITS = 14           # ~0.06 egység/s felbontás
+SYSTEM_BITS = 16
+
+SEQ_BITS = 12
+SEQ_MOD = 1 << SEQ_BITS
+BASELINE_BITS = 6
+HISTORY_SIZE = (1 << BASELINE_BITS) - 1   # ennyi tick-re visszamenőleg lehet baseline
+
+# Pozíció delta méretosztályok (bit / tengely), a 3-as osztály abszolút érték
+POS_DELTA_CLASSES = (8, 12, 16)
+POS_ABSOLUTE_CLASS = 3
+
+FIELD_POS = 1
+FIELD_HPR = 2
+FIELD_VEL = 4
+FIELD_SYSTEM = 8
+
+POS_STEP = (2 * POS_RANGE) / (1 << POS_BITS)
+ANGLE_STEP = 360.0 / (1 << ANGLE_BITS)
+VEL_STEP = (2 * VEL_RANGE) / (1 << VEL_BITS)
+
+
+class BitWriter:
+    """Egyszerű bit szintű író (LSB-first), a végén bájtokra zár."""
+    def __init__(self):
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value, bits):
+        self._acc |= (value & ((1 << bits) - 1)) << self._bits
+        self._bits += bits
+
+    def write_signed(self, value, bits):
+        self.write(value & ((1 << bits) - 1), bits)
+
+    def bit_length(self):
+        return self._bits
+
+    def to_bytes(self):
+        return self._acc.to_bytes((self._bits + 7) // 8, "little")
+
+
+class BitReader:
+    def __init__(self, data):
+        self._acc = int.from_bytes(data, "little")
+        self._pos = 0
+        self._size = len(data) * 8
+
+    def read(self, bits):
+        if self._pos + bits > self._size:
+            raise ValueError("Snapshot bitfolyam túlolvasás")
+        value = (self._acc >> self._pos) & ((1 << bits) - 1)
+        self._pos += bits
+        return value
+
+    def read_signed(self, bits):
+        value = self.read(bits)
+        if value & (1 << (bits - 1)):
+            value -= 1 << bits
+        return value
+
+
+# --- Kvantálás ---
+def _quantize_linear(value, value_range, bits):
+    top = (1 << bits) - 1
+    q = int(round((value + value_range) / (2 * value_range) * (1 << bits)))
+    return min(max(q, 0), top)
+
+
+def _dequantize_linear(q, value_range, bits):
+    return q * (2 * value_range) / (1 << bits) - value_range
+
+
+def _quantize_angle(deg):
+    return int(round((deg % 360.0) / ANGLE_STEP)) & ((1 << ANGLE_BITS) - 1)
+
+
+def _dequantize_angle(q):
+    value = q * ANGLE_STEP
+    return value - 360.0 if value > 180.0 else value
+
+
+def quantize_state(pos, hpr, vel, system_id):
+    """
+    Lebegőpontos transzform -> kvantált állapot tuple.
+    A pos-nak már a naprendszer origójához képest relatívnak kell lennie.
+    """
+    return (
+        _quantize_linear(pos[0], POS_RANGE, POS_BITS),
+        _quantize_linear(pos[1], POS_RANGE, POS_BITS),
+        _quantize_linear(pos[2], POS_RANGE, POS_BITS),
+        _quantize_angle(hpr[0]),
+        _quantize_angle(hpr[1]),
+        _quantize_angle(hpr[2]),
+        _quantize_linear(vel[0], VEL_RANGE, VEL_BITS),
+        _quantize_linear(vel[1], VEL_RANGE, VEL_BITS),
+        _quantize_linear(vel[2], VEL_RANGE, VEL_BITS),
+        (system_id if system_id is not None else 0) & ((1 << SYSTEM_BITS) - 1),
+    )
+
+
+def dequantize_state(q):
+    """Kvantált állapot -> (pos, hpr, vel, system_id)."""
+    pos = tuple(_dequantize_linear(v, POS_RANGE, POS_BITS) for v in q[0:3])
+    hpr = tuple(_dequantize_angle(v) for v in q[3:6])
+    vel = tuple(_dequantize_linear(v, VEL_RANGE, VEL_BITS) for v in q[6:9])
+    return pos, hpr, vel, q[9]
+
+
+# Alapállapot a kulcskockákhoz: minden mezőt elküldünk, ami ettől eltér
+EMPTY_STATE = quantize_state((0.0, 0.0, 0.0), (0.0, 0.0, 0.0), (0.0, 0.0, 0.0), 0)
+
+
+def is_keyframe(data):
+    """Igaz, ha a bitfolyam (a típus és a küldő ID utáni rész) kulcskocka (nincs baseline)."""
+    return BitReader(data).read(SEQ_BITS + BASELINE_BITS) >> SEQ_BITS == 0
+
+
+def seq_diff(a, b):
+    """a - b modulo SEQ_MOD, előjelesen (-SEQ_MOD/2 .. SEQ_MOD/2)."""
+    d = (a - b) % SEQ_MOD
+    return d - SEQ_MOD if d >= SEQ_MOD // 2 else d
+
+
+# --- Kódolás ---
+def write_state(writer, seq, baseline_offset, state, base):
+    writer.write(seq % SEQ_MOD, SEQ_BITS)
+    writer.write(baseline_offset, BASELINE_BITS)
+
+    mask = 0
+    if state[0:3] != base[0:3]: mask |= FIELD_POS
+    if state[3:6] != base[3:6]: mask |= FIELD_HPR
+    if state[6:9] != base[6:9]: mask |= FIELD_VEL
+    if state[9] != base[9]: mask |= FIELD_SYSTEM
+    writer.write(mask, 4)
+
+    if mask & FIELD_POS:
+        deltas = [state[i] - base[i] for i in range(3)]
+        largest = max(abs(d) for d in deltas)
+        size_class = POS_ABSOLUTE_CLASS
+        for idx, bits in enumerate(POS_DELTA_CLASSES):
+            if largest < (1 << (bits - 1)):
+                size_class = idx
+                break
+        writer.write(size_class, 2)
+        if size_class == POS_ABSOLUTE_CLASS:
+            for i in range(3):
+                writer.write(state[i], POS_BITS)
+        else:
+            for d in deltas:
+                writer.write_signed(d, POS_DELTA_CLASSES[size_class])
+
+    if mask & FIELD_HPR:
+        axes = 0
+        for i in range(3):
+            if state[3 + i] != base[3 + i]:
+                axes |= 1 << i
+        writer.write(axes, 3)
+        for i in range(3):
+            if axes & (1 << i):
+                writer.write(state[3 + i], ANGLE_BITS)
+
+    if mask & FIELD_VEL:
+        for i in range(6, 9):
+            writer.write(state[i], VEL_BITS)
+
+    if mask & FIELD_SYSTEM:
+        writer.write(state[9], SYSTEM_BITS)
+
+
+def read_state(reader, history):
+    """
+    Egy snapshot kiolvasása. A history a fogadó oldali {seq: state} tároló.
+    Visszatérés: (seq, state), vagy (seq, None) ha a baseline már nem érhető el.
+    """
+    seq = reader.read(SEQ_BITS)
+    baseline_offset = reader.read(BASELINE_BITS)
+    mask = reader.read(4)
+
+    if baseline_offset == 0:
+        base = EMPTY_STATE
+    else:
+        base = history.get((seq - baseline_offset) % SEQ_MOD)
+
+    state = list(base) if base is not None else list(EMPTY_STATE)
+
+    if mask & FIELD_POS:
+        size_class = reader.read(2)
+        if size_class == POS_ABSOLUTE_CLASS:
+            for i in range(3):
+                state[i] = reader.read(POS_BITS)
+        else:
+            for i in range(3):
+                state[i] += reader.read_signed(POS_DELTA_CLASSES[size_class])
+
+    if mask & FIELD_HPR:
+        axes = reader.read(3)
+        for i in range(3):
+            if axes & (1 << i):
+                state[3 + i] = reader.read(ANGLE_BITS)
+
+    if mask & FIELD_VEL:
+        for i in range(6, 9):
+            state[i] = reader.read(VEL_BITS)
+
+    if mask & FIELD_SYSTEM:
+        state[9] = reader.read(SYSTEM_BITS)
+
+    if base is None:
+        return seq, None
+    return seq, tuple(state)
+
+
+class SnapshotEncoder:
+    """
+    Küldő oldali állapot egy replikált entitáshoz.
+    Nyilvántartja az elküldött állapotokat és a fogadók visszaigazolásait.
+
+    Ugyanaz a csomag megy minden fogadónak, ezért baseline csak olyan seq lehet, amit
+    MINDEN fogadó visszaigazolt: peerenként a visszaigazolt seq-ek halmazát tartjuk
+    (nem csak a legújabbat), mert egy újabb seq ACK-ja nem jelenti, hogy a régebbi is megjött.
+    Az add_peer-rel bejelentett (pl. MSG_ENTITY_ENTER) fogadó addig kulcskockát kap,
+    amíg nincs a history ablakban visszaigazolt állapota.
+    """
+    def __init__(self, keyframe_interval=HISTORY_SIZE):
+        self.keyframe_interval = keyframe_interval
+        self.history = deque()      # (seq, state), legrégebbi elöl
+        self.acks = {}              # peer_id -> {visszaigazolt seq-ek a history ablakban}
+        self.peers = set()          # bejelentett fogadók (ezeket nem felejtjük el az ACK-ok elavulásakor)
+        self.last_keyframe_seq = None
+
+    def add_peer(self, peer_id):
+        """Új (vagy a dekóderét újrakezdő) fogadó: a korábbi visszaigazolásai már nem érvényesek."""
+        self.peers.add(peer_id)
+        self.acks[peer_id] = set()
+
+    def on_ack(self, peer_id, seq):
+        self.acks.setdefault(peer_id, set()).add(seq % SEQ_MOD)
+
+    def forget_peer(self, peer_id):
+        self.peers.discard(peer_id)
+        self.acks.pop(peer_id, None)
+
+    def _choose_baseline(self, seq):
+        """A legújabb, minden fogadó által visszaigazolt állapot (vagy None)."""
+        if not self.acks:
+            return None
+        common = None
+        for peer_id, acked in list(self.acks.items()):
+            acked.difference_update([s for s in acked if not 0 < seq_diff(seq, s) < HISTORY_SIZE])
+            if not acked:
+                if peer_id in self.peers:
+                    # Bejelentett fogadó közös baseline nélkül: kulcskocka
+                    return None
+                # Csak ACK-ból ismert peer elavult visszaigazolásokkal: kiesett a history ablakból
+                del self.acks[peer_id]
+                continue
+            common = set(acked) if common is None else common & acked
+            if not common:
+                return None
+        if not common:
+            return None
+        for h_seq, h_state in reversed(self.history):
+            if h_seq in common:
+                return h_seq, h_state
+        return None
+
+    def encode(self, writer, seq, state):
+        """Egy tick állapotának kódolása a writer-be."""
+        seq %= SEQ_MOD
+        baseline = self._choose_baseline(seq)
+
+        # Periodikus kulcskocka, hogy az újonnan érkező fogadók is be tudjanak kapcsolódni
+        if self.last_keyframe_seq is None or seq_diff(seq, self.last_keyframe_seq) >= self.keyframe_interval:
+            baseline = None
+
+        if baseline is None:
+            self.last_keyframe_seq = seq
+            write_state(writer, seq, 0, state, EMPTY_STATE)
+        else:
+            write_state(writer, seq, seq_diff(seq, baseline[0]), state, baseline[1])
+
+        self.history.append((seq, state))
+        while self.history and seq_diff(seq, self.history[0][0]) >= HISTORY_SIZE:
+            self.history.popleft()
+
+
+class SnapshotDecoder:
+    """Fogadó oldali állapot egy távoli entitáshoz."""
+    def __init__(self):
+        self.history = {}
+        self.last_seq = None
+
+    def decode(self, reader):
+        """
+        Visszatérés: (seq, state) vagy None, ha a csomag elavult vagy
+        a baseline hiányzik (ilyenkor a következő kulcskockát várjuk).
+        """
+        seq, state = read_state(reader, self.history)
+        if state is None:
+            return None
+        if self.last_seq is not None and seq_diff(seq, self.last_seq) <= 0:
+            return None
+
+        self.last_seq = seq
+        self.history[seq] = state
+        # Csak a baseline ablakon belüli állapotokat tartjuk meg
+        stale = [s for s in self.history if seq_diff(seq, s) >= HISTORY_SIZE or seq_diff(seq, s) < 0]
+        for s in stale:
+            del self.history[s]
+        return seq, state
+
+
+def _check(condition, message):
+    # Nem assert: a self-check python -O alatt is ellenőrizzen
+    if not condition:
+        raise AssertionError(message)
+
+
+def _check_quantization(rng, iterations):
+    """A pozíció / szög / sebesség hiba legfeljebb fél lépés, a kvantált állapot stabil."""
+    limit = POS_RANGE - POS_STEP
+    for _ in range(iterations):
+        pos = tuple(rng.uniform(-limit, limit) for _ in range(3))
+        hpr = tuple(rng.uniform(-720.0, 720.0) for _ in range(3))
+        vel = tuple(rng.uniform(-VEL_RANGE + VEL_STEP, VEL_RANGE - VEL_STEP) for _ in range(3))
+        q = quantize_state(pos, hpr, vel, rng.randrange(1 << SYSTEM_BITS))
+        d_pos, d_hpr, d_vel, _ = dequantize_state(q)
+        for a, b in zip(pos, d_pos):
+            _check(abs(a - b) <= POS_STEP / 2 + 1e-9, f"pozíció hiba: {a} -> {b}")
+        for a, b in zip(hpr, d_hpr):
+            _check(abs((a - b + 180.0) % 360.0 - 180.0) <= ANGLE_STEP / 2 + 1e-9, f"szög hiba: {a} -> {b}")
+        for a, b in zip(vel, d_vel):
+            _check(abs(a - b) <= VEL_STEP / 2 + 1e-9, f"sebesség hiba: {a} -> {b}")
+        _check(quantize_state(d_pos, d_hpr, d_vel, q[9]) == q, f"a kvantált állapot nem stabil: {q}")
+
+
+def _check_lossy_peers(rng, peers, loss, ticks, ack_delay=3):
+    """
+    Egy küldő, több fogadó, csomagonként független vesztéssel a snapshotokon és az
+    ACK-okon is (az ACK-ok ack_delay tick késéssel érnek vissza). Minden megérkezett
+    csomagnak dekódolhatónak kell lennie, és pontosan a küldött állapotot kell adnia.
+    Visszatérés: (megérkezett, delta kódolt megérkezett) csomagok száma.
+    """
+    encoder = SnapshotEncoder()
+    decoders = [SnapshotDecoder() for _ in range(peers)]
+    for peer in range(peers):
+        encoder.add_peer(peer)
+    in_flight = deque()  # (megérkezés tick-je, peer, seq)
+    pos, hpr, vel = [100.0, -250.0, 30.0], [10.0, 0.0, 0.0], (12.0, 3.0, 0.0)
+    received = deltas = 0
+    for tick in range(ticks):
+        while in_flight and in_flight[0][0] <= tick:
+            _, peer, acked = in_flight.popleft()
+            encoder.on_ack(peer, acked)
+
+        pos = [p + v * 0.05 + rng.uniform(-0.5, 0.5) for p, v in zip(pos, vel)]
+        hpr[0] += rng.uniform(-1.0, 1.0)
+        state = quantize_state(pos, hpr, vel, 7)
+        writer = BitWriter()
+        encoder.encode(writer, tick, state)
+        data = writer.to_bytes()
+        is_delta = BitReader(data).read(SEQ_BITS + BASELINE_BITS) >> SEQ_BITS != 0
+
+        for peer, decoder in enumerate(decoders):
+            if rng.random() < loss:
+                continue
+            received += 1
+            deltas += is_delta
+            result = decoder.decode(BitReader(data))
+            _check(result is not None, f"{peer}. peer nem tudta dekódolni a {tick}. tick csomagját")
+            _check(result == (tick % SEQ_MOD, state), f"{peer}. peer eltérő állapotot dekódolt ({tick}. tick)")
+            if rng.random() >= loss:
+                in_flight.append((tick + ack_delay, peer, result[0]))
+    return received, deltas
+
+
+def self_check(iterations=2000, seed=1):
+    """
+    Kvantálás és kódolás ellenőrzése (python -m net.snapshot): a kvantálási hibahatárok,
+    valamint több fogadós, veszteséges átvitel a seq körbefordulásán át.
+    Visszatérés: [(peerek, veszteség, megérkezett, delta), ...]
+    """
+    import random
+
+    rng = random.Random(seed)
+    _check_quantization(rng, iterations)
+    results = []
+    for peers, loss in ((1, 0.0), (8, 0.03), (8, 0.05), (8, 0.2)):
+        received, deltas = _check_lossy_peers(rng, peers, loss, SEQ_MOD + 200)
+        _check(deltas > 0, f"{peers} peer, {loss:.0%} veszteség: egyetlen delta csomag sem volt")
+        results.append((peers, loss, received, deltas))
+
+    # Hiányzó baseline: a fogadó eldobja a csomagot, és a következő kulcskockát várja
+    encoder, decoder = SnapshotEncoder(), SnapshotDecoder()
+    encoder.encode(BitWriter(), 0, EMPTY_STATE)
+    encoder.on_ack("peer", 0)
+    writer = BitWriter()
+    encoder.encode(writer, 1, quantize_state((5.0, 0.0, 0.0), (0.0, 0.0, 0.0), (0.0, 0.0, 0.0), 0))
+    _check(decoder.decode(BitReader(writer.to_bytes())) is None, "baseline nélkül dekódolt")
+    return results
+
+
+if __name__ == "__main__":
+    for peers, loss, received, deltas in self_check():
+        print(f"[SNAPSHOT] {peers} peer, {loss:.0%} veszteség: {received} csomag dekódolva ({deltas} delta).")
+    print("[SNAPSHOT] OK")
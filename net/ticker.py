@@ -0,0 +1,82 @@
+import time
+from direct.task import Task
+from globals import NET_TICK_RATE, DEBUG
+
+
+class NetworkTicker:
+    """
+    Fix frekvenciás hálózati óra, ami független a render frame-ektől.
+    Minden tick-ben lefutnak a feliratkozott állapotgyűjtők (listeners),
+    majd egyetlen flush hívás, ami kiküldi a tick alatt összegyűlt adatokat.
+    """
+    def __init__(self, rate_hz=NET_TICK_RATE, flush_callback=None, clock=time.perf_counter):
+        self.clock = clock
+        self.flush_callback = flush_callback
+        self.listeners = []
+        self.tick_count = 0
+        self.set_rate(rate_hz)
+
+        self._next_tick = None
+        self._window_start = None
+        self._window_ticks = 0
+        self.achieved_rate = 0.0
+
+    def set_rate(self, rate_hz):
+        """Tick frekvencia módosítása futás közben (pl. 20/30/60 Hz)."""
+        self.rate_hz = max(1.0, float(rate_hz))
+        self.interval = 1.0 / self.rate_hz
+
+    def add_listener(self, callback):
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def update(self, now=None):
+        """
+        Frame-enként hívandó. Legfeljebb egy tick-et futtat le, így egy akadás után
+        sem küldünk egyszerre több csomagot a kimaradt tickek pótlására.
+        """
+        if now is None:
+            now = self.clock()
+        if self._next_tick is None:
+            self._next_tick = now
+            self._window_start = now
+
+        if now < self._next_tick:
+            return False
+
+        # A fázist megtartjuk, de ha egy teljes intervallumnál többel lemaradtunk, újraindítjuk
+        self._next_tick += self.interval
+        if self._next_tick <= now:
+            self._next_tick = now + self.interval
+
+        self.tick_count += 1
+        self._window_ticks += 1
+        for callback in self.listeners:
+            callback()
+        if self.flush_callback:
+            self.flush_callback()
+
+        self._update_rate(now)
+        return True
+
+    def _update_rate(self, now):
+        """Elért tick frekvencia mérése egy másodperces ablakokban."""
+        elapsed = now - self._window_start
+        if elapsed < 1.0:
+            return
+        self.achieved_rate = self._window_ticks / elapsed
+        self._window_start = now
+        self._window_ticks = 0
+
+        # Ha a frame rate nem bírja a kért tick frekvenciát, jelezzük
+        if DEBUG and self.achieved_rate < self.rate_hz * 0.9:
+            print(f"[NET] Hálózati tick lemaradás: {self.achieved_rate:.1f} Hz (cél: {self.rate_hz:.0f} Hz)")
+
+    def task(self, task):
+        """taskMgr-be regisztrálható wrapper."""
+        self.update()
+        return Task.cont
@@ -0,0 +1,290 @@
+"""
+Asyncio alapú TCP transport a Panda QueuedConnection* út alternatívájaként.
+
+Az olvasás és írás egy külön háttérszálon futó event loop-ban történik, így a
+frame loop-nak nem kell minden frame-ben dataAvailable()-t pollolnia. A beérkező
+üzenetek egy deque-ba kerülnek (append/popleft szálbiztos, zár nélkül), amit a
+játék szál egyetlen poll() hívással ürít.
+
+A keretezés megegyezik a Panda ConnectionWriter alapértelmezésével
+(tcp-header-size 2: Uint16 little-endian hossz + adat), így a két backend
+egymással is kompatibilis. Ha telepítve van, a uvloop event loop-ot használjuk.
+
+Benchmark (Panda queued-connection vs. asyncio, 8 és 64 szimulált kliens):
+    python -m net.transport --clients 8 64 --seconds 5
+"""
+import asyncio
+import socket
+import struct
+import threading
+from collections import deque
+
+HEADER = struct.Struct("<H")
+MAX_MESSAGE = 0xFFFF
+
+EVENT_CONNECT = 0
+EVENT_DATA = 1
+EVENT_CLOSE = 2
+
+
+def new_event_loop():
+    """uvloop, ha elérhető, különben a szabványos asyncio loop."""
+    try:
+        import uvloop
+        return uvloop.new_event_loop()
+    except ImportError:
+        return asyncio.new_event_loop()
+
+
+class AsyncConnection:
+    """
+    Egy TCP kapcsolat a játék szál felől nézve. A Panda Connection-höz hasonlóan
+    hash-elhető kulcs, a send() csak gyűjt, a flush() egyetlen írásként küldi ki.
+    """
+    def __init__(self, transport, writer):
+        self.transport = transport
+        self.writer = writer
+        self.address = writer.get_extra_info("peername")
+        self._pending = []
+
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send(self, data):
+        if len(data) > MAX_MESSAGE:
+            raise ValueError(f"Túl nagy üzenet a TCP keretezéshez: {len(data)} bájt")
+        self._pending.append(HEADER.pack(len(data)))
+        self._pending.append(data)
+
+    def flush(self):
+        if not self._pending:
+            return
+        payload = b"".join(self._pending)
+        self._pending.clear()
+        self.transport.loop.call_soon_threadsafe(self._write, payload)
+
+    def _write(self, payload):
+        if not self.writer.is_closing():
+            self.writer.write(payload)
+
+    def close(self):
+        self.transport.loop.call_soon_threadsafe(self.writer.close)
+
+
+class AsyncioTransport:
+    """Szerver (listen) vagy kliens (connect) oldali TCP transport háttérszálon futó event loop-pal."""
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.events = deque()
+        self._server = None
+
+    def _start_loop(self):
+        if self.loop is not None:
+            return
+        self.loop = new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.call_soon(ready.set)
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name="NetworkIO", daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def listen(self, port, host=None, timeout=3.0):
+        self._start_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._on_client, host, port), self.loop)
+        try:
+            self._server = future.result(timeout)
+        except OSError as e:
+            print(f"[NET] Asyncio listen hiba ({port}): {e}")
+            return False
+        return True
+
+    def connect(self, host, port, timeout=3.0):
+        self._start_loop()
+        future = asyncio.run_coroutine_threadsafe(self._open(host, port), self.loop)
+        try:
+            return future.result(timeout)
+        except Exception as e:
+            print(f"[NET] Asyncio csatlakozási hiba ({host}:{port}): {e}")
+            future.cancel()
+            return None
+
+    async def _open(self, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        conn = AsyncConnection(self, writer)
+        self.loop.create_task(self._read_loop(conn, reader))
+        return conn
+
+    async def _on_client(self, reader, writer):
+        conn = AsyncConnection(self, writer)
+        self.events.append((EVENT_CONNECT, conn, None))
+        await self._read_loop(conn, reader)
+
+    async def _read_loop(self, conn, reader):
+        events = self.events
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                events.append((EVENT_DATA, conn, await reader.readexactly(HEADER.unpack(header)[0])))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            conn.writer.close()
+            events.append((EVENT_CLOSE, conn, None))
+
+    def poll(self):
+        """A játék szálon: az eddig beérkezett (esemény, kapcsolat, adat) hármasok."""
+        events = self.events
+        while events:
+            yield events.popleft()
+
+    def close(self):
+        if self.loop is None:
+            return
+        if self._server is not None:
+            self.loop.call_soon_threadsafe(self._server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=1.0)
+        self.loop = None
+
+
+# --- Benchmark ---
+def _run_bot_swarm(port, count, rate_hz, payload_size, stop):
+    """Szimulált kliensek: rate_hz frekvencián küldenek, a választ eldobják."""
+    import selectors
+    import time
+
+    sockets = [socket.create_connection(("127.0.0.1", port)) for _ in range(count)]
+    selector = selectors.DefaultSelector()
+    for sock in sockets:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+
+    frame = HEADER.pack(payload_size) + bytes(payload_size)
+    interval = 1.0 / rate_hz
+    next_send = time.perf_counter()
+    while not stop.is_set():
+        now = time.perf_counter()
+        if now >= next_send:
+            next_send += interval
+            for sock in sockets:
+                try:
+                    sock.send(frame)
+                except (BlockingIOError, ConnectionError):
+                    pass
+        for key, _ in selector.select(timeout=max(0.0, next_send - time.perf_counter())):
+            try:
+                key.fileobj.recv(65536)
+            except (BlockingIOError, ConnectionError):
+                pass
+    for sock in sockets:
+        sock.close()
+
+
+def _panda_server(port):
+    """A jelenlegi út: listener + reader pollolás minden frame-ben, visszhang a küldőnek."""
+    from panda3d.core import (QueuedConnectionManager, QueuedConnectionListener, QueuedConnectionReader,
+                              ConnectionWriter, PointerToConnection, NetAddress, NetDatagram)
+    from direct.distributed.PyDatagramIterator import PyDatagramIterator
+
+    manager = QueuedConnectionManager()
+    listener = QueuedConnectionListener(manager, 0)
+    reader = QueuedConnectionReader(manager, 0)
+    writer = ConnectionWriter(manager, 0)
+    listener.addConnection(manager.openTCPServerRendezvous(port, 1000))
+
+    def frame():
+        while listener.newConnectionAvailable():
+            rendezvous, address, new_conn = PointerToConnection(), NetAddress(), PointerToConnection()
+            if listener.getNewConnection(rendezvous, address, new_conn):
+                reader.addConnection(new_conn.p())
+        handled = 0
+        while reader.dataAvailable():
+            datagram = NetDatagram()
+            if reader.getData(datagram):
+                PyDatagramIterator(datagram).getUint8()
+                writer.send(datagram, datagram.getConnection(), True)
+                handled += 1
+        return handled
+
+    return frame, lambda: None
+
+
+def _asyncio_server(port):
+    """Az asyncio út: a frame csak a deque-t üríti, a socket I/O a háttérszálon fut."""
+    from direct.distributed.PyDatagram import PyDatagram
+    from direct.distributed.PyDatagramIterator import PyDatagramIterator
+
+    transport = AsyncioTransport()
+    transport.listen(port)
+    connections = set()
+
+    def frame():
+        handled = 0
+        for event, conn, data in transport.poll():
+            if event == EVENT_DATA:
+                datagram = PyDatagram(data)
+                PyDatagramIterator(datagram).getUint8()
+                conn.send(datagram.getMessage())
+                connections.add(conn)
+                handled += 1
+        for conn in connections:
+            conn.flush()
+        return handled
+
+    return frame, transport.close
+
+
+def run_benchmark(backend, clients, seconds, port, frame_rate=60, rate_hz=30, payload_size=16):
+    import statistics
+    import time
+
+    frame, shutdown = (_panda_server if backend == "panda" else _asyncio_server)(port)
+    stop = threading.Event()
+    swarm = threading.Thread(target=_run_bot_swarm, args=(port, clients, rate_hz, payload_size, stop), daemon=True)
+    swarm.start()
+
+    costs, handled = [], 0
+    frame_time = 1.0 / frame_rate
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        handled += frame()
+        cost = time.perf_counter() - start
+        costs.append(cost)
+        time.sleep(max(0.0, frame_time - cost))
+
+    stop.set()
+    swarm.join()
+    shutdown()
+
+    costs.sort()
+    p99 = costs[int(len(costs) * 0.99) - 1]
+    print(f"{backend:8s} {clients:3d} kliens: frame költség átlag {statistics.mean(costs) * 1e6:8.1f} us, "
+          f"p99 {p99 * 1e6:8.1f} us, max {costs[-1] * 1e6:8.1f} us, {handled / seconds:8.0f} üzenet/s")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hálózati backend benchmark (frame-enkénti költség)")
+    parser.add_argument("--clients", type=int, nargs="+", default=[8, 64])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=9150)
+    parser.add_argument("--backend", choices=["panda", "asyncio", "both"], default="both")
+    args = parser.parse_args()
+
+    backends = ["panda", "asyncio"] if args.backend == "both" else [args.backend]
+    port = args.port
+    for clients in args.clients:
+        for backend in backends:
+            run_benchmark(backend, clients, args.seconds, port)
+            port += 1
@@ -0,0 +1,92 @@
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Tuple
+
+from net.deadreckoning import extrapolate
+
+
+@dataclass
+class EntityRecord:
+    """Egy replikált entitás szerver oldali állapota, scene graph nélkül."""
+    entity_id: int
+    entity_type: str = "Ship"
+    system_id: Optional[int] = None
+    pos: Tuple[float, float, float] = (0.0, 0.0, 0.0)
+    hpr: Tuple[float, float, float] = (0.0, 0.0, 0.0)
+    vel: Tuple[float, float, float] = (0.0, 0.0, 0.0)
+    # A legutóbbi transzform beérkezésének ideje (szerver óra), ettől extrapolálunk
+    received_at: Optional[float] = None
+    hull: Optional[float] = None
+    shield: Optional[float] = None
+    # slot név ("core"/"support"/"system") -> katalógus item ID
+    equipment: Dict[str, int] = field(default_factory=dict)
+    # Katalógusban nem szereplő (egyedi) tárgyak teljes objektuma, slot szerint
+    custom_items: Dict[str, Any] = field(default_factory=dict)
+    # Az equipment ID-k forrás katalógusának hash-e (ItemDatabase.catalog_hash)
+    catalog_hash: int = 0
+
+    def predict(self, now):
+        """
+        A becsült pozíció now-kor: ugyanaz a modell, amit a küldő DeadReckoner-e feltételez,
+        így a dead reckoning miatt elmaradó snapshotok között sem áll meg a hajó.
+        """
+        if self.received_at is None:
+            return self.pos
+        return extrapolate(self.pos, self.vel, now - self.received_at)
+
+
+class WorldState:
+    """
+    Autoritatív világállapot sima Python adatszerkezetekben.
+    A dedikált (headless) szerver ezt tartja karban a relay közben,
+    így nincs szükség ShowBase-re, NodePath-okra vagy renderelésre.
+    """
+    def __init__(self):
+        self.entities = {}
+
+    def get_or_create(self, entity_id, entity_type="Ship"):
+        record = self.entities.get(entity_id)
+        if record is None:
+            record = self.entities[entity_id] = EntityRecord(entity_id, entity_type)
+        return record
+
+    def update_transform(self, entity_id, pos, hpr=None, vel=None, system_id=None, now=None):
+        record = self.get_or_create(entity_id)
+        record.pos = tuple(pos)
+        record.received_at = now
+        if hpr is not None:
+            record.hpr = tuple(hpr)
+        if vel is not None:
+            record.vel = tuple(vel)
+        if system_id is not None:
+            record.system_id = system_id
+        return record
+
+    def apply_damage(self, entity_id, amount):
+        """Elfogadott találat a nyilvántartott hull/pajzs értékekre (Ship.take_damage sorrendje: pajzs -> hull)."""
+        record = self.entities.get(entity_id)
+        if record is None or record.hull is None:
+            return record
+        shield = record.shield or 0.0
+        if shield >= amount:
+            record.shield = shield - amount
+        else:
+            record.shield = 0.0
+            record.hull = max(0.0, record.hull - (amount - shield))
+        return record
+
+    def set_equipment(self, entity_id, slot, item_id, custom_item=None):
+        record = self.get_or_create(entity_id)
+        record.equipment[slot] = item_id
+        if custom_item is not None:
+            record.custom_items[slot] = custom_item
+        else:
+            record.custom_items.pop(slot, None)
+
+    def remove(self, entity_id):
+        return self.entities.pop(entity_id, None)
+
+    def in_system(self, system_id):
+        return [r for r in self.entities.values() if r.system_id == system_id]
+
+    def __len__(self):
+        return len(self.entities)
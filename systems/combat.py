@@ -10,6 +10,20 @@ from panda3d.core import (
 )
 from direct.showbase.DirectObject import DirectObject # Fontos az eseményekhez
 import globals # Importáljuk az elején
+from entities.spatial import SPATIAL_INDEX
+
+def draw_beam(parent, start_pos, end_pos, color, old_np=None):
+    """Lézersugár vonal rajzolása; a korábbi sugár NodePath-ját (old_np) lecseréli."""
+    if old_np:
+        old_np.removeNode()
+
+    segs = LineSegs()
+    segs.setThickness(2.0)
+    segs.setColor(color)
+    segs.moveTo(start_pos)
+    segs.drawTo(end_pos)
+
+    return parent.attachNewNode(segs.create())
 
 class CombatSystem(DirectObject):
     def __init__(self, game):
@@ -39,6 +53,7 @@ class CombatSystem(DirectObject):
 
         # Eseménykezelés
         self.accept("mouse1", self.select_target)
+        self.accept("tab", self.select_nearest_target)
         self.accept("1", self.set_laser, [True])
         self.accept("1-up", self.set_laser, [False])
         self.accept("2", self.set_tractor, [True])
@@ -77,10 +92,30 @@ class CombatSystem(DirectObject):
             globals.SELECTED_TARGET = None
             print("[Combat] Kijelölés törölve (üres terület).")
 
+    def select_nearest_target(self):
+        """A lézer hatótávon belüli legközelebbi hajó/aszteroida kijelölése a térbeli indexből."""
+        ship = getattr(self.game, 'local_ship', None)
+        if not ship or not ship.root:
+            return
+        # Az alvó (nem betöltött) naprendszerek entitásai nem választhatók; a szűrés a keresésben
+        # történik, hogy a közeli alvó entitások ne szorítsák ki az aktív célpontot
+        found = SPATIAL_INDEX.k_nearest(ship.get_world_pos(), 1, entity_type=("Ship", "Asteroid"),
+                                        max_radius=globals.LASER_RANGE, exclude=ship.id,
+                                        only=globals.ENTITIES.active_ids())
+        if found:
+            globals.SELECTED_TARGET = found[0]
+            print(f"[Combat] Legközelebbi célpont: {getattr(found[0], 'name', 'Ismeretlen')} (Típus: {found[0].entity_type})")
+        else:
+            print("[Combat] Nincs célpont hatótávon belül.")
+
     def handle_laser(self, dt):
         import globals
         start_pos = self.game.camera.getPos(self.game.render)
         
+        # Megsemmisült célpontra mutató kijelölés: a handle generációja már nem egyezik
+        if globals.SELECTED_TARGET and not globals.ENTITIES.is_alive(globals.SELECTED_TARGET):
+            globals.SELECTED_TARGET = None
+
         # Ellenőrizzük, hogy létezik-e a célpont és van-e még modellje (nincs-e törölve)
         if globals.SELECTED_TARGET and not globals.SELECTED_TARGET.root.isEmpty():
             target_pos = globals.SELECTED_TARGET.root.getPos(self.game.render)
@@ -88,9 +123,12 @@ class CombatSystem(DirectObject):
             # Lézer rajzolása a célpontig
             self.draw_laser(start_pos, target_pos, (1, 0, 0, 1))
             
-            # Sebzés bevitel
-            if hasattr(globals.SELECTED_TARGET, "take_damage"):
-                globals.SELECTED_TARGET.take_damage(globals.LASER_DAMAGE * dt)
+            # Sebzés bevitel; hálózati játékosnál a szerver validálja (claim_hit) és küldi vissza
+            damage = globals.LASER_DAMAGE * dt
+            claim_hit = getattr(self.game, "claim_hit", None)
+            if not (claim_hit and claim_hit(globals.SELECTED_TARGET, damage)):
+                if hasattr(globals.SELECTED_TARGET, "take_damage"):
+                    globals.SELECTED_TARGET.take_damage(damage)
                 
             # Ha a célpont közben megsemmisült, ürítjük a kijelölést
             if globals.SELECTED_TARGET.current_hull <= 0:
@@ -110,16 +148,7 @@ class CombatSystem(DirectObject):
         self.tractor_active = state
 
     def draw_laser(self, start_pos, end_pos, color=(0, 1, 1, 1)):
-        if self.laser_np:
-            self.laser_np.removeNode()
-        
-        segs = LineSegs()
-        segs.setThickness(2.0)
-        segs.setColor(color)
-        segs.moveTo(start_pos)
-        segs.drawTo(end_pos)
-        
-        self.laser_np = self.game.render.attachNewNode(segs.create())
+        self.laser_np = draw_beam(self.game.render, start_pos, end_pos, color, self.laser_np)
 
     def update(self, dt):
         if not self.game.mouseWatcherNode.hasMouse():
@@ -161,6 +190,7 @@ class CombatSystem(DirectObject):
                     # Mozgatjuk az objektumot a hajó felé
                     new_pos = loot_pos + direction * 50.0 * dt
                     entity.root.setPos(self.game.render, new_pos)
+                    entity.sync_spatial()
                 else:
                     print("[System] Loot begyűjtve!")
                     entity.destroy() # Vagy entity.root.removeNode()
@@ -57,7 +57,7 @@ class SolarSystem:
         planet.root.reparentTo(self.root)
         if hasattr(planet, 'model') and planet.model:
             planet.model.setColor(1, 0.8, 0.1, 1) 
-        self.entities.append(planet)
+        self.add_entity(planet)
 
         # 2. Aszteroidák
         for i in range(random.randint(20, 50)):
@@ -68,7 +68,14 @@ class SolarSystem:
             pos = Vec3(math.cos(angle) * dist, math.sin(angle) * dist, random.uniform(-10, 10))
             ast.root.reparentTo(self.root)
             ast.root.setPos(pos)
-            self.entities.append(ast)
+            ast.sync_spatial()
+            self.add_entity(ast)
+
+    def add_entity(self, entity):
+        """Az entitás a rendszerhez tartozik: a registry rendszer és aktív indexébe is bekerül."""
+        self.entities.append(entity)
+        globals.ENTITIES.set_system(entity.id, self.id)
+        entity.set_active(self.is_loaded)
 
     def player_entered(self):
         self.player_count += 1
@@ -85,12 +92,16 @@ class SolarSystem:
         if not self.is_loaded:
             self.root.reparentTo(self.galaxy_root)
             self.is_loaded = True
+            for entity in self.entities:
+                entity.set_active(True)
             print(f"[Galaxy] {self.name} rendszer ({self.id}) betöltve.")
 
     def unload(self):
         if self.is_loaded:
             self.root.detachNode()
             self.is_loaded = False
+            for entity in self.entities:
+                entity.set_active(False)
             print(f"[Galaxy] {self.name} rendszer alvó állapotba került.")
 
 class Galaxy:
@@ -130,9 +141,10 @@ class Galaxy:
                 gate = Stargate(self.manager, g_id)
                 gate.root.reparentTo(system.root)
                 gate.root.setPos(pos)
+                gate.sync_spatial()
                 gate.destination_system_id = neighbor_id
                 
-                system.entities.append(gate)
+                system.add_entity(gate)
                 system.stargates[neighbor_id] = gate 
 
     def warp_player(self, player_node, target_id):
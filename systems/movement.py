@@ -89,4 +89,7 @@ class MovingSystem:
         if self.key_map["backward"]: move_vec.setY(-self.move_speed * dt)
 
         if move_vec.length_squared() > 0:
-            target_np.setPos(target_np, move_vec)
\ No newline at end of file
+            target_np.setPos(target_np, move_vec)
+            # A térbeli index (entities/spatial.py) követi a NodePath közvetlen mozgatását
+            if hasattr(player_obj, 'sync_spatial'):
+                player_obj.sync_spatial()
\ No newline at end of file
@@ -1,14 +1,24 @@
 # Cerberus/systems/ship_manager.py
 from panda3d.core import NodePath, Vec3, TextureStage, TexGenAttrib
 from entities.ship import Ship
+from entities.store import SHIP_STORE
+from entities.spatial import SPATIAL_INDEX
+from utils.frametime import FrameTimeStats
+from globals import SHIP_LOD_NEAR, SHIP_LOD_MID, SHIP_LOD_MID_INTERVAL, SHIP_LOD_FAR_INTERVAL, SHIP_LOD_MID_REGEN
 import globals as g
+import numpy as np
 import random
+import time
 
 class ShipManager:
     def __init__(self, game_app):
         self.app = game_app
         self.ships = {}
         self.master_models = [] # Lista a betöltött modelleknek (tömb)
+        # A közepes/távoli sávot soronként eltolt fázisban frissítjük, hogy ne egy frame-re essen
+        self.stagger = True
+        self.bucket_counts = {"near": 0, "mid": 0, "far": 0}
+        self.frame_stats = FrameTimeStats()
 
     def load_master_models(self, model_configs):
         """
@@ -61,7 +71,7 @@ class ShipManager:
             x = random.uniform(-1500, 1500)
             y = random.uniform(-1500, 1500)
             z = random.uniform(-100, 100)
-            new_ship.root.setPos(x, y, z)
+            new_ship.set_pos(x, y, z)
             
             self.ships[ship_id] = new_ship
 
@@ -100,31 +110,95 @@ class ShipManager:
         print(f"[SYSTEM] Vizuális megjelenítés (Index: {idx}) hozzáadva: {ship_instance.name}")
 
     def update(self, dt):
-        """LOD alapú frissítés: csak a közelieket frissítjük minden frame-ben."""
-        if not self.app.local_ship: 
+        """LOD alapú frissítés: a távolságot egyszerre, a SHIP_STORE oszlopain számoljuk."""
+        if not self.app.local_ship or not self.ships:
             return
-            
+
+        start = time.perf_counter()
         player_pos = self.app.local_ship.get_pos()
-        frame_cnt = self.app.taskMgr.getFrameCount()
-        
-        for ship in self.ships.values():
-            # Távolság négyzete (gyorsabb, mint a sima távolság)
-            dist_sq = (ship.root.getPos() - player_pos).lengthSquared()
-            
-            if dist_sq < 800**2:
-                # KÖZEL: Teljes AI és fizikai frissítés
-                ship.update(dt)
-            elif dist_sq < 2500**2:
-                # KÖZEPES: Csak pajzs regeneráció, mozgás nincs, és csak minden 5. frame-ben
-                if frame_cnt % 5 == 0:
-                    if hasattr(ship, 'current_shield') and ship.current_shield < ship.max_shield:
-                        ship.current_shield = min(ship.max_shield, ship.current_shield + 1.0 * (dt * 5))
-            else:
-                # MESSZE: Semmilyen erőforrást nem használ
-                pass
+        self.update_buckets(dt, (player_pos.x, player_pos.y, player_pos.z), self.app.taskMgr.getFrameCount())
+        self.frame_stats.add(time.perf_counter() - start)
+
+    def _due(self, rows, interval, frame):
+        """A sávból az adott frame-ben esedékes sorok maszkja (vagy skalár, ha nincs eltolás)."""
+        if self.stagger:
+            return rows % interval == frame % interval
+        return frame % interval == 0
+
+    def update_buckets(self, dt, player_pos, frame):
+        store = SHIP_STORE
+        # A harcban megsemmisült hajók sora már felszabadult
+        rows = np.fromiter((ship.row for ship in self.ships.values() if ship.is_active), dtype=np.intp)
+        if not len(rows):
+            return
+
+        # Távolság négyzete egyetlen menetben (gyorsabb, mint a sima távolság)
+        dist_sq = store.distance_sq(rows, player_pos)
+        near = dist_sq < SHIP_LOD_NEAR ** 2
+        mid = ~near & (dist_sq < SHIP_LOD_MID ** 2)
+        far = ~near & ~mid
+        mid_due = mid & self._due(rows, SHIP_LOD_MID_INTERVAL, frame)
+        far_due = far & self._due(rows, SHIP_LOD_FAR_INTERVAL, frame)
+
+        # Mozgás minden sávban; a scene graph-ba csak az esedékes sorok kerülnek
+        moving = store.integrate(rows, dt)
+        push = rows[moving & (near | mid_due | far_due)]
+        if len(push):
+            store.push_transforms(push)
+            SPATIAL_INDEX.move_many([store.entity_ids[row] for row in push.tolist()], store.pos[push].tolist())
+
+        # KÖZEL: pajzs regeneráció minden frame-ben a saját pajzsok ütemével
+        # (a drónoknál ez a Ship.update teljes tartalma, így soronkénti hívás nem kell)
+        store.regen_shields(rows[near], dt)
+        # KÖZEPES: csak pajzs regeneráció, a sáv 1/INTERVAL része frame-enként
+        store.regen_shields(rows[mid_due], dt * SHIP_LOD_MID_INTERVAL, rate=SHIP_LOD_MID_REGEN)
+        # MESSZE: csak a ritkított transzform frissítés
+
+        counts = self.bucket_counts
+        counts["near"] = int(near.sum())
+        counts["mid"] = int(mid.sum())
+        counts["far"] = len(rows) - counts["near"] - counts["mid"]
+
+    def metrics(self):
+        return {"buckets": dict(self.bucket_counts), "frame": self.frame_stats.metrics()}
 
     def clear_all(self):
         """Minden kezelt hajó törlése a világból."""
         for ship in self.ships.values():
             ship.destroy()
-        self.ships.clear()
\ No newline at end of file
+        self.ships.clear()
+
+
+def benchmark(drones, frames, moving_ratio=0.5):
+    """Fej nélküli mérés: frame-enkénti update idő eltolással és anélkül (Panda ablak nélkül)."""
+    random.seed(1)
+    manager = ShipManager(None)
+    for i in range(drones):
+        ship = Ship(None, 5000 + i, name=f"Drone-{i}")
+        ship.set_pos(random.uniform(-3000, 3000), random.uniform(-3000, 3000), random.uniform(-100, 100))
+        if random.random() < moving_ratio:
+            ship.remote_velocity = (random.uniform(-20, 20), random.uniform(-20, 20), 0.0)
+        manager.ships[ship.id] = ship
+
+    results = {}
+    for stagger in (False, True):
+        manager.stagger = stagger
+        manager.frame_stats.reset()
+        for frame in range(frames):
+            start = time.perf_counter()
+            manager.update_buckets(1 / 60, (0.0, 0.0, 0.0), frame)
+            manager.frame_stats.add(time.perf_counter() - start)
+        results["staggered" if stagger else "same_frame"] = manager.frame_stats.metrics()
+    manager.clear_all()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="ShipManager LOD frame idő mérés")
+    parser.add_argument("--drones", type=int, default=2000)
+    parser.add_argument("--frames", type=int, default=600)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.drones, args.frames), indent=2))
@@ -0,0 +1,30 @@
+from direct.gui.OnscreenText import OnscreenText
+from panda3d.core import TextNode
+from .UITheme.Theme import UITheme
+
+# Ilyen gyakran frissül a kiírás (mp); a számlálók maguk folyamatosan mennek
+REFRESH_INTERVAL = 0.5
+
+class NetStatsOverlay:
+    """Hálózati mérések (NetStats) szöveges overlay-e a jobb felső sarokban, F3-ra kapcsolható."""
+    def __init__(self, base, stats):
+        self.base = base
+        self.stats = stats
+        self.text = OnscreenText(
+            text="", parent=self.base.a2dTopRight, pos=(-0.05, -0.08), scale=0.035,
+            fg=UITheme.TEXT_COLOR, align=TextNode.ARight, mayChange=True
+        )
+        self.visible = True
+        self.base.taskMgr.doMethodLater(REFRESH_INTERVAL, self.refresh, "NetStatsOverlayTask")
+
+    def refresh(self, task):
+        if self.visible:
+            self.text.setText("\n".join(self.stats.summary_lines()))
+        return task.again
+
+    def toggle(self):
+        self.visible = not self.visible
+        if self.visible:
+            self.text.show()
+        else:
+            self.text.hide()
@@ -0,0 +1,34 @@
+"""
+Frame idő statisztika csúszó ablakban.
+
+A spike-ok (pl. ha minden közepes LOD hajó ugyanabban a frame-ben frissül) az
+átlagban elvesznek, ezért a szórást, a p99-et és a maximumot is számoljuk.
+"""
+import math
+from collections import deque
+
+
+class FrameTimeStats:
+    def __init__(self, window=600):
+        self.samples = deque(maxlen=window)  # mp / frame
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def reset(self):
+        self.samples.clear()
+
+    def metrics(self):
+        n = len(self.samples)
+        if not n:
+            return {"frames": 0}
+        mean = sum(self.samples) / n
+        variance = sum((s - mean) ** 2 for s in self.samples) / n
+        ordered = sorted(self.samples)
+        return {
+            "frames": n,
+            "mean_ms": round(mean * 1000.0, 4),
+            "stdev_ms": round(math.sqrt(variance) * 1000.0, 4),
+            "p99_ms": round(ordered[min(n - 1, int(n * 0.99))] * 1000.0, 4),
+            "max_ms": round(ordered[-1] * 1000.0, 4),
+        }
@@ -0,0 +1,80 @@
+"""
+Kompakt 32 bites entitás handle-ök generáció számlálóval.
+
+Egy handle = (generáció << INDEX_BITS) | index. Az index egy sűrű tömbindex
+(közvetlen indexelés a handle táblában / oszlopos tárolókban), a generáció pedig
+minden felszabadításkor nő, így egy megsemmisült entitásra mutató régi handle
+felismerhető: a generációja már nem egyezik a slotéval.
+
+A felszabadult indexeket FIFO sorrendben használjuk újra, hogy egy slot generációja
+minél lassabban forduljon körbe. A 0 handle (NULL_HANDLE) sosem érvényes.
+"""
+from array import array
+from collections import deque
+
+INDEX_BITS = 20          # ~1M egyidejű entitás
+GENERATION_BITS = 12     # 4096 újrahasznosítás után fordul körbe egy slot generációja
+INDEX_MASK = (1 << INDEX_BITS) - 1
+GENERATION_MASK = (1 << GENERATION_BITS) - 1
+NULL_HANDLE = 0
+
+
+def make_handle(index, generation):
+    return ((generation & GENERATION_MASK) << INDEX_BITS) | index
+
+
+def handle_index(handle):
+    return handle & INDEX_MASK
+
+
+def handle_generation(handle):
+    return handle >> INDEX_BITS
+
+
+class HandleAllocator:
+    def __init__(self):
+        # A 0. slot foglalt, így a NULL_HANDLE soha nem adható ki
+        self.generations = array("H", [0])
+        self.objects = [None]
+        self.free = deque()
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def allocate(self, obj=None):
+        if self.free:
+            index = self.free.popleft()
+        else:
+            index = len(self.objects)
+            if index > INDEX_MASK:
+                raise RuntimeError("Elfogytak az entitás handle-ök")
+            self.generations.append(0)
+            self.objects.append(None)
+        self.objects[index] = obj
+        self.count += 1
+        return make_handle(index, self.generations[index])
+
+    def release(self, handle):
+        """A handle felszabadítása; a slot generációja nő, így a régi handle érvénytelen lesz."""
+        if not self.is_valid(handle):
+            return False
+        index = handle & INDEX_MASK
+        self.objects[index] = None
+        self.generations[index] = (self.generations[index] + 1) & GENERATION_MASK
+        self.free.append(index)
+        self.count -= 1
+        return True
+
+    def is_valid(self, handle):
+        index = handle & INDEX_MASK
+        return (0 < index < len(self.objects)
+                and self.objects[index] is not None
+                and self.generations[index] == handle >> INDEX_BITS)
+
+    def get(self, handle):
+        """A handle-höz tartozó objektum, vagy None, ha a handle elavult (az entitás már megsemmisült)."""
+        index = handle & INDEX_MASK
+        if 0 < index < len(self.objects) and self.generations[index] == handle >> INDEX_BITS:
+            return self.objects[index]
+        return None
@@ -0,0 +1,168 @@
+"""
+A globális entitás tároló (globals.ENTITIES).
+
+Kívülről ugyanúgy használható, mint a korábbi dict (ENTITIES[id], id in ENTITIES,
+len, keys/values/items), de mellette karbantartott másodlagos indexeket is vezet:
+entity_type, a tulajdonos naprendszer (SolarSystem ID) és az aktív/alvó állapot szerint.
+Minden index dict, így a hozzáadás/törlés/áthelyezés O(1), a lekérdezések pedig élő
+nézetek (dict.values()), amiket nem kell felépíteni - pl. "minden Loot" vagy "a 7-es
+rendszer kapui" teljes bejárás nélkül.
+
+Az Entity.__init__ / Entity.destroy regisztrál és töröl, a SolarSystem állítja be a
+tulajdonos rendszert és az aktív állapotot (betöltés / alvó állapot).
+
+A registry osztja ki az entitások 32 bites handle-jét is (utils/handles.py); a
+resolve(handle) közvetlen indexelés, és az elavult handle-re None-t ad.
+"""
+from types import MappingProxyType
+
+from utils.handles import HandleAllocator
+
+_EMPTY = MappingProxyType({})
+
+
+class EntityRegistry:
+    def __init__(self):
+        self._entities = {}   # entity_id -> entitás
+        self._by_type = {}    # entity_type -> {entity_id: entitás}
+        self._by_system = {}  # system_id -> {entity_id: entitás}
+        self._active = {}
+        self._inactive = {}
+        self._system_of = {}  # entity_id -> system_id
+        self.handles = HandleAllocator()
+
+    # --- Karbantartás (Entity / SolarSystem hook-ok) ---
+    def add(self, entity, system_id=None, active=True):
+        entity_id = entity.id
+        if entity_id in self._entities:
+            self.remove(entity_id)
+        self._entities[entity_id] = entity
+        self._by_type.setdefault(entity.entity_type, {})[entity_id] = entity
+        (self._active if active else self._inactive)[entity_id] = entity
+        if system_id is not None:
+            self.set_system(entity_id, system_id)
+
+    def remove(self, entity_id, entity=None):
+        """Törlés ID alapján; entity megadásakor csak akkor, ha az ID még ehhez az entitáshoz tartozik."""
+        current = self._entities.get(entity_id)
+        if entity is not None and current is not entity:
+            # Az ID-t már egy újabb entitás használja: csak a régi handle-t engedjük el
+            if getattr(entity, "handle", None) is not None:
+                self.handles.release(entity.handle)
+            return None
+        entity = self._entities.pop(entity_id, None)
+        if entity is None:
+            return None
+        self._discard(self._by_type, entity.entity_type, entity_id)
+        self._discard(self._by_system, self._system_of.pop(entity_id, None), entity_id)
+        self._active.pop(entity_id, None)
+        self._inactive.pop(entity_id, None)
+        handle = getattr(entity, "handle", None)
+        if handle is not None:
+            self.handles.release(handle)
+        return entity
+
+    @staticmethod
+    def _discard(index, key, entity_id):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(entity_id, None)
+            if not bucket:
+                del index[key]
+
+    def set_system(self, entity_id, system_id):
+        """Az entitás tulajdonos naprendszerének beállítása (None = egyikhez sem tartozik)."""
+        entity = self._entities.get(entity_id)
+        if entity is None:
+            return
+        self._discard(self._by_system, self._system_of.pop(entity_id, None), entity_id)
+        if system_id is not None:
+            self._system_of[entity_id] = system_id
+            self._by_system.setdefault(system_id, {})[entity_id] = entity
+
+    def set_active(self, entity_id, active):
+        entity = self._entities.get(entity_id)
+        if entity is None:
+            return
+        if active:
+            self._inactive.pop(entity_id, None)
+            self._active[entity_id] = entity
+        else:
+            self._active.pop(entity_id, None)
+            self._inactive[entity_id] = entity
+
+    def clear(self):
+        for index in (self._entities, self._by_type, self._by_system, self._active, self._inactive, self._system_of):
+            index.clear()
+
+    # --- Nézetek (élők, felépítés nélkül; bejárás közbeni módosításnál előbb list()) ---
+    def of_type(self, entity_type):
+        return self._by_type.get(entity_type, _EMPTY).values()
+
+    def in_system(self, system_id, entity_type=None):
+        bucket = self._by_system.get(system_id, _EMPTY)
+        if entity_type is None:
+            return bucket.values()
+        # A kisebbik indexet járjuk be, a másikban csak tagságot nézünk
+        typed = self._by_type.get(entity_type, _EMPTY)
+        small, large = (bucket, typed) if len(bucket) <= len(typed) else (typed, bucket)
+        return [entity for entity_id, entity in small.items() if entity_id in large]
+
+    def active(self):
+        return self._active.values()
+
+    def inactive(self):
+        return self._inactive.values()
+
+    def active_ids(self):
+        """Az aktív entitások ID-i élő nézetként (O(1) tagság, pl. a térbeli lekérdezések only szűrőjéhez)."""
+        return self._active.keys()
+
+    def resolve(self, handle):
+        """Entitás handle alapján; None, ha a handle elavult (az entitás már megsemmisült)."""
+        return self.handles.get(handle)
+
+    def is_alive(self, entity):
+        handle = getattr(entity, "handle", None)
+        return handle is not None and self.handles.get(handle) is entity
+
+    def system_of(self, entity_id):
+        return self._system_of.get(entity_id)
+
+    def is_active(self, entity_id):
+        return entity_id in self._active
+
+    def count_by_type(self):
+        return {entity_type: len(bucket) for entity_type, bucket in self._by_type.items()}
+
+    # --- dict kompatibilis felület ---
+    def __getitem__(self, entity_id):
+        return self._entities[entity_id]
+
+    def __setitem__(self, entity_id, entity):
+        self.add(entity)
+
+    def __delitem__(self, entity_id):
+        if self.remove(entity_id) is None:
+            raise KeyError(entity_id)
+
+    def __contains__(self, entity_id):
+        return entity_id in self._entities
+
+    def __iter__(self):
+        return iter(self._entities)
+
+    def __len__(self):
+        return len(self._entities)
+
+    def get(self, entity_id, default=None):
+        return self._entities.get(entity_id, default)
+
+    def keys(self):
+        return self._entities.keys()
+
+    def values(self):
+        return self._entities.values()
+
+    def items(self):
+        return self._entities.items()